@@ -0,0 +1,289 @@
+# bench.py Benchmarks for the render, convert and parse hot paths.
+#
+# Each stage runs on recorded inputs and reports:
+#   us      best wall time of the repeats, microseconds
+#   pixel   FrameBuffer.pixel() calls (hline/blit/text calls alongside)
+#   spi     bytes written to the SPI bus
+#   heap    bytes allocated by one run of the stage with the GC held off, an
+#           upper bound on its peak heap use (tracemalloc peak on CPython)
+#   wire    bytes the clock downloads for the stage's input
+# The frame_* stages are the EDGE_FRAMES pipeline (delta.py): applying an
+# update from the edge service and sending it, in place of fetching,
+# parsing and drawing. The summary compares the two. hands is a minute's
+# move of the clock hands (hands.py) and the tiles it sends. show_rgb565 is
+# a full flush of the driver's RGB565 frame buffer (rgb565=True), written to
+# the bus as it is.
+# Results go to bench.json. Every metric with a budget in host/budgets.json
+# for this platform (or for "any") must stay within it, else the run fails
+# with exit status 1. Time (us) budgets are per platform.
+#
+# Run from the repository root:
+#   micropython host/bench.py                 # unix port
+#   mpremote mount . run host/bench.py        # on the device, real SPI bus
+#   python host/bench.py                      # CPython, through host/shims
+#
+# On the device the display is driven for real (pins as in main.py); on the
+# host the bus is a counting stand-in, so "us" covers conversion only.
+
+import gc
+import json
+import os
+import sys
+import time
+
+CPYTHON = sys.implementation.name == "cpython"
+if CPYTHON:
+    sys.path.insert(0, "host")
+    import run  # noqa: F401  Shims, MicroPython time functions
+else:
+    sys.path.insert(0, "host/shims")  # drivers.boolpalette on the unix port
+    sys.path.insert(0, "mpy_on_device/lib")
+
+import gc9a01  # noqa: E402
+import delta  # noqa: E402
+import forecast  # noqa: E402
+import hands  # noqa: E402
+import icons  # noqa: E402
+import jstream  # noqa: E402
+import ring  # noqa: E402
+
+PLATFORM = "cpython" if CPYTHON else sys.platform
+REPEATS = 5
+FIXTURES = "host/fixtures/"
+BUDGETS = "host/budgets.json"
+RESULTS = "bench.json"
+
+# Same geometry and data as main.py
+FACE = (119, 119, 118, 98, 92)
+HOURLY_UV = [2, 3, 5, 6, 6, 7, 7, 7, 7, 6]
+YR_PATHS = forecast.YR_PATHS
+UV_PATHS = forecast.UV_PATHS
+
+
+class CountingSPI:
+    def __init__(self, spi=None):
+        self._spi = spi
+        self.nbytes = 0
+
+    def write(self, buf):
+        self.nbytes += len(buf)
+        if self._spi is not None:
+            self._spi.write(buf)
+
+
+def _pin(v=None):
+    return 0
+
+
+# Forwards drawing calls to the display and counts them.
+class CountingFB:
+    def __init__(self, fb):
+        self._fb = fb
+        self.palette = fb.palette
+        self.mvb = fb.mvb
+        self.width = fb.width
+        self.calls = {}
+
+    def _n(self, name):
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    def pixel(self, *args):
+        self._n("pixel")
+        return self._fb.pixel(*args)
+
+    def hline(self, x, y, w, c):
+        self._n("hline")
+        self._fb.hline(x, y, w, c)
+
+    def blit(self, *args):
+        self._n("blit")
+        self._fb.blit(*args)
+
+    def visible(self, x, y, w, h):
+        return self._fb.visible(x, y, w, h)
+
+
+def make_display(rgb565=False):
+    try:
+        from machine import Pin, SPI
+
+        real = not CPYTHON and hasattr(SPI, "write")
+    except ImportError:
+        real = False
+    if real:
+        spi = CountingSPI(SPI(2, baudrate=20_000_000, sck=Pin(14), mosi=Pin(17)))
+        tft = gc9a01.GC9A01(spi, Pin(13, Pin.OUT), Pin(10, Pin.OUT), Pin(18, Pin.OUT), usd=True, circular=True, rgb565=rgb565)
+    else:
+        spi = CountingSPI()
+        tft = gc9a01.GC9A01(spi, _pin, _pin, _pin, usd=True, circular=True, rgb565=rgb565)
+    for i, c in enumerate((0, 0xF800, 0xFFFF, 0, 0x07E0, 0x001F, 0xFFE0, 0xFCA0, 0xF81F, 0x8410)):
+        gc9a01.GC9A01.lut[2 * i] = c >> 8
+        gc9a01.GC9A01.lut[2 * i + 1] = c & 0xFF
+    return tft, spi
+
+
+def _heap(fn):
+    if CPYTHON:
+        import tracemalloc
+
+        tracemalloc.start()
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return peak
+    gc.collect()
+    gc.disable()
+    a = gc.mem_alloc()
+    fn()
+    a = gc.mem_alloc() - a
+    gc.enable()
+    return a
+
+
+def measure(fn, spi=None, fb=None):
+    heap = _heap(fn)
+    if fb is not None:
+        fb.calls = {}
+    if spi is not None:
+        spi.nbytes = 0
+    best = None
+    for _ in range(REPEATS):
+        gc.collect()
+        t = time.ticks_us()
+        fn()
+        t = time.ticks_diff(time.ticks_us(), t)
+        best = t if best is None or t < best else best
+    res = {"us": best, "heap": heap}
+    if spi is not None:
+        res["spi"] = spi.nbytes // REPEATS
+    if fb is not None:
+        res["pixel"] = 0
+        for k, v in fb.calls.items():
+            res[k] = v // REPEATS
+    return res
+
+
+def stages():
+    tft, spi = make_display()
+    fb = CountingFB(tft)
+    uv_ring = ring.RingMap(*FACE, path="bench_ring.bin")
+    out = {}
+
+    def draw_ring():
+        for i, uv in enumerate(HOURLY_UV):
+            uv_ring.fill(fb, 7 + i, 4 + i % 5, 10 + i % 5)  # Smoothed, as in main.py
+
+    out["ring"] = measure(draw_ring, fb=fb)
+
+    def draw_icons():  # Positions as in draw_face()
+        icons.blit(fb, 61, 103, icons.SUN_32, 6)
+        icons.blit(fb, 103, 103, icons.CLOUD_32, 2)
+        icons.blit(fb, 145, 103, icons.RAIN_32, 9)
+        icons.blit(fb, 145, 103, icons.RAIN_DROPS_32, 5)
+
+    out["icons"] = measure(draw_icons, fb=fb)
+
+    lb = bytearray(tft.width * 2 * 8)
+    pairs = tft._pairtab()
+    wd = tft.width // 2
+
+    def convert():  # Whole frame in 8-line batches, as show() does
+        for y in range(0, tft.height, 8):
+            gc9a01._pcopy(lb, tft.mvb, pairs, y * wd, 8 * wd, 1, 0)
+
+    out["convert"] = measure(convert)
+    out["show"] = measure(tft.show, spi=spi)
+    try:  # 115 KB: PSRAM on the device
+        tft565, spi565 = make_display(rgb565=True)
+    except MemoryError:
+        print("No memory for an RGB565 frame, show_rgb565 skipped.")
+    else:
+        out["show_rgb565"] = measure(tft565.show, spi=spi565)
+        del tft565
+
+    read = {}  # Bytes read before the scan stopped, per fixture
+
+    def parse(name, paths, stop):
+        def fn():
+            with open(FIXTURES + name, "rb") as f:
+                read[name] = jstream.scan(f, jstream.Scanner(paths, stop))
+
+        return fn
+
+    out["parse_yr"] = measure(parse("metno_compact.json", YR_PATHS, lambda p, v: p[2] >= 24))
+    out["parse_uv"] = measure(parse("currentuvindex.json", UV_PATHS, lambda p, v: False))
+    for k, name in (("parse_yr", "metno_compact.json"), ("parse_uv", "currentuvindex.json")):
+        out[k]["wire"] = read[name]
+
+    # The frame drawn above, then with the first icon changed
+    old = bytes(tft.mvb)
+    icons.blit(fb, 61, 103, icons.CLOUD_32, 2)
+    new = bytes(tft.mvb)
+    tft.show_dirty()  # Start tracking, as after the boot snapshot
+    for k, data in (("frame_full", delta.encode(None, new, tft.width, tft.height)),
+                    ("frame_update", delta.encode(old, new, tft.width, tft.height))):
+
+        def apply(data=data):
+            delta.apply(tft, data)
+            tft.show_dirty()
+
+        out[k] = measure(apply, spi=spi)
+        out[k]["wire"] = len(data)
+
+    # A minute passing with the hands over that frame, as main.py draws them
+    clock = hands.Hands(tft, 119, 119, [hands.Hand(52, 3, 7), hands.Hand(80, 2, 7)])
+    clock.show(10, 8)
+    tft.show_dirty()
+    minute = [8]
+
+    def tick():
+        minute[0] = minute[0] % 59 + 1
+        clock.move(10, minute[0])
+        tft.show_dirty()
+
+    out["hands"] = measure(tick, spi=spi)
+    os.remove("bench_ring.bin")
+    return out
+
+
+def check(results):
+    try:
+        with open(BUDGETS) as f:
+            budgets = json.load(f)
+    except OSError:
+        print("No budgets file, nothing checked.")
+        return 0
+    failed = 0
+    for scope in ("any", PLATFORM):
+        for stage, limits in budgets.get(scope, {}).items():
+            for metric, limit in limits.items():
+                v = results.get(stage, {}).get(metric)
+                if v is not None and v > limit:
+                    print(f"FAIL {stage}.{metric} = {v} > {limit} ({scope})")
+                    failed += 1
+    return failed
+
+
+def summary(results):
+    local = ("parse_yr", "parse_uv", "ring", "icons", "show")
+    wire = results["parse_yr"]["wire"] + results["parse_uv"]["wire"]
+    us = sum(results[k]["us"] for k in local)
+    print(f"on-device pipeline: wire={wire} us={us} (parse, draw, show)")
+    for k in ("frame_full", "frame_update"):
+        print(f"{k}: wire={results[k]['wire']} us={results[k]['us']} (apply, show_dirty)")
+
+
+def main():
+    results = stages()
+    for stage, res in results.items():
+        print(stage, " ".join(f"{k}={res[k]}" for k in sorted(res)))
+    summary(results)
+    with open(RESULTS, "w") as f:
+        json.dump({"platform": PLATFORM, "stages": results}, f)
+    failed = check(results)
+    print(f"{failed} budget(s) exceeded" if failed else "All budgets met.")
+    if failed:
+        sys.exit(1)
+
+
+main()
@@ -0,0 +1,177 @@
+# collector.py Receives the clocks' telemetry and reports percentiles.
+#
+# Each clock with TELEMETRY_ADDR set sends the metrics of its last update
+# cycles as one UDP datagram (lib/telemetry.py) while Wi-Fi is up for a
+# fetch. This keeps the last --window values of every metric per device and
+# prints their percentiles every --every seconds and on Ctrl-C.
+#
+#   python host/collector.py                # Listen on UDP port 9099
+#   python host/collector.py --check        # Self-test on a free port
+#
+# Cycle numbers that are skipped count as lost: records dropped on the clock
+# (more than 8 cycles without Wi-Fi) or datagrams lost on the way. Cycle
+# numbers restart at 0 when a clock is powered up or reset, but continue
+# across deep sleep.
+
+import argparse
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [os.path.join(HERE, "shims"), os.path.join(os.path.dirname(HERE), "mpy_on_device", "lib")]
+
+import telemetry  # noqa: E402
+
+PERCENTILES = (50, 90, 99)
+
+
+def percentile(values, p):
+    s = sorted(values)
+    return s[min(len(s) - 1, max(0, (len(s) * p + 99) // 100 - 1))]  # Nearest rank
+
+
+class Device:
+    def __init__(self):
+        self.metrics = {}  # Name -> deque of values
+        self.records = 0
+        self.lost = 0
+        self.cycle = None  # Last cycle number seen
+        self.seen = 0  # time.time() of the last datagram
+
+
+class Collector:
+    def __init__(self, window=1000):
+        self.window = window
+        self.devices = {}
+        self.bad = 0  # Datagrams that did not decode
+        self._lock = threading.Lock()
+
+    def feed(self, data):
+        try:
+            dev, records = telemetry.decode(data)
+        except (ValueError, IndexError):
+            self.bad += 1
+            return
+        with self._lock:
+            d = self.devices.get(dev)
+            if d is None:
+                d = self.devices[dev] = Device()
+            d.seen = time.time()
+            for cycle, values in records:
+                if d.cycle is not None and cycle > d.cycle + 1:
+                    d.lost += cycle - d.cycle - 1
+                d.cycle = cycle
+                d.records += 1
+                for name, v in values.items():
+                    q = d.metrics.get(name)
+                    if q is None:
+                        q = d.metrics[name] = deque(maxlen=self.window)
+                    q.append(v)
+
+    def report(self):
+        lines = []
+        with self._lock:
+            for dev in sorted(self.devices):
+                d = self.devices[dev]
+                age = int(time.time() - d.seen)
+                lines.append(f"{dev}: {d.records} cycles, {d.lost} lost, last seen {age}s ago")
+                lines.append("  %-13s %6s %9s %9s %9s %9s %9s" % (("metric", "n", "min")
+                             + tuple("p%d" % p for p in PERCENTILES) + ("max",)))
+                for name in telemetry.NAMES:
+                    q = d.metrics.get(name)
+                    if q:
+                        row = [min(q)] + [percentile(q, p) for p in PERCENTILES] + [max(q)]
+                        lines.append("  %-13s %6d" % (name, len(q)) + "".join(" %9d" % v for v in row))
+        if self.bad:
+            lines.append(f"{self.bad} datagram(s) not understood")
+        return "\n".join(lines)
+
+
+def listen(port):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(("", port))
+    return sock
+
+
+def serve(sock, collector, every):
+    sock.settimeout(1)
+    due = time.time() + every
+    while True:
+        try:
+            data, _ = sock.recvfrom(2048)
+            collector.feed(data)
+        except socket.timeout:
+            pass
+        if time.time() >= due:
+            due += every
+            if collector.devices:
+                print(collector.report(), flush=True)
+
+
+def check():
+    sock = listen(0)
+    port = sock.getsockname()[1]
+    collector = Collector()
+    got = threading.Event()
+
+    def receive():
+        while True:
+            data, _ = sock.recvfrom(2048)
+            collector.feed(data)
+            got.set()
+
+    threading.Thread(target=receive, daemon=True).start()
+    for cycle in range(5):  # Cycles as the clock records them, cycle 3 without metrics
+        if cycle != 3:
+            telemetry.set(telemetry.WIFI_US, 800000 + cycle * 1000)
+            telemetry.set(telemetry.RSSI, -60 + cycle)
+            telemetry.add(telemetry.RX_BYTES, 100)
+            telemetry.add(telemetry.RX_BYTES, 50)
+            telemetry.set(telemetry.HEAP_MIN, 120000 - cycle * 1000)
+        telemetry.end_cycle()
+    path = os.path.join(tempfile.mkdtemp(), "telemetry.bin")  # Through a deep sleep
+    telemetry.save(path)
+    del telemetry._pending[:]
+    ok = telemetry.load(path) == 4 and not os.path.exists(path)
+    ok = ok and telemetry.send(("127.0.0.1", port)) == 4 and got.wait(5)
+    d = next(iter(collector.devices.values()), None) if ok else None
+    if d is None or d.records != 4 or d.lost != 1:
+        print("expected 4 cycles and 1 lost")
+        ok = False
+    elif list(d.metrics["rx_bytes"]) != [150] * 4 or list(d.metrics["rssi"]) != [-60, -59, -58, -56]:
+        print("values differ from those recorded")
+        ok = False
+    elif percentile(d.metrics["wifi_us"], 50) != 801000:
+        print("wrong median")
+        ok = False
+    print(collector.report())
+    print("ok" if ok else "FAIL")
+    return 0 if ok else 1
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--port", type=int, default=9099)
+    ap.add_argument("--every", type=int, default=60, help="seconds between reports")
+    ap.add_argument("--window", type=int, default=1000, help="values kept per metric and device")
+    ap.add_argument("--check", action="store_true", help="self-test on a free port")
+    args = ap.parse_args()
+    if args.check:
+        return check()
+    collector = Collector(args.window)
+    sock = listen(args.port)
+    print(f"Collecting telemetry on UDP port {sock.getsockname()[1]}")
+    try:
+        serve(sock, collector, args.every)
+    except KeyboardInterrupt:
+        print(collector.report())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
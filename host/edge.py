@@ -0,0 +1,407 @@
+# edge.py Forecast service for the clocks on a local network.
+#
+# Fetches met.no and currentuvindex.com once per location, extracts what the
+# face shows with the device's own forecast.py and serves it as one 21 byte
+# record, so each clock downloads a few dozen bytes over plain HTTP instead
+# of two JSON documents over TLS. Set EDGE_URL in main.py to use it.
+# With EDGE_FRAMES also set, the clock asks for the face instead: it is drawn
+# here by main.py's own code (render.py) and sent as the rectangles that
+# differ from the frame the clock shows (delta.py), which the clock names by
+# its checksum in If-None-Match. The last FRAMES_KEPT frames of a location
+# are kept to diff against; for any other frame the whole face is sent.
+#
+#   python host/edge.py --user-agent "..."  # Serve on port 8080
+#   python host/edge.py --fixtures          # Serve the recorded fixtures/
+#   python host/edge.py --check             # Self-test on a free port
+#
+#   GET /v1/face?lat=59.9139&lon=10.7522&tz=2
+#   GET /v1/frame?lat=59.9139&lon=10.7522&tz=2
+#
+# Records are cached per location (coordinates rounded to 4 decimals, as
+# met.no asks) and time zone until met.no's Expires, or UV_INTERVAL for the
+# UV data if that comes first. Requests for a location that is being fetched
+# wait for that fetch rather than starting their own. Last-Modified only
+# moves when the record's bytes change, so If-Modified-Since gets a 304
+# while the face would not change. A source that fails keeps its last good
+# part of the record, retried after a minute; until a location has data
+# from both sources its requests get a 503, so the clocks keep their own.
+
+import argparse
+import email.utils
+import json
+import os
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import zlib
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+FIXTURES = os.path.join(HERE, "fixtures")
+
+import render  # noqa: E402  First: puts lib/ on the path, with the viper stand-ins
+import delta  # noqa: E402
+import forecast  # noqa: E402
+
+YR_URL = "https://api.met.no/weatherapi/locationforecast/2.0/compact?lat={lat}&lon={lon}"
+UV_URL = "https://currentuvindex.com/api/v1/uvi?latitude={lat}&longitude={lon}"
+UV_INTERVAL = 1800  # Seconds a UV forecast is used; the API sends no Expires
+TIMEOUT = 30
+FRAMES_KEPT = 8  # Per location, to send updates against
+
+
+# Feed every scalar on one of paths to on_value in document order, as
+# jstream.Scanner does on the device. Returns True once on_value has.
+def walk(node, paths, on_value, path=None):
+    path = path or []
+    if isinstance(node, dict):
+        items = node.items()
+    elif isinstance(node, list):
+        items = enumerate(node)
+    else:
+        for p in paths:
+            if len(p) == len(path) and all(k is None or k == v for k, v in zip(p, path)):
+                return on_value(path, node)
+        return False
+    for k, v in items:
+        path.append(k)
+        stop = walk(v, paths, on_value, path)
+        path.pop()
+        if stop:
+            return True
+    return False
+
+
+def extract(yr_doc, uv_doc, tz):
+    yr = uv = None
+    if yr_doc is not None:
+        x = forecast.YrExtract()
+        walk(yr_doc, forecast.YR_PATHS, x.on_value)
+        yr = x.result()
+    if uv_doc is not None:
+        x = forecast.UvExtract()
+        walk(uv_doc, forecast.UV_PATHS, x.on_value)
+        uv = x.result(tz)
+    return yr, uv
+
+
+def record(yr_doc, uv_doc, tz):
+    return forecast.pack(*extract(yr_doc, uv_doc, tz))
+
+
+def fixture(name):
+    with open(os.path.join(FIXTURES, name)) as f:
+        return json.load(f)
+
+
+class Upstream:
+    # Fetches the source documents. Returns (document or None, expires).
+    def __init__(self, fixtures=False, user_agent=""):
+        self.fixtures = fixtures
+        self.user_agent = user_agent  # met.no wants an app name and contact details
+        self.fetches = 0
+        self._lock = threading.Lock()
+
+    def _get(self, url):
+        with self._lock:
+            self.fetches += 1
+        req = urllib.request.Request(url, headers={"User-Agent": self.user_agent})
+        with urllib.request.urlopen(req, timeout=TIMEOUT) as r:
+            return json.load(r), r.headers.get("Expires")
+
+    def yr(self, lat, lon):
+        if self.fixtures:
+            with self._lock:
+                self.fetches += 1
+            return fixture("metno_compact.json"), None
+        try:
+            doc, expires = self._get(YR_URL.format(lat=lat, lon=lon))
+        except (OSError, ValueError) as e:
+            print(f"met.no: {e}", file=sys.stderr)
+            return None, None
+        try:
+            expires = email.utils.parsedate_to_datetime(expires).timestamp()
+        except (TypeError, ValueError):
+            expires = None
+        return doc, expires
+
+    def uv(self, lat, lon):
+        if self.fixtures:
+            return fixture("currentuvindex.json")
+        try:
+            return self._get(UV_URL.format(lat=lat, lon=lon))[0]
+        except (OSError, ValueError) as e:
+            print(f"currentuvindex.com: {e}", file=sys.stderr)
+            return None
+
+
+class Entry:
+    def __init__(self):
+        self.lock = threading.Lock()  # Held while fetching
+        self.record = None
+        self.yr = None  # Last good extracted data of each source
+        self.uv = None
+        self.last_modified = None
+        self.expires = 0
+        self.frames = OrderedDict()  # ETag -> frame buffer bytes, newest last
+        self.etag = None  # Of the frame drawn from record
+        self._frame_of = None  # The record it was drawn from
+
+
+class Cache:
+    def __init__(self, upstream):
+        self.upstream = upstream
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._renderer = None
+
+    def get(self, lat, lon, tz):
+        key = (round(lat, 4), round(lon, 4), tz)
+        with self._lock:
+            e = self._entries.setdefault(key, Entry())
+        with e.lock:
+            now = time.time()
+            if now >= e.expires:
+                self._refresh(e, key, now)
+            return e
+
+    # The entry for a location and the update to its current frame from the
+    # frame with ETag have: None if that is the current one, the whole frame
+    # if it is not kept. Frames are only drawn when asked for.
+    def update(self, lat, lon, tz, have=None):
+        e = self.get(lat, lon, tz)
+        with e.lock:
+            if e._frame_of != e.record:
+                f = self._render(*forecast.unpack(e.record))
+                e.etag = '"%08x"' % zlib.crc32(f)
+                e.frames[e.etag] = f
+                e.frames.move_to_end(e.etag)
+                while len(e.frames) > FRAMES_KEPT:
+                    e.frames.popitem(last=False)
+                e._frame_of = e.record
+            if have == e.etag:
+                return e, None
+            frame, base = e.frames[e.etag], e.frames.get(have)
+        r = self._renderer
+        return e, delta.encode(base, frame, r.width, r.height)
+
+    def _render(self, yr, uv):
+        with self._lock:
+            if self._renderer is None:
+                self._renderer = render.Renderer()
+        return self._renderer.render(yr, uv)
+
+    def _refresh(self, e, key, now):
+        lat, lon, tz = key
+        yr_doc, expires = self.upstream.yr(lat, lon)
+        uv_doc = self.upstream.uv(lat, lon)
+        yr, uv = extract(yr_doc, uv_doc, tz)
+        e.yr = e.yr if yr is None else yr
+        e.uv = e.uv if uv is None else uv
+        if e.yr is not None and e.uv is not None:
+            rec = forecast.pack(e.yr, e.uv)
+            if rec != e.record:
+                e.record = rec
+                e.last_modified = email.utils.formatdate(now, usegmt=True)
+        if yr_doc is None or uv_doc is None:
+            expires = now + 60  # Try again soon
+        e.expires = min(expires or now + UV_INTERVAL, now + UV_INTERVAL)
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # The clocks keep the connection
+    cache = None
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        q = urllib.parse.parse_qs(url.query)
+        try:
+            if url.path not in ("/v1/face", "/v1/frame"):
+                raise KeyError(url.path)
+            lat, lon = float(q["lat"][0]), float(q["lon"][0])
+            tz = int(q.get("tz", ["0"])[0])
+        except (KeyError, ValueError):
+            self.send_error(404)
+            return
+        if self.cache.get(lat, lon, tz).record is None:  # No data yet
+            self.send_error(503)
+            return
+        if url.path == "/v1/face":
+            e = self.cache.get(lat, lon, tz)
+            body = e.record
+            headers = {}
+            unchanged = self.headers.get("If-Modified-Since") == e.last_modified
+        else:
+            e, body = self.cache.update(lat, lon, tz, self.headers.get("If-None-Match"))
+            headers = {"ETag": e.etag}
+            unchanged = body is None
+        headers["Last-Modified"] = e.last_modified
+        headers["Expires"] = email.utils.formatdate(e.expires, usegmt=True)
+        if unchanged:
+            self.send_response(304)
+            body = b""
+        else:
+            self.send_response(200)
+            headers["Content-Type"] = "application/octet-stream"
+        headers["Content-Length"] = str(len(body))
+        for k, v in headers.items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, fmt, *args):
+        if not self.server.quiet:
+            super().log_message(fmt, *args)
+
+
+def serve(port, upstream, quiet=False):
+    handler = type("Handler", (Handler,), {"cache": Cache(upstream)})
+    server = ThreadingHTTPServer(("", port), handler)
+    server.quiet = quiet
+    return server
+
+
+class _Screen:  # Enough of a GC9A01 for delta.apply()
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.mvb = bytearray(width * height // 2)
+
+    def mark(self, x, y, w, h):
+        pass
+
+
+def check_frames(url):
+    ok = True
+    url += "?lat=59.9139&lon=10.7522&tz=2"
+    with urllib.request.urlopen(url) as r:
+        full, etag = r.read(), r.headers["ETag"]
+    screen = _Screen(240, 240)
+    delta.apply(screen, full)
+    yr, uv = forecast.unpack(record(fixture("metno_compact.json"), fixture("currentuvindex.json"), 2))
+    if bytes(screen.mvb) != render.Renderer().render(yr, uv):
+        print("frame differs from the face drawn from the record")
+        ok = False
+    if etag != '"%08x"' % zlib.crc32(screen.mvb):
+        print(f"ETag {etag} is not the frame's checksum")
+        ok = False
+    try:
+        urllib.request.urlopen(urllib.request.Request(url, headers={"If-None-Match": etag}))
+        print("If-None-Match: expected 304")
+        ok = False
+    except urllib.error.HTTPError as e:
+        if e.code != 304:
+            print(f"If-None-Match: status {e.code}")
+            ok = False
+    print(f"frame: {len(full)} bytes in full")
+    return ok
+
+
+class _Failing(Upstream):  # The fixtures, then nothing once fail is set
+    fail = False
+
+    def yr(self, lat, lon):
+        return (None, None) if self.fail else super().yr(lat, lon)
+
+    def uv(self, lat, lon):
+        return None if self.fail else super().uv(lat, lon)
+
+
+def check_failures():
+    ok = True
+    upstream = _Failing(fixtures=True)
+    cache = Cache(upstream)
+    e = cache.get(59.9139, 10.7522, 2)
+    rec, lm = e.record, e.last_modified
+    upstream.fail = True
+    e.expires = 0
+    cache.get(59.9139, 10.7522, 2)
+    if e.record != rec or e.last_modified != lm:
+        print("failed upstream fetch replaced the record")
+        ok = False
+    if e.expires > time.time() + 60:
+        print("failed upstream fetch not retried soon")
+        ok = False
+    server = serve(0, upstream, quiet=True)  # A location never fetched
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        urllib.request.urlopen("http://127.0.0.1:%d/v1/face?lat=1&lon=2" % server.server_address[1])
+        print("no data: expected 503")
+        ok = False
+    except urllib.error.HTTPError as err:
+        if err.code != 503:
+            print(f"no data: status {err.code}")
+            ok = False
+    server.shutdown()
+    return ok
+
+
+def check():
+    upstream = Upstream(fixtures=True)
+    server = serve(0, upstream, quiet=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = "http://127.0.0.1:%d/v1/face" % server.server_address[1]
+    locations = [(59.9139, 10.7522, 2), (60.3913, 5.3221, 2)]
+    results = []
+
+    def fetch(lat, lon, tz):
+        with urllib.request.urlopen(f"{base}?lat={lat}&lon={lon}&tz={tz}") as r:
+            results.append(((lat, lon, tz), r.read(), r.headers["Last-Modified"]))
+
+    threads = [threading.Thread(target=fetch, args=loc) for loc in locations * 8]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    ok = True
+    if upstream.fetches != len(locations):
+        print(f"upstream fetches: {upstream.fetches}, expected {len(locations)}")
+        ok = False
+    expected = record(fixture("metno_compact.json"), fixture("currentuvindex.json"), 2)
+    if len(results) != len(threads) or any(body != expected for _, body, _ in results):
+        print("records differ from direct extraction")
+        ok = False
+    req = urllib.request.Request(
+        f"{base}?lat=59.9139&lon=10.7522&tz=2", headers={"If-Modified-Since": results[0][2]}
+    )
+    try:
+        urllib.request.urlopen(req)
+        print("If-Modified-Since: expected 304")
+        ok = False
+    except urllib.error.HTTPError as e:
+        if e.code != 304:
+            print(f"If-Modified-Since: status {e.code}")
+            ok = False
+    ok = check_frames(base.replace("/v1/face", "/v1/frame")) and ok
+    ok = check_failures() and ok
+    server.shutdown()
+    yr, uv = forecast.unpack(expected)
+    print(f"record ({len(expected)} bytes): {yr} {uv}")
+    print("ok" if ok else "FAIL")
+    return 0 if ok else 1
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--port", type=int, default=8080)
+    ap.add_argument("--fixtures", action="store_true", help="serve fixtures/ instead of the live APIs")
+    ap.add_argument("--user-agent", default="", help="sent upstream, as YR_USER_AGENT in main.py")
+    ap.add_argument("--check", action="store_true", help="self-test on a free port")
+    args = ap.parse_args()
+    if args.check:
+        return check()
+    server = serve(args.port, Upstream(args.fixtures, args.user_agent))
+    print(f"Serving forecast records on port {server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
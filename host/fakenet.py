@@ -0,0 +1,184 @@
+# Network stand-in at the asyncio stream layer.
+# main.py fetches through httpc, which opens connections with
+# asyncio.open_connection(); this replaces it with streams that answer from
+# the recorded fixtures by host name. The responses carry the validators the
+# real APIs send, and a matching If-Modified-Since (or If-None-Match) gets a
+# 304.
+# getaddrinfo() stands in for DNS with fixed addresses; connections to an
+# address are routed by the TLS server name, else by the address. HTTP/1.1
+# requests get chunked bodies on a connection that stays open for further
+# requests, as the real servers do. A route's body is a fixture file name,
+# or the bytes themselves (run.py adds the edge service's record that way).
+# UDP datagrams (telemetry) are kept in datagrams instead of being sent.
+import asyncio
+import os
+import socket as _socket
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+DATE = "Sat, 14 Jun 2025 09:49:12 GMT"
+ROUTES = {
+    "api.met.no": (
+        "metno_compact.json",
+        {
+            "Content-Type": "application/json",
+            "Last-Modified": "Sat, 14 Jun 2025 09:46:23 GMT",
+            "Expires": "Sat, 14 Jun 2025 10:17:36 GMT",
+            "Date": DATE,
+        },
+    ),
+    "currentuvindex.com": (
+        "currentuvindex.json",
+        {
+            "Content-Type": "application/json",
+            "Last-Modified": "Sat, 14 Jun 2025 09:00:00 GMT",
+            "Date": DATE,
+        },
+    ),
+}
+
+ADDRS = {"api.met.no": "10.0.0.1", "currentuvindex.com": "10.0.0.2", "edge.local": "10.0.0.3",
+         "collector.local": "10.0.0.4"}
+CHUNK = 1000  # Bytes per chunk of an HTTP/1.1 body
+
+requests = []  # (host, request bytes) per request
+connections = 0
+lookups = 0
+datagrams = []  # (address, bytes) sent over UDP
+rx_bytes = 0  # Response bytes handed to the device
+
+
+def getaddrinfo(host, port, *args):
+    global lookups
+    lookups += 1
+    addr = ADDRS.get(host, host)
+    return [(2, 1, 0, "", (addr, port))]
+
+
+class _UDP:
+    def sendto(self, data, addr):
+        datagrams.append((addr, bytes(data)))
+        return len(data)
+
+    def close(self):
+        pass
+
+
+_real_socket = _socket.socket
+
+
+# socket.socket(): UDP sockets are captured, others are real.
+def socket(family=_socket.AF_INET, type=_socket.SOCK_STREAM, *args):
+    if type == _socket.SOCK_DGRAM:
+        return _UDP()
+    return _real_socket(family, type, *args)
+
+
+class Stream:
+    def __init__(self, host, port, tls):
+        self.host = host
+        self.port = port
+        self.tls = tls
+        self.req = b""
+        self.resp = b""
+        self.pos = 0
+        self.closed = False
+
+    def write(self, b):
+        self.req += bytes(b)
+
+    async def drain(self):
+        pass
+
+    # Answer the next complete request once the previous answer is read.
+    def _respond(self):
+        end = self.req.find(b"\r\n\r\n")
+        if self.pos < len(self.resp) or end < 0:
+            return
+        req = self.req[: end + 4]
+        self.req = self.req[end + 4 :]
+        requests.append((self.host, req))
+        self.resp = self._answer(req)
+        self.pos = 0
+
+    def _answer(self, req):
+        name, hdrs = ROUTES.get(self.host, (None, {}))
+        if name is None:
+            return b"HTTP/1.0 404 Not Found\r\n\r\n"
+        v11 = req.split(b"\r\n", 1)[0].endswith(b"HTTP/1.1")
+        ver = "HTTP/1.1" if v11 else "HTTP/1.0"
+        h = "".join("%s: %s\r\n" % kv for kv in hdrs.items())
+        lm = hdrs.get("Last-Modified")
+        etag = hdrs.get("ETag")
+        if lm and ("If-Modified-Since: " + lm).encode() in req or etag and ("If-None-Match: " + etag).encode() in req:
+            return ("%s 304 Not Modified\r\n%s\r\n" % (ver, h)).encode()
+        if isinstance(name, bytes):
+            body = name
+        else:
+            with open(os.path.join(FIXTURES, name), "rb") as f:
+                body = f.read()
+        if not v11:
+            head = "HTTP/1.0 200 OK\r\n%sContent-Length: %d\r\n\r\n" % (h, len(body))
+            return head.encode() + body
+        out = [("HTTP/1.1 200 OK\r\n%sTransfer-Encoding: chunked\r\n\r\n" % h).encode()]
+        for i in range(0, len(body), CHUNK):
+            c = body[i : i + CHUNK]
+            out.append(b"%x\r\n%s\r\n" % (len(c), c))
+        out.append(b"0\r\n\r\n")
+        return b"".join(out)
+
+    def _take(self, n):
+        global rx_bytes
+        r = self.resp[self.pos : self.pos + n]
+        self.pos += len(r)
+        rx_bytes += len(r)
+        return r
+
+    async def readline(self):
+        self._respond()
+        await asyncio.sleep(0)
+        i = self.resp.find(b"\n", self.pos)
+        return self._take((len(self.resp) if i < 0 else i + 1) - self.pos)
+
+    async def readinto(self, buf):
+        self._respond()
+        await asyncio.sleep(0)
+        r = self._take(min(len(buf), 1460))  # One TCP segment per read
+        buf[: len(r)] = r
+        return len(r)
+
+    async def read(self, n=-1):
+        self._respond()
+        await asyncio.sleep(0)
+        return self._take(len(self.resp) if n < 0 else n)
+
+    def close(self):
+        self.closed = True
+
+    async def wait_closed(self):
+        pass
+
+
+async def open_connection(host, port, ssl=None, server_hostname=None):
+    global connections
+    await asyncio.sleep(0)
+    if server_hostname is None:
+        server_hostname = {a: h for h, a in ADDRS.items()}.get(host, host)
+    connections += 1
+    s = Stream(server_hostname, port, ssl)
+    return s, s
+
+
+# Stand-in for the ssl module: CPython's refuses CERT_NONE on a client
+# context with hostname checking, which httpc relies on like the device does.
+class _SSL:
+    PROTOCOL_TLS_CLIENT = 0
+    CERT_NONE = 0
+    CERT_REQUIRED = 2
+
+    class SSLContext:
+        def __init__(self, protocol):
+            self.verify_mode = 2
+
+
+ssl = _SSL()
@@ -0,0 +1,146 @@
+# Model of a GC9A01 panel driven over 4-wire SPI.
+# Decodes the command stream (CASET 0x2A, RASET 0x2B, RAMWR 0x2C and
+# write-continue 0x3C) back into a RGB565 image and keeps transfer counts.
+import struct
+import zlib
+
+CASET = 0x2A
+RASET = 0x2B
+RAMWR = 0x2C
+RAMWRC = 0x3C
+
+
+class Panel:
+    def __init__(self, width=240, height=240):
+        self.width = width
+        self.height = height
+        self.ram = [0] * (width * height)  # RGB565 values
+        self.dc = None  # Pins are attached by the harness
+        self.cs = None
+        self.rst = None
+        self.reset_counts()
+        self._cmd = None
+        self._args = bytearray()
+        self._xs, self._xe = 0, width - 1
+        self._ys, self._ye = 0, height - 1
+        self._x = self._y = 0
+        self._half = None  # Odd byte of a pixel split across writes
+        self.madctl = 0
+        self.on = False
+        self.sleeping = True
+
+    def reset_counts(self):
+        self.bytes = 0  # All bytes clocked while CS is low
+        self.pixel_bytes = 0  # Bytes written to display RAM
+        self.commands = {}  # Command byte -> count
+        self.writes = 0  # spi.write() calls
+
+    def hw_reset(self):
+        self._cmd = None
+        self.madctl = 0
+        self.on = False
+        self.sleeping = True
+
+    def write(self, data):
+        self.writes += 1
+        if self.cs is not None and self.cs.value():
+            return  # Not selected
+        data = bytes(data)
+        self.bytes += len(data)
+        if self.dc is not None and not self.dc.value():
+            for c in data:
+                self._command(c)
+            return
+        cmd = self._cmd
+        if cmd in (RAMWR, RAMWRC):
+            self._pixels(data)
+        else:
+            self._args.extend(data)
+            self._apply()
+
+    def _command(self, c):
+        self.commands[c] = self.commands.get(c, 0) + 1
+        self._cmd = c
+        self._args = bytearray()
+        self._half = None
+        if c == RAMWR:
+            self._x, self._y = self._xs, self._ys
+        elif c == 0x11:
+            self.sleeping = False
+        elif c == 0x10:
+            self.sleeping = True
+        elif c == 0x29:
+            self.on = True
+        elif c == 0x28:
+            self.on = False
+
+    def _apply(self):
+        a = self._args
+        if self._cmd == CASET and len(a) >= 4:
+            self._xs, self._xe = struct.unpack(">HH", a[:4])
+        elif self._cmd == RASET and len(a) >= 4:
+            self._ys, self._ye = struct.unpack(">HH", a[:4])
+        elif self._cmd == 0x36 and a:
+            self.madctl = a[0]
+
+    def _pixels(self, data):
+        self.pixel_bytes += len(data)
+        i = 0
+        n = len(data)
+        if self._half is not None:
+            self._put((self._half << 8) | data[0])
+            self._half = None
+            i = 1
+        while i + 1 < n:
+            self._put((data[i] << 8) | data[i + 1])  # Panel takes MS byte first
+            i += 2
+        if i < n:
+            self._half = data[i]
+
+    def _put(self, v):
+        x, y = self._x, self._y
+        if 0 <= x < self.width and 0 <= y < self.height:
+            self.ram[y * self.width + x] = v
+        x += 1
+        if x > self._xe:
+            x = self._xs
+            y += 1
+            if y > self._ye:
+                y = self._ys
+        self._x, self._y = x, y
+
+    def rgb888(self):
+        out = bytearray(self.width * self.height * 3)
+        j = 0
+        for v in self.ram:
+            r = (v >> 11) & 0x1F
+            g = (v >> 5) & 0x3F
+            b = v & 0x1F
+            out[j] = (r << 3) | (r >> 2)
+            out[j + 1] = (g << 2) | (g >> 4)
+            out[j + 2] = (b << 3) | (b >> 2)
+            j += 3
+        return out
+
+    def png(self):
+        w, h = self.width, self.height
+        rgb = self.rgb888()
+        raw = b"".join(b"\x00" + bytes(rgb[y * w * 3 : (y + 1) * w * 3]) for y in range(h))
+
+        def chunk(tag, body):
+            c = struct.pack(">I", len(body)) + tag + body
+            return c + struct.pack(">I", zlib.crc32(tag + body) & 0xFFFFFFFF)
+
+        return (
+            b"\x89PNG\r\n\x1a\n"
+            + chunk(b"IHDR", struct.pack(">IIBBBBB", w, h, 8, 2, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(raw, 9))
+            + chunk(b"IEND", b"")
+        )
+
+    def save_png(self, path):
+        with open(path, "wb") as f:
+            f.write(self.png())
+
+    def diff(self, other_ram):
+        return sum(1 for a, b in zip(self.ram, other_ram) if a != b)
@@ -0,0 +1,72 @@
+# render.py The clock's face drawn on the host, for the edge service.
+#
+# Loads the unchanged main.py with the stand-ins from shims/ and draws with
+# its own layers, so a frame rendered here is byte for byte the frame the
+# clock would draw from the same data. No panel is attached: the SPI writes
+# of the display init go nowhere. Only the MicroPython time functions that
+# CPython lacks are added, so the host clock is left alone (run.py, by
+# contrast, replaces it with a virtual one).
+
+import builtins
+import contextlib
+import io
+import os
+import runpy
+import sys
+import tempfile
+import threading
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEVICE = os.path.join(os.path.dirname(HERE), "mpy_on_device")
+
+for _p in (DEVICE, os.path.join(DEVICE, "lib"), os.path.join(HERE, "shims")):
+    if _p not in sys.path:
+        sys.path.insert(0, _p)
+
+import micropython  # noqa: E402
+
+builtins.micropython = micropython
+builtins.const = micropython.const
+
+_t0 = time.perf_counter()
+_TIME = {
+    "ticks_us": lambda: int((time.perf_counter() - _t0) * 1e6) & 0x3FFFFFFF,
+    "ticks_ms": lambda: int((time.perf_counter() - _t0) * 1e3) & 0x3FFFFFFF,
+    "ticks_diff": lambda a, b: ((a - b + 0x20000000) & 0x3FFFFFFF) - 0x20000000,
+    "ticks_add": lambda a, b: (a + b) & 0x3FFFFFFF,
+    "sleep_ms": lambda ms: None,  # Panel delays: there is no panel
+    "sleep_us": lambda us: None,
+}
+for _name, _fn in _TIME.items():
+    if not hasattr(time, _name):
+        setattr(time, _name, _fn)
+
+
+class Renderer:
+    def __init__(self):
+        self._lock = threading.Lock()
+        cwd = os.getcwd()
+        os.chdir(tempfile.mkdtemp(prefix="clock-render-"))  # Caches, ring.bin
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                main = runpy.run_path(os.path.join(DEVICE, "main.py"), run_name="render")["main"]
+                self._m = m = main.__globals__
+                self.tft = m["init_display"]()
+                self._stack = m["face_layers"](self.tft, m["make_ring"]())
+        finally:
+            os.chdir(cwd)
+        self.width = self.tft.width
+        self.height = self.tft.height
+
+    # Frame buffer bytes of the face for a decoded forecast record, as the
+    # clock would draw it in EDGE_URL mode.
+    def render(self, yr, uv):
+        m = self._m
+        with self._lock:
+            yr, uv = m["record_data"](yr, uv)
+            face = m["default_face"]()
+            m["apply_yr_data"](face, yr)
+            face["hourly_uv"] = list(uv)
+            self._stack.render(face)
+            return bytes(self.tft.mvb)
@@ -0,0 +1,281 @@
+# run.py Run the clock's unchanged main.py on the host.
+#
+# The stand-ins in shims/ replace the MicroPython modules the firmware
+# provides. The fake SPI bus feeds a GC9A01 model (panel.py), which decodes
+# CASET/RASET/RAMWR back into the 240x240 image. Network requests are served
+# from fixtures/ (fakenet.py). Each run writes a PNG and a JSON record of the
+# transfer and drawing counts, and can be compared with the golden frames.
+#
+#   python host/run.py                  # Live scenario, output in host/out/
+#   python host/run.py --offline        # No Wi-Fi: stored or default data
+#   python host/run.py --edge           # Fetch the record from edge.py's service
+#   python host/run.py --frames         # Fetch the face drawn by edge.py's service
+#   python host/run.py --warm           # Live, after a soft reset: panel kept its set-up
+#   python host/run.py --check          # Compare every scenario with golden/,
+#                                       # and check the driver's dirty refresh
+#   python host/run.py --update         # Rewrite golden/ after a deliberate change
+#   python host/run.py --prof           # Also print prof's event log
+#
+# A run ends at the first sleep of the app loop (--sleeps N for more cycles)
+# or at deep sleep. Flash files (ring.bin, the caches) go to a fresh
+# directory unless --flash DIR is given, so a second run with the same DIR
+# starts from what the first one stored.
+
+import argparse
+import asyncio
+import builtins
+import gc
+import hashlib
+import json
+import os
+import runpy
+import socket
+import sys
+import tempfile
+import time
+import traceback
+import zlib
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+DEVICE = os.path.join(ROOT, "mpy_on_device")
+GOLDEN = os.path.join(HERE, "golden")
+SCENARIOS = ("live", "offline", "edge", "frames", "warm")
+EDGE_URL = "http://edge.local:8080"
+TELEMETRY_ADDR = ("collector.local", 9099)
+
+sys.path[:0] = [os.path.join(HERE, "shims"), os.path.join(DEVICE, "lib"), DEVICE, HERE]
+
+import fakenet  # noqa: E402
+import framebuf  # noqa: E402
+import machine  # noqa: E402
+import micropython  # noqa: E402
+import network  # noqa: E402
+import panel  # noqa: E402
+
+# --- MicroPython time: ticks, virtual sleeps and the 2000 epoch ---
+_t0 = time.perf_counter()
+_virt_ms = [0]  # Time spent in (virtual) sleeps
+_EPOCH = 946684800  # 2000-01-01 in Unix time
+_start = _EPOCH  # The RTC after a power cycle, until set from a server
+_gmtime = time.gmtime
+
+
+def _ticks_us():
+    return (int((time.perf_counter() - _t0) * 1e6) + _virt_ms[0] * 1000) & 0x3FFFFFFF
+
+
+def _ticks_diff(a, b):
+    d = (a - b) & 0x3FFFFFFF
+    return d - 0x40000000 if d & 0x20000000 else d
+
+
+def _sleep_ms(ms):
+    _virt_ms[0] += int(ms)
+
+
+def _time():  # Only sleeps move the clock, so runs are repeatable
+    return int(_start - _EPOCH + machine._rtc_offset + _virt_ms[0] / 1000)
+
+
+time.ticks_us = _ticks_us
+time.ticks_ms = lambda: _ticks_us() // 1000
+time.ticks_diff = _ticks_diff
+time.ticks_add = lambda a, b: (a + b) & 0x3FFFFFFF
+time.sleep_ms = _sleep_ms
+time.sleep_us = lambda us: _sleep_ms(us // 1000)
+time.sleep = lambda s: _sleep_ms(s * 1000)
+time.time = _time
+time.gmtime = lambda t=None: _gmtime((_time() if t is None else t) + _EPOCH)
+sys.print_exception = lambda e, f=None: traceback.print_exception(e)
+builtins.micropython = micropython
+builtins.const = micropython.const
+gc.mem_free = lambda: 0  # No MicroPython heap here: prof.mem() logs zeros
+gc.mem_alloc = lambda: 0
+
+# --- MicroPython asyncio: sleep_ms, sleeps on the virtual clock, streams ---
+_asleep = asyncio.sleep
+
+
+async def _async_sleep(t, *args):
+    _sleep_ms(t * 1000)
+    await _asleep(0)
+
+
+async def _async_sleep_ms(ms):
+    await _async_sleep(ms / 1000)
+
+
+asyncio.sleep = _async_sleep
+asyncio.sleep_ms = _async_sleep_ms
+asyncio.open_connection = fakenet.open_connection
+socket.getaddrinfo = fakenet.getaddrinfo
+socket.socket = fakenet.socket
+sys.modules["ssl"] = fakenet.ssl
+
+
+# Serve what edge.py would for the fixtures: the record, or the whole frame
+# drawn from it (a clock on a fresh flash has no frame to update).
+def _edge_route(scenario):
+    import delta
+    import edge
+    import forecast
+    import render
+
+    body = edge.record(edge.fixture("metno_compact.json"), edge.fixture("currentuvindex.json"), 2)
+    headers = dict(fakenet.ROUTES["api.met.no"][1])
+    if scenario == "frames":
+        frame = render.Renderer().render(*forecast.unpack(body))
+        body = delta.encode(None, frame, 240, 240)
+        headers["ETag"] = '"%08x"' % zlib.crc32(frame)
+    fakenet.ROUTES["edge.local"] = (body, headers)
+
+
+def run(scenario, flash=None, sleeps=1):
+    if scenario in ("edge", "frames"):
+        _edge_route(scenario)  # Before the panel is attached: render.py inits a display too
+    P = panel.Panel()
+    machine.panel = P
+    P.dc = machine.Pin(10)  # DC_PIN, CS_PIN and RST_PIN in main.py
+    P.cs = machine.Pin(13)
+    P.rst = machine.Pin(18)
+    machine.sleep_limit = sleeps
+    machine._reset_cause = machine.SOFT_RESET if scenario == "warm" else machine.PWRON_RESET
+    network.reachable = scenario != "offline"
+    framebuf.reset_counts()
+    cwd = os.getcwd()
+    os.chdir(flash or tempfile.mkdtemp(prefix="clock-flash-"))
+    try:
+        main = runpy.run_path(os.path.join(DEVICE, "main.py"), run_name="clock")["main"]
+        g = main.__globals__  # run_path returns a copy of them
+        g["TELEMETRY_ADDR"] = TELEMETRY_ADDR
+        if scenario in ("edge", "frames"):
+            g["EDGE_URL"] = EDGE_URL
+            g["EDGE_FRAMES"] = scenario == "frames"
+        main()
+    except machine.SleepExit:
+        pass
+    finally:
+        os.chdir(cwd)
+    record = {
+        "frame_sha1": hashlib.sha1(bytes(P.rgb888())).hexdigest(),
+        "spi_bytes": P.bytes,
+        "pixel_bytes": P.pixel_bytes,
+        "spi_writes": P.writes,
+        "commands": {"0x%02X" % k: v for k, v in sorted(P.commands.items())},
+        "framebuf_calls": dict(sorted(framebuf.calls.items())),
+        "sleeps": machine.sleeps[:],
+        "telemetry": _telemetry(),
+    }
+    return P, record
+
+
+# Cycles and metric names of each datagram sent (the values vary from run
+# to run). A datagram sent while Wi-Fi is up must hold the cycle it is sent
+# in: every cycle before the run's first sleep is cycle 0.
+def _telemetry():
+    import telemetry
+
+    out = []
+    for addr, data in fakenet.datagrams:
+        _, records = telemetry.decode(data)
+        if not any(cycle == 0 for cycle, _ in records):
+            raise AssertionError("telemetry datagram without the current cycle")
+        out.append([[cycle, sorted(values)] for cycle, values in records])
+    return out
+
+
+# do_refresh() sends the whole frame, then only what changed: nothing, and
+# no error, when the frame is redrawn the same.
+def check_refresh():
+    import gc9a01
+
+    P = panel.Panel()
+    machine.panel = P
+    P.dc, P.cs, P.rst = machine.Pin(10), machine.Pin(13), machine.Pin(18)
+    tft = gc9a01.GC9A01(machine.SPI(2), P.cs, P.dc, P.rst, usd=True, circular=True)
+
+    async def refresh():
+        full = await tft.do_refresh()
+        sent = P.pixel_bytes
+        same = await tft.do_refresh()
+        quiet = P.pixel_bytes == sent
+        tft.fill_rect(100, 100, 20, 10, 1)
+        changed = await tft.do_refresh()
+        return full, same, quiet, changed
+
+    full, same, quiet, changed = asyncio.run(refresh())
+    if (full, same, quiet) != (1, 0, True) or not changed:
+        print(f"refresh: FAIL (windows {full}, {same}, {changed}; unchanged frame sent pixels: {not quiet})")
+        return False
+    print("refresh: ok")
+    return True
+
+
+def save(P, record, path):
+    P.save_png(path + ".png")
+    with open(path + ".json", "w") as f:
+        json.dump(record, f, indent=1, sort_keys=True)
+        f.write("\n")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--offline", action="store_true", help="Wi-Fi unreachable")
+    ap.add_argument("--edge", action="store_true", help="fetch from the edge service")
+    ap.add_argument("--frames", action="store_true", help="fetch frame updates from the edge service")
+    ap.add_argument("--warm", action="store_true", help="start after a soft reset")
+    ap.add_argument("--check", action="store_true", help="compare all scenarios with golden/")
+    ap.add_argument("--update", action="store_true", help="rewrite golden/")
+    ap.add_argument("--flash", help="directory standing in for the device filesystem")
+    ap.add_argument("--sleeps", type=int, default=1, help="end the run at this sleep")
+    ap.add_argument("--out", default=os.path.join(HERE, "out"))
+    ap.add_argument("--prof", action="store_true", help="print prof.dump() after the run")
+    args = ap.parse_args()
+
+    if not (args.check or args.update):
+        scenario = ("offline" if args.offline else "edge" if args.edge else "frames" if args.frames
+                    else "warm" if args.warm else "live")
+        P, record = run(scenario, args.flash, args.sleeps)
+        os.makedirs(args.out, exist_ok=True)
+        save(P, record, os.path.join(args.out, scenario))
+        print(json.dumps(record, indent=1, sort_keys=True))
+        if args.prof:
+            import prof
+
+            prof.dump()
+        return 0
+
+    # Each scenario in its own process: main.py keeps module state
+    import subprocess
+
+    failed = 0 if args.update or check_refresh() else 1
+    for scenario in SCENARIOS:
+        out = tempfile.mkdtemp(prefix="clock-run-")
+        cmd = [sys.executable, __file__, "--out", out] + (["--" + scenario] if scenario != "live" else [])
+        subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL)
+        with open(os.path.join(out, scenario + ".json")) as f:
+            record = json.load(f)
+        gpath = os.path.join(GOLDEN, scenario)
+        if args.update:
+            os.makedirs(GOLDEN, exist_ok=True)
+            os.replace(os.path.join(out, scenario + ".png"), gpath + ".png")
+            os.replace(os.path.join(out, scenario + ".json"), gpath + ".json")
+            print(f"{scenario}: golden updated")
+            continue
+        with open(gpath + ".json") as f:
+            golden = json.load(f)
+        diffs = [k for k in golden if golden[k] != record.get(k)]
+        if diffs:
+            failed += 1
+            print(f"{scenario}: FAIL")
+            for k in diffs:
+                print(f"  {k}: golden {golden[k]} now {record.get(k)}")
+            print(f"  frame: {os.path.join(out, scenario + '.png')}")
+        else:
+            print(f"{scenario}: ok")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
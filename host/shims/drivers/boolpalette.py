@@ -0,0 +1,14 @@
+# Stand-in for nano-gui's drivers/boolpalette.py
+import framebuf
+
+
+class BoolPalette(framebuf.FrameBuffer):
+    def __init__(self, mode):
+        buf = bytearray(4)  # OK for <= 16 bit color
+        super().__init__(buf, 2, 1, mode)
+
+    def fg(self, color):  # Set foreground color
+        self.pixel(1, 0, color)
+
+    def bg(self, color):
+        self.pixel(0, 0, color)
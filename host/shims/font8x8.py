@@ -0,0 +1,42 @@
+# Reduced 8x8 font for the host framebuf stand-in.
+# Glyphs are drawn in the spirit of MicroPython's font_petme128_8x8 and are
+# stored column-major, LSB at the top, like the firmware font. Only the
+# characters the clock face prints are defined; anything else renders as a
+# hollow box so missing glyphs stay visible in golden frames.
+
+_ROWS = {
+    " ": ("", "", "", "", "", "", "", ""),
+    "0": (" xxx ", "x   x", "x  xx", "x x x", "xx  x", "x   x", " xxx ", ""),
+    "1": ("  x  ", " xx  ", "  x  ", "  x  ", "  x  ", "  x  ", " xxx ", ""),
+    "2": (" xxx ", "x   x", "    x", "   x ", "  x  ", " x   ", "xxxxx", ""),
+    "3": ("xxxxx", "   x ", "  x  ", "   x ", "    x", "x   x", " xxx ", ""),
+    "4": ("   x ", "  xx ", " x x ", "x  x ", "xxxxx", "   x ", "   x ", ""),
+    "5": ("xxxxx", "x    ", "xxxx ", "    x", "    x", "x   x", " xxx ", ""),
+    "6": ("  xx ", " x   ", "x    ", "xxxx ", "x   x", "x   x", " xxx ", ""),
+    "7": ("xxxxx", "    x", "   x ", "  x  ", " x   ", " x   ", " x   ", ""),
+    "8": (" xxx ", "x   x", "x   x", " xxx ", "x   x", "x   x", " xxx ", ""),
+    "9": (" xxx ", "x   x", "x   x", " xxxx", "    x", "   x ", " xx  ", ""),
+    "/": ("     ", "    x", "   x ", "  x  ", " x   ", "x    ", "     ", ""),
+    "-": ("     ", "     ", "     ", "xxxxx", "     ", "     ", "     ", ""),
+    ".": ("     ", "     ", "     ", "     ", "     ", " xx  ", " xx  ", ""),
+    ":": ("     ", " xx  ", " xx  ", "     ", " xx  ", " xx  ", "     ", ""),
+    "C": (" xxx ", "x   x", "x    ", "x    ", "x    ", "x   x", " xxx ", ""),
+}
+_BOX = ("xxxxxx", "x    x", "x    x", "x    x", "x    x", "x    x", "xxxxxx", "")
+
+
+def _pack(rows):
+    cols = bytearray(8)
+    for y, row in enumerate(rows):
+        for x, ch in enumerate(row):
+            if ch == "x":
+                cols[x + 1] |= 1 << y
+    return bytes(cols)
+
+
+_GLYPHS = {k: _pack(v) for k, v in _ROWS.items()}
+_MISSING = _pack(_BOX)
+
+
+def glyph(ch):
+    return _GLYPHS.get(ch, _MISSING)
@@ -0,0 +1,222 @@
+# Pure Python stand-in for MicroPython's framebuf module.
+# Supports the formats used by the clock (GS4_HMSB, MONO_HLSB, RGB565) and
+# counts calls per drawing method so benchmarks can report them.
+
+MONO_VLSB = 0
+MONO_HLSB = 3
+MONO_HMSB = 4
+RGB565 = 1
+GS2_HMSB = 5
+GS4_HMSB = 2
+GS8 = 6
+
+calls = {}
+
+
+def _count(name):
+    calls[name] = calls.get(name, 0) + 1
+
+
+def reset_counts():
+    calls.clear()
+
+
+class FrameBuffer:
+    def __init__(self, buf, width, height, format, stride=None):
+        self._fb_buf = memoryview(buf).cast("B") if not isinstance(buf, memoryview) else buf.cast("B")
+        self._fb_w = width
+        self._fb_h = height
+        self._fb_fmt = format
+        if stride is None:
+            stride = width
+        if format == MONO_HLSB or format == MONO_HMSB:
+            stride = (stride + 7) & ~7
+        elif format == GS2_HMSB:
+            stride = (stride + 3) & ~3
+        elif format == GS4_HMSB:
+            stride = (stride + 1) & ~1
+        self._fb_stride = stride
+
+    # Raw accessors
+    def _get(self, x, y):
+        b = self._fb_buf
+        f = self._fb_fmt
+        if f == GS4_HMSB:
+            i = (x + y * self._fb_stride) >> 1
+            return (b[i] >> 4) if not x & 1 else (b[i] & 0x0F)
+        if f == MONO_HLSB:
+            i = (x + y * self._fb_stride) >> 3
+            return (b[i] >> (7 - (x & 7))) & 1
+        if f == MONO_HMSB:
+            i = (x + y * self._fb_stride) >> 3
+            return (b[i] >> (x & 7)) & 1
+        if f == MONO_VLSB:
+            i = (y >> 3) * self._fb_stride + x
+            return (b[i] >> (y & 7)) & 1
+        if f == RGB565:
+            i = (x + y * self._fb_stride) * 2
+            return b[i] | (b[i + 1] << 8)
+        if f == GS8:
+            return b[x + y * self._fb_stride]
+        if f == GS2_HMSB:
+            i = (x + y * self._fb_stride) >> 2
+            return (b[i] >> ((x & 3) << 1)) & 3
+        raise ValueError("format")
+
+    def _set(self, x, y, c):
+        b = self._fb_buf
+        f = self._fb_fmt
+        if f == GS4_HMSB:
+            i = (x + y * self._fb_stride) >> 1
+            c &= 0x0F
+            if x & 1:
+                b[i] = (b[i] & 0xF0) | c
+            else:
+                b[i] = (b[i] & 0x0F) | (c << 4)
+        elif f == MONO_HLSB:
+            i = (x + y * self._fb_stride) >> 3
+            m = 0x80 >> (x & 7)
+            b[i] = (b[i] | m) if c & 1 else (b[i] & ~m & 0xFF)
+        elif f == MONO_HMSB:
+            i = (x + y * self._fb_stride) >> 3
+            m = 1 << (x & 7)
+            b[i] = (b[i] | m) if c & 1 else (b[i] & ~m & 0xFF)
+        elif f == MONO_VLSB:
+            i = (y >> 3) * self._fb_stride + x
+            m = 1 << (y & 7)
+            b[i] = (b[i] | m) if c & 1 else (b[i] & ~m & 0xFF)
+        elif f == RGB565:
+            i = (x + y * self._fb_stride) * 2
+            b[i] = c & 0xFF
+            b[i + 1] = (c >> 8) & 0xFF
+        elif f == GS8:
+            b[x + y * self._fb_stride] = c & 0xFF
+        elif f == GS2_HMSB:
+            i = (x + y * self._fb_stride) >> 2
+            s = (x & 3) << 1
+            b[i] = (b[i] & ~(3 << s) & 0xFF) | ((c & 3) << s)
+
+    def _rect(self, x, y, w, h, c):
+        if w < 1 or h < 1 or x + w <= 0 or y + h <= 0 or y >= self._fb_h or x >= self._fb_w:
+            return
+        x0 = max(x, 0)
+        y0 = max(y, 0)
+        x1 = min(x + w, self._fb_w)
+        y1 = min(y + h, self._fb_h)
+        for yy in range(y0, y1):
+            for xx in range(x0, x1):
+                self._set(xx, yy, c)
+
+    # Public API
+    def fill(self, c):
+        _count("fill")
+        b = self._fb_buf
+        f = self._fb_fmt
+        if f == GS4_HMSB:
+            v = (c & 0x0F) * 0x11
+            b[:] = bytes([v]) * len(b)
+        elif f == RGB565:
+            b[:] = bytes([c & 0xFF, (c >> 8) & 0xFF]) * (len(b) // 2)
+        else:
+            self._rect(0, 0, self._fb_w, self._fb_h, c)
+
+    def pixel(self, x, y, c=None):
+        _count("pixel")
+        if 0 <= x < self._fb_w and 0 <= y < self._fb_h:
+            if c is None:
+                return self._get(x, y)
+            self._set(x, y, c)
+
+    def hline(self, x, y, w, c):
+        _count("hline")
+        self._rect(x, y, w, 1, c)
+
+    def vline(self, x, y, h, c):
+        _count("vline")
+        self._rect(x, y, 1, h, c)
+
+    def fill_rect(self, x, y, w, h, c):
+        _count("fill_rect")
+        self._rect(x, y, w, h, c)
+
+    def rect(self, x, y, w, h, c, f=False):
+        _count("rect")
+        if f:
+            self._rect(x, y, w, h, c)
+        else:
+            self._rect(x, y, w, 1, c)
+            self._rect(x, y + h - 1, w, 1, c)
+            self._rect(x, y, 1, h, c)
+            self._rect(x + w - 1, y, 1, h, c)
+
+    def line(self, x1, y1, x2, y2, c):
+        _count("line")
+        # Bresenham, as in extmod/modframebuf.c
+        dx = x2 - x1
+        if dx > 0:
+            sx = 1
+        else:
+            dx = -dx
+            sx = -1
+        dy = y2 - y1
+        if dy > 0:
+            sy = 1
+        else:
+            dy = -dy
+            sy = -1
+        steep = False
+        if dy > dx:
+            x1, y1 = y1, x1
+            dx, dy = dy, dx
+            sx, sy = sy, sx
+            steep = True
+        e = 2 * dy - dx
+        for _ in range(dx):
+            if steep:
+                if 0 <= y1 < self._fb_w and 0 <= x1 < self._fb_h:
+                    self._set(y1, x1, c)
+            elif 0 <= x1 < self._fb_w and 0 <= y1 < self._fb_h:
+                self._set(x1, y1, c)
+            while e >= 0:
+                y1 += sy
+                e -= 2 * dx
+            x1 += sx
+            e += 2 * dy
+        if 0 <= x2 < self._fb_w and 0 <= y2 < self._fb_h:
+            self._set(x2, y2, c)
+
+    def text(self, s, x0, y0, c=1):
+        _count("text")
+        from font8x8 import glyph
+
+        for ch in s:
+            cols = glyph(ch)
+            for j in range(8):
+                bits = cols[j]
+                xx = x0 + j
+                if 0 <= xx < self._fb_w:
+                    for i in range(8):
+                        if bits >> i & 1:
+                            yy = y0 + i
+                            if 0 <= yy < self._fb_h:
+                                self._set(xx, yy, c)
+            x0 += 8
+
+    def blit(self, fb, x, y, key=-1, palette=None):
+        _count("blit")
+        for j in range(fb._fb_h):
+            yy = y + j
+            if not 0 <= yy < self._fb_h:
+                continue
+            for i in range(fb._fb_w):
+                xx = x + i
+                if not 0 <= xx < self._fb_w:
+                    continue
+                c = fb._get(i, j)
+                if palette is not None:
+                    c = palette._get(c, 0)
+                if c != key:
+                    self._set(xx, yy, c)
+
+    def scroll(self, xstep, ystep):
+        raise NotImplementedError
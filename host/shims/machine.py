@@ -0,0 +1,178 @@
+# Stand-in for the MicroPython `machine` module.
+# Pins are recorded by id so the fake SPI bus can see the panel's DC and CS
+# lines; SPI writes are forwarded to the attached Panel model.
+import time as _time
+
+pins = {}
+panel = None  # Set by the harness
+sleeps = []  # (kind, ms) for each lightsleep/deepsleep request
+
+PWRON_RESET = 1
+HARD_RESET = 2
+WDT_RESET = 3
+DEEPSLEEP_RESET = 4
+SOFT_RESET = 5
+_reset_cause = PWRON_RESET
+
+
+class Pin:
+    IN = 1
+    OUT = 3
+    OPEN_DRAIN = 7
+    PULL_UP = 2
+    PULL_DOWN = 1
+    IRQ_RISING = 1
+    IRQ_FALLING = 2
+
+    def __new__(cls, id, *args, **kwargs):
+        p = pins.get(id)
+        if p is None:
+            p = object.__new__(cls)
+            p._id = id
+            p._v = 0
+            p._hold = False
+            pins[id] = p
+        return p
+
+    def __init__(self, id, mode=-1, pull=-1, value=None, hold=None, **kwargs):
+        self.init(mode, pull, value=value, hold=hold)
+
+    def init(self, mode=-1, pull=-1, value=None, hold=None, **kwargs):
+        if value is not None:
+            self.value(value)
+        if hold is not None:
+            self._hold = hold
+
+    def value(self, v=None):
+        if v is None:
+            return self._v
+        v = 1 if v else 0
+        if panel is not None and panel.rst is self and self._v and not v:
+            panel.hw_reset()
+        self._v = v
+
+    __call__ = value
+
+    def on(self):
+        self.value(1)
+
+    def off(self):
+        self.value(0)
+
+    def irq(self, *args, **kwargs):
+        return None
+
+    def __repr__(self):
+        return "Pin(%d)" % self._id
+
+
+class SPI:
+    def __init__(self, id=0, baudrate=1_000_000, *args, **kwargs):
+        self.baudrate = baudrate
+
+    def init(self, baudrate=None, **kwargs):
+        if baudrate:
+            self.baudrate = baudrate
+
+    def deinit(self):
+        pass
+
+    def write(self, buf):
+        if panel is not None:
+            panel.write(buf)
+
+    def read(self, n, write=0):
+        return bytes(n)
+
+
+class PWM:
+    def __init__(self, pin, freq=1000, duty_u16=None, **kwargs):
+        self.pin = pin
+        self._freq = freq
+        self._duty = 0
+        if duty_u16 is not None:
+            self.duty_u16(duty_u16)
+
+    def freq(self, f=None):
+        if f is None:
+            return self._freq
+        self._freq = f
+
+    def duty_u16(self, d=None):
+        if d is None:
+            return self._duty
+        self._duty = d
+        self.pin._v = 1 if d else 0
+
+    def deinit(self):
+        pass
+
+
+_rtc_mem = bytearray()
+_rtc_offset = 0
+
+
+class RTC:
+    def __init__(self, id=0):
+        pass
+
+    def datetime(self, dt=None):
+        global _rtc_offset
+        if dt is None:
+            t = _time.gmtime(_time.time())
+            return (t[0], t[1], t[2], t[6], t[3], t[4], t[5], 0)
+        # (year, month, day, weekday, hours, minutes, seconds, subseconds)
+        import calendar
+
+        _rtc_offset += calendar.timegm((dt[0], dt[1], dt[2], dt[4], dt[5], dt[6], 0, 0, 0)) - 946684800 - _time.time()
+
+    def memory(self, data=None):
+        global _rtc_mem
+        if data is None:
+            return bytes(_rtc_mem)
+        _rtc_mem = bytearray(data)
+
+
+def reset_cause():
+    return _reset_cause
+
+
+def freq(f=None):
+    return 240_000_000
+
+
+def unique_id():
+    return b"\x24\x6f\x28\x00\x00\x01"
+
+
+def idle():
+    pass
+
+
+class SleepExit(BaseException):
+    # Raised by deepsleep() and the last allowed lightsleep(): ends the run
+    # the way a reset would. Not an Exception, so main()'s handler lets it by.
+    pass
+
+
+sleep_limit = 1  # The harness ends the run at this many sleeps
+
+
+def lightsleep(ms=None):
+    sleeps.append(("light", ms))
+    if len(sleeps) >= sleep_limit:
+        raise SleepExit(ms)
+    _time.sleep_ms(ms or 0)  # Advances the harness clock
+
+
+def deepsleep(ms=None):
+    sleeps.append(("deep", ms))
+    raise SleepExit(ms)
+
+
+def reset():
+    raise SleepExit(None)
+
+
+def soft_reset():
+    raise SleepExit(None)
@@ -0,0 +1,92 @@
+# Stand-in for the MicroPython `micropython` module under CPython.
+# Viper functions run as plain Python: pointer-annotated arguments are
+# wrapped so indexing reads and writes machine words like viper does.
+import builtins
+
+
+def const(x):
+    return x
+
+
+def native(f):
+    return f
+
+
+def opt_level(level=None):
+    return 3
+
+
+def mem_info(verbose=False):
+    print("mem: host")
+
+
+def alloc_emergency_exception_buf(size):
+    pass
+
+
+def schedule(func, arg):
+    func(arg)
+
+
+class _Ptr:
+    _size = 1
+    _fmt = "B"
+
+    def __init__(self, buf):
+        if isinstance(buf, _Ptr):
+            buf = buf._mv
+        mv = memoryview(buf)
+        if mv.format != "B" or mv.ndim != 1:
+            mv = mv.cast("B")
+        n = len(mv) - len(mv) % self._size
+        self._mv = mv
+        self._w = mv[:n].cast(self._fmt) if self._size > 1 else mv
+        self._mask = (1 << (8 * self._size)) - 1
+
+    def __getitem__(self, i):
+        return self._w[i]
+
+    def __setitem__(self, i, v):
+        self._w[i] = v & self._mask
+
+
+class ptr8(_Ptr):
+    _size = 1
+    _fmt = "B"
+
+
+class ptr16(_Ptr):
+    _size = 2
+    _fmt = "H"
+
+
+class ptr32(_Ptr):
+    _size = 4
+    _fmt = "I"
+
+
+class uint(int):
+    pass
+
+
+builtins.ptr8 = ptr8
+builtins.ptr16 = ptr16
+builtins.ptr32 = ptr32
+builtins.uint = uint
+
+
+def viper(f):
+    ann = getattr(f, "__annotations__", {})
+    names = f.__code__.co_varnames[: f.__code__.co_argcount]
+    wrap = [(i, ann[n]) for i, n in enumerate(names) if n in ann and isinstance(ann[n], type) and issubclass(ann[n], _Ptr)]
+
+    def call(*args):
+        if wrap:
+            args = list(args)
+            for i, t in wrap:
+                if i < len(args):
+                    args[i] = t(args[i])
+        return f(*args)
+
+    call.__name__ = f.__name__
+    return call
@@ -0,0 +1,72 @@
+# Stand-in for the MicroPython `network` module.
+STA_IF = 0
+AP_IF = 1
+STAT_IDLE = 1000
+STAT_CONNECTING = 1001
+STAT_GOT_IP = 1010
+STAT_WRONG_PASSWORD = 202
+STAT_NO_AP_FOUND = 201
+
+reachable = True  # Harness switch: can the access point be joined?
+connects = []  # kwargs of each connect() call
+
+
+class WLAN:
+    _instances = {}
+
+    def __new__(cls, interface=STA_IF):
+        w = cls._instances.get(interface)
+        if w is None:
+            w = object.__new__(cls)
+            w._active = False
+            w._connected = False
+            w._ifconfig = ("0.0.0.0", "0.0.0.0", "0.0.0.0", "0.0.0.0")
+            w._static = None
+            w._config = {"mac": b"\x24\x6f\x28\x00\x00\x01", "channel": 6, "ssid": ""}
+            cls._instances[interface] = w
+        return w
+
+    def active(self, a=None):
+        if a is None:
+            return self._active
+        self._active = bool(a)
+        if not a:
+            self._connected = False
+
+    def connect(self, ssid=None, key=None, *, bssid=None):
+        connects.append({"ssid": ssid, "bssid": bssid, "static": self._static is not None})
+        self._config["ssid"] = ssid
+        self._connected = reachable and self._active
+        if self._connected:
+            self._ifconfig = self._static or ("192.168.1.42", "255.255.255.0", "192.168.1.1", "192.168.1.1")
+
+    def disconnect(self):
+        self._connected = False
+
+    def isconnected(self):
+        return self._connected
+
+    def status(self, param=None):
+        if param == "rssi":
+            return -58
+        if self._connected:
+            return STAT_GOT_IP
+        return STAT_NO_AP_FOUND if self._active else STAT_IDLE
+
+    def ifconfig(self, cfg=None):
+        if cfg is None:
+            return self._ifconfig
+        self._static = None if cfg == "dhcp" else tuple(cfg)
+
+    def ipconfig(self, *args, **kwargs):
+        return None
+
+    def config(self, *args, **kwargs):
+        if args:
+            if args[0] == "bssid":
+                return b"\xaa\xbb\xcc\x00\x11\x22"
+            return self._config.get(args[0])
+        self._config.update(kwargs)
+
+    def scan(self):
+        return [(b"clock", b"\xaa\xbb\xcc\x00\x11\x22", 6, -58, 3, False)]
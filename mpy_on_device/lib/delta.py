@@ -0,0 +1,137 @@
+# delta.py Frame updates as changed rectangles of the 4-bit frame buffer.
+
+# The edge service (host/edge.py) renders the face itself and sends a clock
+# only what differs from the frame the clock already shows. An update is
+#   header  <4sHHH   magic b"WCD1", width, height, number of rectangles
+# and per rectangle
+#   <HHHHH           x and width in bytes (2 pixels each), y and height in
+#                    lines, length of the coded data that follows
+# with the rectangle's rows PackBits coded as in snapshot.py. apply() decodes
+# the rows straight into the frame buffer and marks them for show_dirty(), so
+# the clock neither parses nor draws anything. encode() runs on the host.
+
+import struct
+
+MAGIC = b"WCD1"
+_HDR = "<4sHHH"
+_RECT = "<HHHHH"
+_GAP = 8  # Unchanged bytes allowed inside a rectangle's row before splitting it
+
+
+# Decode n bytes of src into a rectangle of w bytes by size // w rows of
+# dest, the first at start and each stride bytes after the one before.
+# Returns the bytes decoded, -1 if the data would overrun either buffer.
+@micropython.viper
+def _unpack(dest: ptr8, src: ptr8, n: int, start: int, w: int, size: int, stride: int) -> int:
+    i: int = 0
+    o: int = 0
+    d: int = start
+    col: int = 0
+    h: int = 0
+    e: int = 0
+    c: int = 0
+    while i < n:
+        h = src[i]
+        i += 1
+        if h < 128:
+            e = o + h + 1
+            if e > size or i + h + 1 > n:
+                return -1
+        elif h > 128:
+            e = o + 257 - h
+            if e > size or i >= n:
+                return -1
+            c = src[i]
+            i += 1
+        else:
+            continue
+        while o < e:
+            if h < 128:
+                c = src[i]
+                i += 1
+            dest[d] = c
+            o += 1
+            d += 1
+            col += 1
+            if col == w:
+                col = 0
+                d += stride - w
+    return o
+
+
+# Apply an update to tft's frame buffer. Returns the number of rectangles.
+# Raises ValueError if data is not an update for this frame size; the frame
+# buffer may then be partly updated.
+def apply(tft, data):
+    hlen = struct.calcsize(_HDR)
+    rlen = struct.calcsize(_RECT)
+    if len(data) < hlen:
+        raise ValueError("update size")
+    magic, width, height, count = struct.unpack_from(_HDR, data)
+    if magic != MAGIC or width != tft.width or height != tft.height:
+        raise ValueError("update header")
+    wd = width // 2
+    mvb = tft.mvb
+    mv = memoryview(data)
+    o = hlen
+    for _ in range(count):
+        if o + rlen > len(data):
+            raise ValueError("update size")
+        x, y, w, h, n = struct.unpack_from(_RECT, data, o)
+        o += rlen
+        if not w or x + w > wd or y + h > height or o + n > len(data):
+            raise ValueError("update rectangle")
+        if _unpack(mvb, mv[o:], n, y * wd + x, w, w * h, wd) != w * h:
+            raise ValueError("update data")
+        tft.mark(2 * x, y, 2 * w, h)
+        o += n
+    return count
+
+
+# Rectangles (x, y, w, h), in bytes and lines, covering every byte in which
+# the frames differ. Rows changing in overlapping columns share a rectangle.
+def rects(old, new, wd, height):
+    out = []
+    cur = None  # [x0, y0, x1, y1], x1 exclusive
+    for y in range(height):
+        a = y * wd
+        x0 = 0
+        while x0 < wd and old[a + x0] == new[a + x0]:
+            x0 += 1
+        if x0 == wd:
+            cur = None
+            continue
+        x1 = wd
+        while old[a + x1 - 1] == new[a + x1 - 1]:
+            x1 -= 1
+        if cur is not None and x0 < cur[2] + _GAP and x1 > cur[0] - _GAP:
+            cur[0] = min(cur[0], x0)
+            cur[2] = max(cur[2], x1)
+            cur[3] = y + 1
+        else:
+            cur = [x0, y, x1, y + 1]
+            out.append(cur)
+    return [(x0, y0, x1 - x0, y1 - y0) for x0, y0, x1, y1 in out]
+
+
+# Update from frame old to frame new (bytes of the frame buffer). Without
+# old the update covers the whole frame.
+def encode(old, new, width, height):
+    import snapshot
+
+    wd = width // 2
+    if old is None:
+        rs = [(0, 0, wd, height)]
+    else:
+        rs = rects(old, new, wd, height)
+    out = [struct.pack(_HDR, MAGIC, width, height, len(rs))]
+    for x, y, w, h in rs:
+        rows = bytearray(w * h)
+        for r in range(h):
+            a = (y + r) * wd + x
+            rows[r * w : (r + 1) * w] = new[a : a + w]
+        buf = bytearray(len(rows) + len(rows) // 128 + 1)
+        n = snapshot._pack(buf, rows, 0, len(rows))
+        out.append(struct.pack(_RECT, x, y, w, h, n))
+        out.append(bytes(buf[:n]))
+    return b"".join(out)
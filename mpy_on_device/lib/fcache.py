@@ -0,0 +1,115 @@
+# fcache.py Forecast cache on flash with HTTP validators.
+
+# Each source keeps one small JSON record: the values extracted from its last
+# good response, when it was fetched and how long the server said it stays
+# valid, plus the Last-Modified validator. A reset or wake from deep sleep
+# therefore starts from the stored values, skips the request while they are
+# fresh and otherwise sends If-Modified-Since, so an unchanged forecast costs
+# a 304 with no body instead of a full download.
+# Freshness uses the server's own Expires - Date, so it does not depend on the
+# device clock being set. Ages are measured with time.time(); a record that
+# looks like it comes from the future (clock reset) counts as stale.
+
+import json
+import time
+
+_MONTHS = "JanFebMarAprMayJunJulAugSepOctNovDec"
+
+
+def _days(y, m, d):
+    if m < 3:
+        y -= 1
+        m += 12
+    return 365 * y + y // 4 - y // 100 + y // 400 + (153 * (m - 3) + 2) // 5 + d
+
+
+_EPOCH = _days(2000, 1, 1)
+
+
+# Seconds since 2000-01-01 (the MicroPython epoch) for an HTTP date such as
+# "Sat, 14 Jun 2025 09:49:12 GMT", or None if it cannot be parsed.
+def http_time(s):
+    try:
+        _, d, mon, y, hms, _ = s.split()
+        h, m, sec = hms.split(":")
+        days = _days(int(y), _MONTHS.index(mon) // 3 + 1, int(d)) - _EPOCH
+        return days * 86400 + int(h) * 3600 + int(m) * 60 + int(sec)
+    except (AttributeError, ValueError):
+        return None
+
+
+class Entry:
+    # key identifies the request (e.g. the location); a stored record with a
+    # different key is ignored. hourly data (a forecast starting at the
+    # current hour) also goes stale at the next hour boundary, but never
+    # before the server's Expires.
+    def __init__(self, path, key="", hourly=False):
+        self.path = path
+        self.key = key
+        self.hourly = hourly
+        self.data = None  # Extracted values, JSON types only
+        self.last_modified = None
+        self.fetched = 0  # time.time() of the last 200 or 304
+        self.max_age = 0  # Seconds the server allows the data to be reused
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                rec = json.load(f)
+            if rec.get("key") != self.key:
+                return
+            self.data = rec["data"]
+            self.last_modified = rec.get("last_modified")
+            self.fetched = rec.get("fetched", 0)
+            self.max_age = rec.get("max_age", 0)
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+    def _save(self):
+        rec = {
+            "key": self.key,
+            "data": self.data,
+            "last_modified": self.last_modified,
+            "fetched": self.fetched,
+            "max_age": self.max_age,
+        }
+        try:
+            with open(self.path, "w") as f:
+                json.dump(rec, f)
+        except OSError as e:
+            print(f"Could not write {self.path}: {e}")
+
+    # time.time() from which the stored data should be revalidated: after
+    # min_interval (or the hour boundary) but not before Expires.
+    def stale_at(self, min_interval):
+        if self.data is None:
+            return 0
+        t = self.fetched + min_interval
+        if self.hourly:
+            t = min(t, self.fetched - self.fetched % 3600 + 3600)
+        return max(t, self.fetched + self.max_age)
+
+    # True while the stored data may be used without asking the server.
+    def fresh(self, min_interval):
+        return self.fetched <= time.time() < self.stale_at(min_interval)
+
+    # Request headers with If-Modified-Since added when there is data to
+    # fall back on.
+    def request_headers(self, headers=None):
+        headers = dict(headers) if headers else {}
+        if self.data is not None and self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    # Record a 200 (with its new data) or a 304 (data=None keeps the stored
+    # copy) using the response's lower case headers.
+    def update(self, headers, data=None):
+        if data is not None:
+            self.data = data
+            self.last_modified = headers.get("last-modified")
+        self.fetched = time.time()
+        date = http_time(headers.get("date"))
+        expires = http_time(headers.get("expires"))
+        self.max_age = expires - date if date is not None and expires is not None and expires > date else 0
+        self._save()
@@ -0,0 +1,172 @@
+# forecast.py What the face shows, extracted from the forecast APIs.
+
+# Shared by the clock and the edge service (host/edge.py), so both pick the
+# same values out of the met.no and currentuvindex.com documents. The
+# extractors take (path, value) callbacks as jstream.Scanner delivers them.
+# The edge service sends the result as one fixed-layout record:
+#   magic         4s  b"WCF1"
+#   min, max      2h  temperature in tenths of a degree, NO_TEMP if unknown
+#   symbols       3B  icon slots, base symbol | variant << 6, NO_SYMBOL if none
+#   hourly UV    10B  7 AM to 4 PM local time, NO_UV if unknown
+# 21 bytes in place of the two documents.
+
+import struct
+
+# Parts of the locationforecast/compact document we use (None = any index)
+YR_PATHS = (
+    ("properties", "timeseries", None, "data", "instant", "details", "air_temperature"),
+    ("properties", "timeseries", None, "data", "next_1_hours", "summary", "symbol_code"),
+    ("properties", "timeseries", None, "data", "next_6_hours", "summary", "symbol_code"),
+)
+YR_WINDOW_HOURS = 24  # Min/max temperature over the first 24 timeseries entries
+YR_ICON_INDICES = (0, 6, 12)  # Timeseries entries for the 3 icons
+
+# Parts of the currentuvindex.com response we use
+UV_PATHS = (
+    ("forecast", None, "time"),
+    ("forecast", None, "uvi"),
+)
+UV_FIRST_HOUR = 7  # Local hour of the first ring slot
+UV_HOURS = 10
+
+
+class YrExtract:
+    def __init__(self):
+        self.temps = []
+        self.symbols = {}  # (timeseries index, 'next_1_hours'/'next_6_hours') -> symbol_code
+
+    # Only the window is needed: returns True to stop reading after it.
+    def on_value(self, path, value):
+        ts_idx = path[2]
+        if ts_idx >= YR_WINDOW_HOURS:
+            return True
+        if path[4] == "instant":
+            self.temps.append(value)
+        elif ts_idx in YR_ICON_INDICES:
+            self.symbols[(ts_idx, path[4])] = value
+
+    # min_temp and max_temp are None without temperatures, a symbol None
+    # where the slot has no symbol_code.
+    def result(self):
+        temps = self.temps
+        symbols = []
+        for i, ts_idx in enumerate(YR_ICON_INDICES):
+            code = self.symbols.get((ts_idx, "next_1_hours"))
+            if code is None and i == 0:  # next_6_hours for the first slot
+                code = self.symbols.get((ts_idx, "next_6_hours"))
+            symbols.append(code or None)
+        return {
+            "min_temp": min(temps) if temps else None,
+            "max_temp": max(temps) if temps else None,
+            "symbols": symbols,
+        }
+
+
+class UvExtract:
+    def __init__(self):
+        self.entries = {}  # Forecast index -> {'time': ..., 'uvi': ...}
+        self.filled = 0  # Slots the last result() found values for
+
+    def on_value(self, path, value):
+        self.entries.setdefault(path[1], {})[path[2]] = value
+
+    # UV index per hour from UV_FIRST_HOUR local time, utc_offset hours from
+    # UTC, or None if no entry falls in that window. Hours in the window
+    # without an entry are 0.
+    def result(self, utc_offset):
+        slots = [-1] * UV_HOURS
+        self.filled = 0
+        for _, entry in sorted(self.entries.items()):
+            try:
+                utc_hour = int(entry.get("time", "").split("T")[1].split(":")[0])
+                i = (utc_hour + utc_offset) % 24 - UV_FIRST_HOUR
+                if 0 <= i < UV_HOURS and slots[i] == -1:  # First entry per hour
+                    slots[i] = max(0, int(round(float(entry.get("uvi", 0.0)))))
+                    self.filled += 1
+            except (IndexError, ValueError, TypeError):
+                pass
+        if not self.filled:
+            return None
+        return [v if v != -1 else 0 for v in slots]
+
+
+# --- Binary record ---
+MAGIC = b"WCF1"
+_FMT = "<4shh3B10B"
+RECORD_SIZE = struct.calcsize(_FMT)
+NO_TEMP = -32768
+NO_SYMBOL = 255
+OTHER_SYMBOL = 254  # A code not in SYMBOLS
+NO_UV = 255
+
+# met.no symbol codes without their _day/_night/_polartwilight suffix. The
+# order is part of the record format: append only.
+SYMBOLS = (
+    "clearsky", "cloudy", "fair", "fog", "heavyrain", "heavyrainandthunder",
+    "heavyrainshowers", "heavyrainshowersandthunder", "heavysleet",
+    "heavysleetandthunder", "heavysleetshowers", "heavysleetshowersandthunder",
+    "heavysnow", "heavysnowandthunder", "heavysnowshowers",
+    "heavysnowshowersandthunder", "lightrain", "lightrainandthunder",
+    "lightrainshowers", "lightrainshowersandthunder", "lightsleet",
+    "lightsleetandthunder", "lightsleetshowers", "lightsnow",
+    "lightsnowandthunder", "lightsnowshowers", "lightssleetshowersandthunder",
+    "lightssnowshowersandthunder", "partlycloudy", "rain", "rainandthunder",
+    "rainshowers", "rainshowersandthunder", "sleet", "sleetandthunder",
+    "sleetshowers", "sleetshowersandthunder", "snow", "snowandthunder",
+    "snowshowers", "snowshowersandthunder",
+)
+_VARIANTS = ("", "_day", "_night", "_polartwilight")
+
+
+def _symbol_id(code):
+    if code is None:
+        return NO_SYMBOL
+    base, v = code, 0
+    for i in range(1, len(_VARIANTS)):
+        if code.endswith(_VARIANTS[i]):
+            base, v = code[: -len(_VARIANTS[i])], i
+            break
+    try:
+        return SYMBOLS.index(base) | v << 6
+    except ValueError:
+        return OTHER_SYMBOL
+
+
+def _symbol_code(n):
+    if n == NO_SYMBOL:
+        return None
+    if n == OTHER_SYMBOL or n & 0x3F >= len(SYMBOLS):
+        return "unknown"
+    return SYMBOLS[n & 0x3F] + _VARIANTS[n >> 6]
+
+
+def _tenths(t):
+    return NO_TEMP if t is None else max(-32767, min(32767, round(t * 10)))
+
+
+# yr as from YrExtract.result() (or None), uv as from UvExtract.result().
+def pack(yr, uv):
+    yr = yr or {}
+    symbols = (list(yr.get("symbols") or ()) + [None] * 3)[:3]
+    fields = [_symbol_id(c) for c in symbols]
+    fields += [min(v, NO_UV - 1) for v in uv] if uv else [NO_UV] * UV_HOURS
+    return struct.pack(_FMT, MAGIC, _tenths(yr.get("min_temp")), _tenths(yr.get("max_temp")), *fields)
+
+
+# Inverse of pack(): (yr, uv), with uv None if the record has no UV values.
+# Raises ValueError for anything that is not a record.
+def unpack(buf):
+    if len(buf) != RECORD_SIZE:
+        raise ValueError("record size")
+    v = struct.unpack(_FMT, buf)
+    if v[0] != MAGIC:
+        raise ValueError("record magic")
+    yr = {
+        "min_temp": None if v[1] == NO_TEMP else v[1] / 10,
+        "max_temp": None if v[2] == NO_TEMP else v[2] / 10,
+        "symbols": [_symbol_code(n) for n in v[3:6]],
+    }
+    uv = list(v[6:])
+    if NO_UV in uv:
+        uv = None
+    return yr, uv
@@ -4,7 +4,7 @@
 # Copyright (c) Peter Hinch 2024
 # Released under the MIT license see LICENSE
 
-from time import sleep_ms
+from time import sleep_ms, ticks_us, ticks_diff
 import gc
 import framebuf
 import asyncio
@@ -22,28 +22,160 @@ from drivers.boolpalette import BoolPalette
 
 # Output RGB565 format, 16 bit/pixel:
 # g4 g3 g2 b7  b6 b5 b4 b3  r7 r6 r5 r4  r3 g7 g6 g5
-# Portrait mode. ~70μs on RP2 at standard clock.
+# Each source byte holds two 4-bit pixels, first pixel in the high nibble.
+# A 256-entry table maps a whole byte to both output pixels as one 32-bit
+# word, first pixel in the low half so it is sent first on a little endian
+# CPU. The table is built from GC9A01.lut or from the fixed greyscale ramp.
 @micropython.viper
-def _lcopy(dest: ptr16, source: ptr8, lut: ptr16, length: int, gscale: bool):
+def _pairs(dest: ptr32, lut: ptr16, gscale: bool):
+    c: int = 0
+    p: int = 0
+    q: int = 0
+    while c < 256:
+        p = c >> 4
+        q = c & 0x0F
+        if gscale:
+            p = p >> 1 | p << 4 | p << 9 | ((p & 0x01) << 15)
+            q = q >> 1 | q << 4 | q << 9 | ((q & 0x01) << 15)
+        else:
+            p = lut[p]
+            q = lut[q]
+        dest[c] = p | (q << 16)
+        c += 1
+
+
+# Convert rows of n source bytes, stride bytes apart from offset start, into
+# consecutive pixel pairs. One call covers a batch of lines or window rows.
+@micropython.viper
+def _pcopy(dest: ptr32, source: ptr8, pairs: ptr32, start: int, n: int, rows: int, stride: int):
+    d: int = 0
+    s: int = 0
+    e: int = 0
+    while rows:
+        s = start
+        e = start + n
+        while s < e:
+            dest[d] = pairs[source[s]]
+            d += 1
+            s += 1
+        start += stride
+        rows -= 1
+
+
+# Dirty tracking divides the frame into tiles 16 pixels wide (tbytes: 8 bytes
+# in GS4, 32 in RGB565) and 8 lines high. Each tile gets a Fletcher style
+# checksum: for up to 256 bytes the sums cannot overflow 32 bits. Tiles at
+# the right and bottom edges may be partial.
+@micropython.viper
+def _tsums(dest: ptr32, source: ptr8, bwidth: int, height: int, tbytes: int):
+    t: int = 0
+    row: int = 0
+    rows: int = 0
+    tx: int = 0
+    cols: int = 0
+    a: int = 0
+    b: int = 0
+    r: int = 0
+    p: int = 0
     n: int = 0
-    x: int = 0
-    while length:
-        c = source[x]  # Source byte holds two 4-bit colors
-        p = c >> 4  # current pixel
-        q = c & 0x0F  # next pixel
-        if gscale:  # Treat as greyscale
-            dest[n] = p >> 1 | p << 4 | p << 9 | ((p & 0x01) << 15)
-            n += 1
-            dest[n] = q >> 1 | q << 4 | q << 9 | ((q & 0x01) << 15)
-        else:  # Color lookup
-            dest[n] = lut[p]  # current pixel
-            n += 1
-            dest[n] = lut[q]  # next pixel
-        n += 1
-        x += 1
-        length -= 1
+    while row < height:
+        rows = height - row
+        if rows > 8:
+            rows = 8
+        tx = 0
+        while tx < bwidth:
+            cols = bwidth - tx
+            if cols > tbytes:
+                cols = tbytes
+            a = 0
+            b = 0
+            r = 0
+            while r < rows:
+                p = (row + r) * bwidth + tx
+                n = cols
+                while n:
+                    a += source[p]
+                    b += a
+                    p += 1
+                    n -= 1
+                r += 1
+            dest[t] = b ^ (a << 16)
+            t += 1
+            tx += tbytes
+        row += 8
 
 
+# Flag tiles whose checksum differs from the reference and update it.
+@micropython.viper
+def _tdiff(flags: ptr8, new: ptr32, ref: ptr32, n: int):
+    i: int = 0
+    while i < n:
+        if new[i] != ref[i]:
+            flags[i] = 1
+            ref[i] = new[i]
+        i += 1
+
+
+# Panel set-up after a hardware reset, streamed by _stream(): per command the
+# command byte, the number of argument bytes (bit 7 set: wait 120 ms after
+# it) and the arguments. The column and page windows are not set here: every
+# flush sets its own.
+_INIT = (
+    b"\xFE\x00"  # Inter register enable 1
+    b"\xEF\x00"  # Inter register enable 2. Sequence is necessary
+    # to enable access to other registers.
+    b"\xEB\x01\x14"  # ?
+    b"\x84\x01\x40"  # ?
+    b"\x85\x01\xFF"  # ?
+    b"\x87\x01\xFF"  # ?
+    b"\x86\x01\xFF"  # ?
+    b"\x88\x01\x0A"  # ?
+    b"\x89\x01\x21"  # ?
+    b"\x8A\x01\x00"  # ?
+    b"\x8B\x01\x80"  # ?
+    b"\x8C\x01\x01"  # ?
+    b"\x8D\x01\x01"  # ?
+    b"\x8E\x01\xFF"  # ?
+    b"\x8F\x01\xFF"  # ?
+    b"\xB6\x02\x00\x00"  # Display function control
+    b"\x3A\x01\x55"  # COLMOD
+    b"\x90\x04\x08\x08\x08\x08"  # ?
+    b"\xBD\x01\x06"  # ?
+    b"\xBC\x01\x00"  # ?
+    b"\xFF\x03\x60\x01\x04"  # ?
+    b"\xC3\x01\x13"  # Vreg1a voltage Control
+    b"\xC4\x01\x13"  # Vreg1b voltage Control
+    b"\xC9\x01\x22"  # Vreg2a voltage Control
+    b"\xBE\x01\x11"  # ?
+    b"\xE1\x02\x10\x0E"  # ?
+    b"\xDF\x03\x21\x0c\x02"  # ?
+    b"\xF0\x06\x45\x09\x08\x08\x26\x2A"  # Gamma
+    b"\xF1\x06\x43\x70\x72\x36\x37\x6F"  # Gamma
+    b"\xF2\x06\x45\x09\x08\x08\x26\x2A"  # Gamma
+    b"\xF3\x06\x43\x70\x72\x36\x37\x6F"  # Gamma
+    b"\xED\x02\x1B\x0B"  # ?
+    b"\xAE\x01\x77"  # ?
+    b"\xCD\x01\x63"  # ?
+    b"\x70\x09\x07\x07\x04\x0E\x0F\x09\x07\x08\x03"  # ?
+    b"\xE8\x01\x34"  # Frame rate / dot inversion
+    b"\x62\x0C\x18\x0D\x71\xED\x70\x70\x18\x0F\x71\xEF\x70\x70"  # ?
+    b"\x63\x0C\x18\x11\x71\xF1\x70\x70\x18\x13\x71\xF3\x70\x70"  # ?
+    b"\x64\x07\x28\x29\xF1\x01\xF1\x00\x07"  # ?
+    b"\x66\x0A\x3C\x00\xCD\x67\x45\x45\x10\x00\x00\x00"  # Undoc but needed
+    b"\x67\x0A\x00\x3C\x00\x00\x00\x01\x54\x10\x32\x98"  # Undoc but needed
+    b"\x74\x07\x10\x85\x80\x00\x00\x4E\x00"  # ?
+    b"\x98\x02\x3e\x07"  # ?
+    # b"\x35\x00"  # Tearing effect line on. This pin is unused.
+    b"\x21\x00"  # Display inversion on
+    b"\x11\x80"  # Sleep out
+)
+
+
+# With rgb565=True the frame buffer is RGB565 instead, 2 bytes a pixel (115 KB
+# on 240x240, which the heap of a SPIRAM board places in PSRAM), stored in
+# the panel's byte order: flushes write it to the bus as it is, a whole frame
+# in one write, with no LUT and no conversion. Draw with colours from rgb()
+# or c565(). snapshot.py, delta.py, hands.py and ring.py edges assume GS4.
 class GC9A01(framebuf.FrameBuffer):
 
     lut = bytearray(32)  # Color LUT holds all possible 16-bit colors
@@ -56,6 +188,11 @@ class GC9A01(framebuf.FrameBuffer):
     def rgb(cls, r, g, b):
         return (r & 0xF8) | ((g & 0xE0) >> 5) | ((g & 0x1C) << 11) | ((b & 0xF8) << 5)
 
+    # A standard RGB565 value (0xF800 red) as a colour for rgb565 mode
+    @staticmethod
+    def c565(c):
+        return (c >> 8) | ((c & 0xFF) << 8)
+
     def __init__(
         self,
         spi,
@@ -68,6 +205,10 @@ class GC9A01(framebuf.FrameBuffer):
         usd=False,
         mirror=False,
         init_spi=False,
+        batch_lines=8,
+        circular=False,
+        rgb565=False,
+        warm=False,
     ):
         self._spi = spi
         self._cs = cs
@@ -78,76 +219,36 @@ class GC9A01(framebuf.FrameBuffer):
         self.width = width
         self._spi_init = init_spi
         self._gscale = False  # Interpret buffer as index into color LUT
-        self.mode = framebuf.GS4_HMSB
+        self._rgb = rgb565
+        self.mode = framebuf.RGB565 if rgb565 else framebuf.GS4_HMSB
         self.palette = BoolPalette(self.mode)
+        self._bpr = width * 2 if rgb565 else width // 2  # Frame buffer bytes per line
         gc.collect()
-        buf = bytearray(height * width // 2)  # Frame buffer
+        buf = bytearray(height * self._bpr)  # Frame buffer
         self.mvb = memoryview(buf)
         super().__init__(buf, width, height, self.mode)
-        self._linebuf = bytearray(width * 2)  # Line buffer (16-bit colors)
-
-        # Hardware reset
-        self._rst(0)
-        sleep_ms(50)
-        self._rst(1)
-        sleep_ms(50)
-        if self._spi_init:  # A callback was passed
-            self._spi_init(spi)  # Bus may be shared
-        self._lock = asyncio.Lock()  # Prevent concurrent refreshes.
-        sleep_ms(100)
-        self._wcd(b"\x2a", int.to_bytes(width - 1, 4, "big"))
-        # Default page address start == 0 end == 0xEF (239)
-        self._wcd(b"\x2b", int.to_bytes(height - 1, 4, "big"))  # SET_PAGE ht
-        # **** Start of opaque chip setup ****
-        self._wcmd(b"\xFE")  # Inter register enable 1
-        self._wcmd(b"\xEF")  # Inter register enable 2. Sequence is necessary
-        # to enable access to other registers.
-        self._wcd(b"\xEB", b"\x14")  # ?
-        self._wcd(b"\x84", b"\x40")  # ?
-        self._wcd(b"\x85", b"\xFF")  # ?
-        self._wcd(b"\x87", b"\xFF")  # ?
-        self._wcd(b"\x86", b"\xFF")  # ?
-        self._wcd(b"\x88", b"\x0A")  # ?
-        self._wcd(b"\x89", b"\x21")  # ?
-        self._wcd(b"\x8A", b"\x00")  # ?
-        self._wcd(b"\x8B", b"\x80")  # ?
-        self._wcd(b"\x8C", b"\x01")  # ?
-        self._wcd(b"\x8D", b"\x01")  # ?
-        self._wcd(b"\x8E", b"\xFF")  # ?
-        self._wcd(b"\x8F", b"\xFF")  # ?
-        self._wcd(b"\xB6", b"\x00\x00")  # Display function control
-        self._wcd(b"\x3A", b"\x55")  # COLMOD
-        self._wcd(b"\x90", b"\x08\x08\x08\x08")  # ?
-        self._wcd(b"\xBD", b"\x06")  # ?
-        self._wcd(b"\xBC", b"\x00")  # ?
-        self._wcd(b"\xFF", b"\x60\x01\x04")  # ?
-        self._wcd(b"\xC3", b"\x13")  # Vreg1a voltage Control
-        self._wcd(b"\xC4", b"\x13")  # Vreg1b voltage Control
-        self._wcd(b"\xC9", b"\x22")  # Vreg2a voltage Control
-        self._wcd(b"\xBE", b"\x11")  # ?
-        self._wcd(b"\xE1", b"\x10\x0E")  # ?
-        self._wcd(b"\xDF", b"\x21\x0c\x02")  # ?
-        self._wcd(b"\xF0", b"\x45\x09\x08\x08\x26\x2A")  # Gamma
-        self._wcd(b"\xF1", b"\x43\x70\x72\x36\x37\x6F")  # Gamma
-        self._wcd(b"\xF2", b"\x45\x09\x08\x08\x26\x2A")  # Gamma
-        self._wcd(b"\xF3", b"\x43\x70\x72\x36\x37\x6F")  # Gamma
-        self._wcd(b"\xED", b"\x1B\x0B")  # ?
-        self._wcd(b"\xAE", b"\x77")  # ?
-        self._wcd(b"\xCD", b"\x63")  # ?
-        self._wcd(b"\x70", b"\x07\x07\x04\x0E\x0F\x09\x07\x08\x03")  # ?
-        self._wcd(b"\xE8", b"\x34")  # Frame rate / dot inversion
-        self._wcd(b"\x62", b"\x18\x0D\x71\xED\x70\x70\x18\x0F\x71\xEF\x70\x70")  # ?
-        self._wcd(b"\x63", b"\x18\x11\x71\xF1\x70\x70\x18\x13\x71\xF3\x70\x70")  # ?
-        self._wcd(b"\x64", b"\x28\x29\xF1\x01\xF1\x00\x07")  # ?
-        self._wcd(b"\x66", b"\x3C\x00\xCD\x67\x45\x45\x10\x00\x00\x00")  # Undoc but needed
-        self._wcd(b"\x67", b"\x00\x3C\x00\x00\x00\x01\x54\x10\x32\x98")  # Undoc but needed
-        self._wcd(b"\x74", b"\x10\x85\x80\x00\x00\x4E\x00")  # ?
-        self._wcd(b"\x98", b"\x3e\x07")  # ?
-        # self._wcmd(b"\x35")  # Tearing effect line on. This pin is unused.
-        self._wcmd(b"\x21")  # Display inversion on
-        self._wcmd(b"\x11")  # Sleep out
-        sleep_ms(120)
-        # *************************
+        # Lines are converted and sent batch_lines at a time through two
+        # buffers used alternately, so a port whose SPI write returns before
+        # the transfer completes (DMA) can convert the next batch meanwhile.
+        self._lines = batch_lines
+        if rgb565:  # Nothing to convert
+            self._lbufs = None
+        else:
+            self._lbufs = (bytearray(width * 2 * batch_lines), bytearray(width * 2 * batch_lines))
+        self._pp = 0  # Buffer for the next batch
+        self._ptab = bytearray(1024)  # Pixel pair table, see _pairs
+        self._plut = bytearray(32)  # LUT and mode the table was built from
+        self._pgs = None
+        self.tx_bytes = 0  # Pixel bytes sent and time spent sending them
+        self.tx_us = 0
+        self._wbuf = bytearray(4)  # Column/page address args
+        self._ntx = (width + 15) >> 4  # Dirty tracking tiles per row
+        self._nty = (height + 7) >> 3
+        self._sums = None  # Tile checksums of the last flushed frame
+        self._vx0 = None  # Circular mask: first and last visible column per row
+        self._groups = None  # and the windows show() sends
+        if circular:
+            self._mask()
 
         # madctl reg 0x36 p127 6.2.18. b0-2 == 0. b3: color output BGR RGB/
         # b4 == 0
@@ -160,9 +261,43 @@ class GC9A01(framebuf.FrameBuffer):
             madctl = 0x48 if usd else 0x88  # RGB portrait mode
         if mirror:
             madctl ^= 0x80
-        self._wcd(b"\x36", madctl.to_bytes(1, "big"))  # MADCTL: RGB portrait mode
+        self._madctl = bytes((madctl,))
+        if self._spi_init:  # A callback was passed
+            self._spi_init(spi)  # Bus may be shared
+        self._lock = asyncio.Lock()  # Prevent concurrent refreshes.
+        self._setup(warm)
+
+    # Bring the panel up. Cold: hardware reset and the whole _INIT table.
+    # Warm: the panel kept its registers (soft reset, or deep sleep with the
+    # panel powered and RST held high), so only MADCTL and display on.
+    def _setup(self, warm):
+        if not warm:
+            self._rst(0)
+            sleep_ms(10)  # Datasheet: at least 10 us
+            self._rst(1)
+            sleep_ms(120)  # Reset done, registers at their defaults
+            self._stream(_INIT)
+        self._wcd(b"\x36", self._madctl)  # MADCTL, see __init__
         self._wcmd(b"\x29")  # display on
 
+    # Send a command table in one pass with CS held low, toggling DC.
+    def _stream(self, table):
+        mv = memoryview(table)
+        spi = self._spi
+        self._cs(0)
+        i = 0
+        while i < len(table):
+            n = table[i + 1] & 0x7F
+            self._dc(0)
+            spi.write(mv[i : i + 1])
+            if n:
+                self._dc(1)
+                spi.write(mv[i + 2 : i + 2 + n])
+            if table[i + 1] & 0x80:
+                sleep_ms(120)
+            i += 2 + n
+        self._cs(1)
+
     # Write a command.
     def _wcmd(self, command):
         self._dc(0)
@@ -181,26 +316,262 @@ class GC9A01(framebuf.FrameBuffer):
         self._spi.write(data)
         self._cs(1)
 
+    # Set the column and page address window, inclusive coordinates.
+    def _window(self, x0, y0, x1, y1):
+        wb = self._wbuf
+        wb[0] = x0 >> 8
+        wb[1] = x0 & 0xFF
+        wb[2] = x1 >> 8
+        wb[3] = x1 & 0xFF
+        self._wcd(b"\x2a", wb)
+        wb[0] = y0 >> 8
+        wb[1] = y0 & 0xFF
+        wb[2] = y1 >> 8
+        wb[3] = y1 & 0xFF
+        self._wcd(b"\x2b", wb)
+
+    # Circular panel: a pixel is visible if its centre lies within the
+    # inscribed circle. Rows are sent as column windows rounded out to q
+    # pixels, and consecutive rows with the same window share one. q = 8
+    # sends 81% of the frame in 27 windows on 240x240, where the finest
+    # rounding (2) needs 91 windows for 79%.
+    def _mask(self, q=8):
+        w = self.width
+        h = self.height
+        d = min(w, h)
+        self._vx0 = vx0 = bytearray(h)
+        self._vx1 = vx1 = bytearray(h)
+        groups = []
+        for y in range(h):
+            dy = 2 * y + 1 - h
+            r2 = d * d - dy * dy  # Doubled coordinates keep this integer
+            x = 0
+            while x < w // 2 and (2 * x + 1 - w) ** 2 > r2:
+                x += 1
+            vx0[y] = x
+            vx1[y] = w - 1 - x  # Symmetric
+            x0 = x // q * q
+            x1 = min((w - 1 - x) // q * q + q, w) - 1
+            if groups and groups[-1][0] == x0 and groups[-1][2] == x1:
+                groups[-1][3] = y
+            else:
+                groups.append([x0, y, x1, y])
+        self._groups = [tuple(g) for g in groups]
+        # Dirty tracking tiles that lie wholly outside the circle
+        self._tskip = [
+            ty * self._ntx + tx
+            for ty in range(self._nty)
+            for tx in range(self._ntx)
+            if not self.visible(tx << 4, ty << 3, 16, 8)
+        ]
+
+    # True if any pixel of the rectangle is on the panel (within the circle
+    # in circular mode). Drawing code can skip work that would not be seen.
+    def visible(self, x, y, w, h):
+        if x >= self.width or y >= self.height or x + w <= 0 or y + h <= 0:
+            return False
+        if self._vx0 is None:
+            return True
+        # The row of the rectangle nearest the centre has the widest span
+        r = min(max(self.height // 2, y), y + h - 1, self.height - 1)
+        r = max(r, 0)
+        return x <= self._vx1[r] and x + w > self._vx0[r]
+
+    # Take the current frame as the reference for dirty tracking.
+    def _track(self):
+        n = self._ntx * self._nty
+        if self._sums is None:
+            self._sums = bytearray(4 * n)
+            self._new = bytearray(4 * n)
+            self._flags = bytearray(n)
+        _tsums(self._sums, self.mvb, self._bpr, self.height, 32 if self._rgb else 8)
+        self._flags[:] = bytes(n)
+
+    # Pair table for the current palette, rebuilt only when GC9A01.lut or the
+    # greyscale mode changed since it was last built.
+    def _pairtab(self):
+        lut = GC9A01.lut
+        gs = self._gscale
+        if gs != self._pgs or (not gs and lut != self._plut):
+            _pairs(self._ptab, lut, gs)
+            self._plut[:] = lut
+            self._pgs = gs
+        return self._ptab
+
+    # Convert and send nlines whole lines from line y. CS must be asserted.
+    def _send(self, y, nlines):
+        if self._rgb:  # One write straight from the frame buffer
+            bpr = self._bpr
+            t0 = ticks_us()
+            self._spi.write(self.mvb[y * bpr : (y + nlines) * bpr])
+            self.tx_us += ticks_diff(ticks_us(), t0)
+            self.tx_bytes += nlines * bpr
+            return
+        pairs = self._pairtab()
+        buf = self.mvb
+        wd = self.width // 2
+        bufs = self._lbufs
+        i = self._pp
+        t0 = ticks_us()
+        end = y + nlines
+        while y < end:
+            n = min(self._lines, end - y)
+            lb = bufs[i]
+            if n < self._lines:
+                lb = memoryview(lb)[: n * wd * 4]
+            _pcopy(lb, buf, pairs, y * wd, n * wd, 1, 0)  # Lines are contiguous
+            self._spi.write(lb)
+            i ^= 1
+            y += n
+        self._pp = i
+        self.tx_us += ticks_diff(ticks_us(), t0)
+        self.tx_bytes += nlines * wd * 4
+
+    # Pixel bytes sent and bytes/s achieved since the last reset. Compare the
+    # rate with the SPI baudrate / 8.
+    def tx_stats(self, reset=False):
+        nbytes = self.tx_bytes
+        rate = nbytes * 1_000_000 // self.tx_us if self.tx_us else 0
+        if reset:
+            self.tx_bytes = 0
+            self.tx_us = 0
+        return nbytes, rate
+
     def greyscale(self, gs=None):
         if gs is not None:
             self._gscale = gs
         return self._gscale
 
     def show(self):  # Physical display is in portrait mode
-        clut = GC9A01.lut
-        lb = self._linebuf
-        buf = self.mvb
         if self._spi_init:  # A callback was passed
             self._spi_init(self._spi)  # Bus may be shared
+        if self._groups is not None and not self._rgb:  # Visible part only
+            for g in self._groups:
+                self._flush(*g)
+            if self._sums is not None:
+                self._track()
+            return
+        self._window(0, 0, self.width - 1, self.height - 1)  # May follow a partial flush
         self._wcmd(b"\x2c")  # WRITE_RAM
         self._dc(1)
         self._cs(0)
+        self._send(0, self.height)
+        self._cs(1)
+        if self._sums is not None:
+            self._track()
+
+    # Mark a rectangle as changed. show_dirty() will send it even if the tile
+    # checksums happen to match.
+    def mark(self, x, y, w, h):
+        if self._sums is None:  # Next show_dirty() sends the whole frame
+            return
+        x0 = max(x, 0) >> 4
+        y0 = max(y, 0) >> 3
+        x1 = (min(x + w, self.width) - 1) >> 4
+        y1 = (min(y + h, self.height) - 1) >> 3
+        flags = self._flags
+        ntx = self._ntx
+        for ty in range(y0, y1 + 1):
+            for tx in range(x0, x1 + 1):
+                flags[ty * ntx + tx] = 1
+
+    # Send only the tiles changed since the last flush, merged into windows.
+    # The first call sends the whole frame and starts tracking. Returns the
+    # number of windows sent.
+    def show_dirty(self):
+        if self._sums is None:  # Start tracking
+            self.show()
+            self._track()
+            return 1
+        rects = self._dirty()
+        if rects:
+            if self._spi_init:  # A callback was passed
+                self._spi_init(self._spi)  # Bus may be shared
+            for r in rects:
+                self._flush(*r)
+        return len(rects)
+
+    # Windows (x0, y0, x1, y1) in pixels covering the tiles changed or marked
+    # since the last flush. Their checksums become the reference.
+    def _dirty(self):
+        ntx = self._ntx
+        flags = self._flags
+        _tsums(self._new, self.mvb, self._bpr, self.height, 32 if self._rgb else 8)
+        _tdiff(flags, self._new, self._sums, ntx * self._nty)
+        if self._groups is not None:
+            for i in self._tskip:
+                flags[i] = 0
+        rects = []  # [x0, y0, x1, y1] in tiles, inclusive
+        prev = {}  # Runs in the previous tile row: (x0, x1) -> rect
+        for ty in range(self._nty):
+            cur = {}
+            base = ty * ntx
+            tx = 0
+            while tx < ntx:
+                if flags[base + tx]:
+                    x0 = tx
+                    while tx < ntx and flags[base + tx]:
+                        tx += 1
+                    r = prev.get((x0, tx - 1))
+                    if r is None:
+                        r = [x0, ty, tx - 1, ty]
+                        rects.append(r)
+                    else:  # Extend the window down
+                        r[3] = ty
+                    cur[(x0, tx - 1)] = r
+                tx += 1
+            prev = cur
+        flags[:] = bytes(len(flags))
+        return [(x0 << 4, y0 << 3, min((x1 + 1) << 4, self.width) - 1,
+                 min((y1 + 1) << 3, self.height) - 1) for x0, y0, x1, y1 in rects]
+
+    # Send a window of the frame. x0 must be even and x1 odd.
+    def _flush(self, x0, y0, x1, y1):
+        if self._rgb:
+            self._flush565(x0, y0, x1, y1)
+            return
+        pairs = self._pairtab()
+        buf = self.mvb
+        n = (x1 - x0 + 1) // 2  # Source bytes per line
         wd = self.width // 2
-        ht = self.height
-        cm = self._gscale  # color False, greyscale True
-        for start in range(0, wd * ht, wd):  # For each line
-            _lcopy(lb, buf[start:], clut, wd, cm)  # Copy and map colors
-            self._spi.write(lb)
+        bufs = self._lbufs
+        i = self._pp
+        t0 = ticks_us()
+        self._window(x0, y0, x1, y1)
+        self._wcmd(b"\x2c")  # WRITE_RAM
+        self._dc(1)
+        self._cs(0)
+        y = y0
+        while y <= y1:
+            k = min(self._lines, y1 + 1 - y)
+            _pcopy(bufs[i], buf, pairs, y * wd + x0 // 2, n, k, wd)
+            self._spi.write(memoryview(bufs[i])[: k * n * 4])
+            i ^= 1
+            y += k
+        self._cs(1)
+        self._pp = i
+        self.tx_us += ticks_diff(ticks_us(), t0)
+        self.tx_bytes += (y1 + 1 - y0) * n * 4
+
+    # rgb565: whole lines go in one write, narrower windows in one per line.
+    def _flush565(self, x0, y0, x1, y1):
+        self._window(x0, y0, x1, y1)
+        self._wcmd(b"\x2c")  # WRITE_RAM
+        self._dc(1)
+        self._cs(0)
+        if x0 == 0 and x1 == self.width - 1:
+            self._send(y0, y1 + 1 - y0)
+        else:
+            bpr = self._bpr
+            mvb = self.mvb
+            t0 = ticks_us()
+            a = y0 * bpr + 2 * x0
+            n = 2 * (x1 + 1 - x0)
+            for _ in range(y1 + 1 - y0):
+                self._spi.write(mvb[a : a + n])
+                a += bpr
+            self.tx_us += ticks_diff(ticks_us(), t0)
+            self.tx_bytes += (y1 + 1 - y0) * n
         self._cs(1)
 
     def short_lock(self, v=None):
@@ -209,7 +580,9 @@ class GC9A01(framebuf.FrameBuffer):
         return self.lock_mode
 
     # nanogui apps typically call with no args. ugui and tgui pass split and
-    # may pass a Lock depending on lock_mode
+    # may pass a Lock depending on lock_mode. Like show_dirty() the first call
+    # sends the whole frame and starts tracking; later ones send the windows
+    # of changed tiles in split parts. Returns the number of windows sent.
     async def do_refresh(self, split=4, elock=None):
         if elock is None:
             elock = asyncio.Lock()
@@ -217,22 +590,43 @@ class GC9A01(framebuf.FrameBuffer):
             lines, mod = divmod(self.height, split)  # Lines per segment
             if mod:
                 raise ValueError("Invalid do_refresh arg.")
-            clut = GC9A01.lut
-            lb = self._linebuf
-            buf = self.mvb
+            if self._sums is not None:  # Tracking: changed tiles only
+                rects = self._dirty()
+                if not rects:
+                    return 0
+                step = -(-len(rects) // split)
+                for n in range(0, len(rects), step):
+                    async with elock:
+                        if self._spi_init:  # A callback was passed
+                            self._spi_init(self._spi)  # Bus may be shared
+                        for r in rects[n : n + step]:
+                            self._flush(*r)
+                    await asyncio.sleep_ms(0)
+                return len(rects)
+            if self._groups is not None and not self._rgb:  # Circular: windows in split parts
+                groups = self._groups
+                step = -(-len(groups) // split)
+                for n in range(0, len(groups), step):
+                    async with elock:
+                        if self._spi_init:  # A callback was passed
+                            self._spi_init(self._spi)  # Bus may be shared
+                        for g in groups[n : n + step]:
+                            self._flush(*g)
+                    await asyncio.sleep_ms(0)
+                self._track()
+                return 1
+            self._window(0, 0, self.width - 1, self.height - 1)
             self._wcmd(b"\x2c")  # WRITE_RAM
             self._dc(1)
-            wd = self.width // 2
-            cm = self._gscale  # color False, greyscale True
             line = 0
             for _ in range(split):  # For each segment
                 async with elock:
                     if self._spi_init:  # A callback was passed
                         self._spi_init(self._spi)  # Bus may be shared
                     self._cs(0)
-                    for start in range(wd * line, wd * (line + lines), wd):  # For each line
-                        _lcopy(lb, buf[start:], clut, wd, cm)  # Copy and map colors
-                        self._spi.write(lb)
+                    self._send(line, lines)
                     line += lines
                     self._cs(1)  # Allow other tasks to use bus
                 await asyncio.sleep_ms(0)
+            self._track()
+            return 1
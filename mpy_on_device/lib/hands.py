@@ -0,0 +1,112 @@
+# hands.py Clock hands drawn over the face with save-under buffers.
+
+# A hand is a line a few pixels wide from the centre of the face. Before it is
+# drawn, the frame buffer bytes under its bounding box are copied aside, so
+# moving it copies them back and saves and draws again at the new angle: the
+# face beneath is never redrawn. move() marks the union of each hand's old and
+# new box for show_dirty(), a few tiles a minute instead of the whole frame.
+# Hands are drawn in the order given and restored in reverse, as a later
+# hand's saved pixels may include an earlier one. Boxes are in whole bytes
+# (2 pixels) of the 4-bit frame buffer and lines (x, y, w, h).
+
+import math
+
+
+class Hand:
+    def __init__(self, length, width, color):
+        self.length = length
+        self.width = width
+        self.color = color
+        n = length + width
+        self._buf = bytearray((n // 2 + 2) * (n + 1))  # Largest box, at 45 degrees
+        self._mv = memoryview(self._buf)
+        self.box = None  # Box saved under the hand while it is drawn
+
+
+class Hands:
+    def __init__(self, tft, cx, cy, hands):
+        self._tft = tft
+        self._cx = cx
+        self._cy = cy
+        self._hands = hands
+        self.time = None  # (hour, minute) drawn
+
+    # End point of a hand at fraction f of a turn from 12 o'clock.
+    def _end(self, hand, f):
+        a = 2 * math.pi * f
+        return (self._cx + round(hand.length * math.sin(a)),
+                self._cy - round(hand.length * math.cos(a)))
+
+    def _copy(self, hand, save):
+        x, y, w, h = hand.box
+        wd = self._tft.width // 2
+        mvb = self._tft.mvb
+        buf = hand._mv
+        for r in range(h):
+            a = (y + r) * wd + x
+            if save:
+                buf[r * w : (r + 1) * w] = mvb[a : a + w]
+            else:
+                mvb[a : a + w] = buf[r * w : (r + 1) * w]
+
+    def _draw(self, hand, f):
+        tft = self._tft
+        cx, cy = self._cx, self._cy
+        ex, ey = self._end(hand, f)
+        lo = (hand.width - 1) // 2
+        hi = hand.width - 1 - lo
+        x0 = max(min(cx, ex) - lo, 0) >> 1
+        x1 = min(max(cx, ex) + hi, tft.width - 1) >> 1
+        y0 = max(min(cy, ey) - lo, 0)
+        y1 = min(max(cy, ey) + hi, tft.height - 1)
+        hand.box = (x0, y0, x1 - x0 + 1, y1 - y0 + 1)
+        self._copy(hand, True)
+        steep = abs(ey - cy) > abs(ex - cx)  # Widen across the line
+        for k in range(-lo, hi + 1):
+            if steep:
+                tft.line(cx + k, cy, ex + k, ey, hand.color)
+            else:
+                tft.line(cx, cy + k, ex, ey + k, hand.color)
+
+    # Draw the hands at hour:minute, by default the time last drawn. Hands
+    # already drawn are removed first. Nothing is marked: the frame is sent
+    # whole or its tiles compared by show_dirty().
+    def show(self, hour=None, minute=None):
+        if hour is None:
+            if self.time is None:
+                return
+            hour, minute = self.time
+        self.hide()
+        self.time = (hour, minute)
+        fs = ((hour % 12 + minute / 60) / 12, minute / 60)
+        for i, hand in enumerate(self._hands):
+            self._draw(hand, fs[min(i, 1)])
+
+    # Put back the pixels under the hands.
+    def hide(self):
+        for hand in reversed(self._hands):
+            if hand.box is not None:
+                self._copy(hand, False)
+                hand.box = None
+
+    # Drop the saved pixels without restoring them, after the face beneath
+    # was drawn again. The hands are then no longer in the frame.
+    def forget(self):
+        for hand in self._hands:
+            hand.box = None
+
+    # Move the hands to hour:minute and mark what changed for show_dirty().
+    # Returns False if they were already there.
+    def move(self, hour, minute):
+        if self.time == (hour, minute) and any(h.box for h in self._hands):
+            return False
+        old = [h.box for h in self._hands]
+        self.show(hour, minute)
+        for hand, box in zip(self._hands, old):
+            x0, y0, w, h = hand.box
+            x1, y1 = x0 + w, y0 + h
+            if box is not None:
+                x0, y0 = min(x0, box[0]), min(y0, box[1])
+                x1, y1 = max(x1, box[0] + box[2]), max(y1, box[1] + box[3])
+            self._tft.mark(2 * x0, y0, 2 * (x1 - x0), y1 - y0)
+        return True
@@ -0,0 +1,217 @@
+# httpc.py Minimal asyncio HTTP client for the forecast fetchers.
+
+# The body is not read here: callers pull it through Response.readinto(),
+# e.g. with jstream.ascan(), so nothing blocks the display while a download
+# is in progress.
+# DNS answers are cached for DNS_TTL seconds, in RAM and in dns.json on
+# flash, so fetches after a wake from deep sleep skip the lookup. An entry
+# that expires more than DNS_TTL ahead was stored before the clock went
+# back, e.g. a power cycle before the RTC is set, and is looked up again.
+# If a connection to a cached address fails, it is retried once after a
+# fresh lookup.
+# get(..., keepalive=True) sends HTTP/1.1. Once the whole body has been read,
+# the connection is kept for the next request to the same host, which saves
+# the TCP and TLS handshakes. The body must be framed by Content-Length or
+# chunked transfer coding; a response closed before its end is not kept.
+# Without keepalive, requests are HTTP/1.0 and the server closes the
+# connection after the body. Drop idle connections with close_idle() before
+# Wi-Fi goes down.
+# Each Response records where the time went:
+#   dns_us      the lookup (0 when cached)
+#   connect_us  TCP, the TLS handshake and sending the request
+#   head_us     waiting for the status line and headers
+#   read_us     the body read so far
+# and nbytes counts the body bytes read.
+
+import asyncio
+import json
+import socket
+import ssl
+import time
+
+DNS_TTL = 3600  # Seconds a cached address is used
+DNS_FILE = "dns.json"
+
+_ctx = None
+_dns = None  # host -> [address, time.time() it expires]
+_idle = {}  # (host, port, tls) -> open stream
+
+
+def _ssl_context():
+    global _ctx
+    if _ctx is None:
+        _ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+        _ctx.verify_mode = ssl.CERT_NONE  # No CA store on the device, as urequests
+    return _ctx
+
+
+# Address of host, from the cache unless fresh is set. The lookup blocks.
+def _resolve(host, port, fresh=False):
+    global _dns
+    if _dns is None:
+        try:
+            with open(DNS_FILE) as f:
+                _dns = json.load(f)
+        except (OSError, ValueError):
+            _dns = {}
+    now = time.time()
+    e = _dns.get(host)
+    if e and not fresh and now < e[1] <= now + DNS_TTL:
+        return e[0]
+    addr = socket.getaddrinfo(host, port)[0][-1][0]
+    _dns[host] = [addr, now + DNS_TTL]
+    try:
+        with open(DNS_FILE, "w") as f:
+            json.dump(_dns, f)
+    except OSError:
+        pass
+    return addr
+
+
+# Close the connections kept for reuse.
+def close_idle():
+    for s in _idle.values():
+        s.close()
+    _idle.clear()
+
+
+class Response:
+    def __init__(self, stream, status, headers):
+        self._stream = stream
+        self.status_code = status
+        self.headers = headers  # Lower case names
+        self.dns_us = 0
+        self.connect_us = 0
+        self.head_us = 0
+        self.read_us = 0
+        self.nbytes = 0
+        self.reused = False  # Sent on a kept connection
+        self._key = None  # Pool key if the connection may be kept
+        self._chunked = headers.get("transfer-encoding", "").lower() == "chunked"
+        n = headers.get("content-length")
+        self._left = int(n) if n is not None else None  # Of the body or chunk
+        if status == 304 or status == 204:
+            self._left = 0
+        self._chunks = 0  # Chunks started
+        self._done = self._left == 0 and not self._chunked
+
+    async def _read(self, buf):
+        while True:
+            n = await self._stream.readinto(buf)
+            if n is not None:  # None: TLS record not complete yet
+                return n
+
+    # Read body bytes into buf. Returns 0 at the end of the body.
+    async def readinto(self, buf):
+        if self._done:
+            return 0
+        t0 = time.ticks_us()
+        s = self._stream
+        if self._chunked and not self._left:
+            if self._chunks:
+                await s.readline()  # CRLF after the previous chunk
+            line = await s.readline()
+            self._chunks += 1
+            self._left = int(line.split(b";", 1)[0], 16) if line.strip() else 0
+            if not self._left:  # Last chunk, then trailers
+                while line and line != b"\r\n":
+                    line = await s.readline()
+                self._done = True
+                self.read_us += time.ticks_diff(time.ticks_us(), t0)
+                return 0
+        left = self._left
+        if left is not None and len(buf) > left:
+            buf = memoryview(buf)[:left]
+        n = await self._read(buf)
+        if not n:
+            self._done = True
+            self._key = None  # Ended early if the body was framed
+        else:
+            self.nbytes += n
+            if left is not None:
+                self._left = left - n
+                if not self._left and not self._chunked:
+                    self._done = True
+        self.read_us += time.ticks_diff(time.ticks_us(), t0)
+        return n
+
+    # Keep the connection for the next request if the body was read to its
+    # end, else close it.
+    def close(self):
+        if self._key is not None and self._done:
+            old = _idle.pop(self._key, None)
+            if old is not None:
+                old.close()
+            _idle[self._key] = self._stream
+        else:
+            self._stream.close()
+        self._key = None
+
+
+async def get(url, headers=None, keepalive=False):
+    proto, _, host, path = url.split("/", 3)
+    tls = proto == "https:"
+    port = 443 if tls else 80
+    if ":" in host:
+        host, port = host.split(":", 1)
+        port = int(port)
+    key = (host, port, tls)
+    req = "GET /%s HTTP/1.%d\r\nHost: %s\r\n" % (path, 1 if keepalive else 0, host)
+    if headers:
+        for k in headers:
+            req += "%s: %s\r\n" % (k, headers[k])
+    req = req.encode() + b"\r\n"
+
+    stream = _idle.pop(key, None) if keepalive else None
+    reused = stream is not None
+    fresh = False  # Look the address up again
+    while True:
+        t0 = time.ticks_us()
+        dns_us = 0
+        if stream is None:
+            try:
+                addr = _resolve(host, port, fresh)
+                dns_us = time.ticks_diff(time.ticks_us(), t0)
+                stream, _ = await asyncio.open_connection(
+                    addr, port, ssl=_ssl_context() if tls else None, server_hostname=host if tls else None
+                )
+            except OSError:
+                if fresh:
+                    raise
+                fresh = True  # The cached address may be stale
+                continue
+        try:
+            stream.write(req)
+            await stream.drain()
+            t1 = time.ticks_us()
+            line = await stream.readline()
+            if not line and reused:
+                raise OSError("connection closed")
+            parts = line.split(None, 2)
+            status = int(parts[1])
+            hdrs = {}
+            while True:
+                line = await stream.readline()
+                if not line or line == b"\r\n":
+                    break
+                k, _, v = line.decode().partition(":")
+                hdrs[k.strip().lower()] = v.strip()
+        except OSError:
+            stream.close()
+            if not reused:
+                raise
+            stream = None  # The server dropped the kept connection: once more
+            reused = False
+            continue
+        except BaseException:  # Including cancellation by a timeout
+            stream.close()
+            raise
+        break
+    r = Response(stream, status, hdrs)
+    r.reused = reused
+    r.dns_us = dns_us
+    r.connect_us = time.ticks_diff(t1, t0) - dns_us
+    r.head_us = time.ticks_diff(time.ticks_us(), t1)
+    if keepalive and parts[0] == b"HTTP/1.1" and hdrs.get("connection", "").lower() != "close":
+        r._key = key
+    return r
@@ -0,0 +1,165 @@
+# icons.py Weather icons for the clock face as packed 1-bit masks.
+
+# Each icon is 32x32 pixels in framebuf.MONO_HLSB layout: 4 bytes per row,
+# MS bit leftmost, 128 bytes per icon. As bytes literals they cost no heap
+# once the module is frozen. blit() paints the set bits of a mask in one
+# colour with a single FrameBuffer.blit() through the display's palette.
+
+import framebuf
+
+SUN_32 = (
+    b"\x00\x00\x00\x00"
+    b"\x00\x00\x00\x00"
+    b"\x00\x07\xE0\x00"
+    b"\x00\x07\xE0\x00"
+    b"\x00\x03\xC0\x00"
+    b"\x01\x83\xC1\x80"
+    b"\x03\xC3\xC3\xC0"
+    b"\x07\xC7\xE3\xE0"
+    b"\x07\xFF\xFF\xE0"
+    b"\x03\xFF\xFF\xC0"
+    b"\x00\xFF\xFF\x00"
+    b"\x00\xFF\xFF\x00"
+    b"\x00\xFF\xFF\x00"
+    b"\x31\xFF\xFF\x80"
+    b"\x3F\xFF\xFF\x80"
+    b"\x3F\xFF\xFF\x80"
+    b"\x3F\xFF\xFF\xFC"
+    b"\x3F\xFF\xFF\xFC"
+    b"\x31\xFF\xFF\x8C"
+    b"\x00\xFF\xFF\x00"
+    b"\x00\xFF\xFF\x00"
+    b"\x00\xFF\xFF\x00"
+    b"\x03\xFF\xFF\xC0"
+    b"\x07\xFF\xFF\xE0"
+    b"\x07\xC7\xE3\xE0"
+    b"\x03\xC3\xC3\xC0"
+    b"\x01\x83\xC1\x80"
+    b"\x00\x03\xC0\x00"
+    b"\x00\x07\xE0\x00"
+    b"\x00\x07\xE0\x00"
+    b"\x00\x00\x00\x00"
+    b"\x00\x00\x00\x00"
+)
+
+CLOUD_32 = (
+    b"\x00\x00\x00\x00"
+    b"\x00\x00\x00\x00"
+    b"\x00\x00\x00\x00"
+    b"\x00\x00\x00\x00"
+    b"\x00\x00\x00\x00"
+    b"\x00\x00\x80\x00"
+    b"\x00\x0F\xF8\x00"
+    b"\x00\x1F\xFC\x00"
+    b"\x00\x3F\xFE\x00"
+    b"\x00\x7F\xFF\x00"
+    b"\x00\xFF\xFF\x80"
+    b"\x00\xFF\xFF\x80"
+    b"\x01\xFF\xFF\xF0"
+    b"\x03\xFF\xFF\xF8"
+    b"\x07\xFF\xFF\xFC"
+    b"\x0F\xFF\xFF\xFE"
+    b"\x0F\xFF\xFF\xFE"
+    b"\x0F\xFF\xFF\xFE"
+    b"\x1F\xFF\xFF\xFF"
+    b"\x0F\xFF\xFF\xFE"
+    b"\x0F\xFF\xFF\xFE"
+    b"\x0F\xFF\xFF\xFE"
+    b"\x07\xFF\xFF\xFC"
+    b"\x03\xFF\xFF\xF8"
+    b"\x01\xFC\x07\xF0"
+    b"\x00\x20\x00\x80"
+    b"\x00\x00\x00\x00"
+    b"\x00\x00\x00\x00"
+    b"\x00\x00\x00\x00"
+    b"\x00\x00\x00\x00"
+    b"\x00\x00\x00\x00"
+    b"\x00\x00\x00\x00"
+)
+
+RAIN_32 = (
+    b"\x00\x00\x00\x00"
+    b"\x00\x00\x00\x00"
+    b"\x00\x00\x00\x00"
+    b"\x00\x00\x00\x00"
+    b"\x00\x00\x00\x00"
+    b"\x00\x00\x80\x00"
+    b"\x00\x0F\xF8\x00"
+    b"\x00\x1F\xFC\x00"
+    b"\x00\x3F\xFE\x00"
+    b"\x00\x7F\xFF\x00"
+    b"\x00\xFF\xFF\x80"
+    b"\x00\xFF\xFF\x80"
+    b"\x01\xFF\xFF\xF0"
+    b"\x03\xFF\xFF\xF8"
+    b"\x07\xFF\xFF\xFC"
+    b"\x0F\xFF\xFF\xFE"
+    b"\x0F\xFF\xFF\xFE"
+    b"\x1F\xFF\xFF\xFF"
+    b"\x0F\xFF\xFF\xFE"
+    b"\x0F\xFF\xFF\xFE"
+    b"\x0F\xFF\xFF\xFE"
+    b"\x07\xFF\xFF\xFC"
+    b"\x03\xFF\xFF\xF8"
+    b"\x01\xFC\x8F\xF0"
+    b"\x00\x20\x00\x80"
+    b"\x00\x08\x88\x00"
+    b"\x00\x00\x00\x00"
+    b"\x00\x08\x88\x00"
+    b"\x00\x00\x00\x00"
+    b"\x00\x08\x88\x00"
+    b"\x00\x00\x00\x00"
+    b"\x00\x00\x00\x00"
+)
+
+# Raindrops under RAIN_32, painted as a second layer in the rain colour.
+RAIN_DROPS_32 = (
+    b"\x00\x00\x00\x00"
+    b"\x00\x00\x00\x00"
+    b"\x00\x00\x00\x00"
+    b"\x00\x00\x00\x00"
+    b"\x00\x00\x00\x00"
+    b"\x00\x00\x00\x00"
+    b"\x00\x00\x00\x00"
+    b"\x00\x00\x00\x00"
+    b"\x00\x00\x00\x00"
+    b"\x00\x00\x00\x00"
+    b"\x00\x00\x00\x00"
+    b"\x00\x00\x00\x00"
+    b"\x00\x00\x00\x00"
+    b"\x00\x00\x00\x00"
+    b"\x00\x00\x00\x00"
+    b"\x00\x00\x00\x00"
+    b"\x00\x00\x00\x00"
+    b"\x00\x00\x00\x00"
+    b"\x00\x00\x00\x00"
+    b"\x00\x00\x00\x00"
+    b"\x00\x00\x00\x00"
+    b"\x00\x00\x00\x00"
+    b"\x00\x00\x00\x00"
+    b"\x00\x00\x00\x00"
+    b"\x04\x00\x00\x40"
+    b"\x00\x01\x00\x00"
+    b"\x00\x80\x00\x08"
+    b"\x00\x00\x20\x00"
+    b"\x04\x00\x00\x40"
+    b"\x00\x01\x00\x00"
+    b"\x00\x00\x00\x00"
+    b"\x00\x00\x00\x00"
+)
+
+_buf = bytearray(128)  # FrameBuffer needs a writeable buffer
+_fb = framebuf.FrameBuffer(_buf, 32, 32, framebuf.MONO_HLSB)
+
+
+# Paint the set bits of a 32x32 mask with its top-left corner at (x, y).
+# Clear bits map to a key colour distinct from color and are skipped.
+def blit(tft, x, y, icon, color):
+    if not tft.visible(x, y, 32, 32):  # Off the round panel
+        return
+    _buf[:] = icon
+    key = (color + 1) & 0x0F
+    palette = tft.palette
+    palette.bg(key)
+    palette.fg(color)
+    tft.blit(_fb, x, y, key, palette)
@@ -0,0 +1,182 @@
+# jstream.py Incremental, selective JSON extraction with bounded memory.
+
+# The document is read in fixed-size chunks into one reusable buffer and
+# tokenised as it arrives. Only object keys and the scalar values on the
+# requested paths become Python objects; everything else is skipped in place,
+# so peak memory does not depend on the size of the document.
+# A path is a tuple of object keys and array indices, None matching any index:
+# ("properties", "timeseries", None, "data", "instant", "details", "air_temperature")
+# The callback receives the current path (a list of keys and int indices) and
+# the decoded value. It returns True to stop reading.
+# parse_us accumulates the time spent in feed(), so a caller can tell parsing
+# apart from waiting for the network.
+
+import json
+import time
+
+
+# Index of the closing quote of a string starting at i, -1 if the chunk ends
+# first or -2 if it ends inside an escape sequence.
+@micropython.viper
+def _strend(buf: ptr8, i: int, n: int) -> int:
+    while i < n:
+        c = buf[i]
+        if c == 0x5C:  # Backslash: skip the escaped byte
+            i += 2
+        elif c == 0x22:
+            return i
+        else:
+            i += 1
+    if i > n:
+        return -2
+    return -1
+
+
+# Index of the byte ending a number or literal starting at i, -1 if none.
+@micropython.viper
+def _tokend(buf: ptr8, i: int, n: int) -> int:
+    while i < n:
+        c = buf[i]
+        if c <= 0x20 or c == 0x2C or c == 0x5D or c == 0x7D:  # Space , ] }
+            return i
+        i += 1
+    return -1
+
+
+class Scanner:
+    def __init__(self, paths, callback, bufsize=512):
+        self._paths = paths
+        self._depths = [len(p) for p in paths]
+        self._cb = callback
+        self._buf = bytearray(bufsize)
+        self._mv = memoryview(self._buf)
+        self._held = 0  # Unconsumed bytes at the start of the buffer
+        self._obj = []  # Per open container: True for objects
+        self._key = False  # Next string is an object key
+        self._skip = 0  # 1: inside a skipped string, 2: and after a backslash
+        self.path = []
+        self.done = False
+        self.nbytes = 0  # Document bytes read
+        self.parse_us = 0  # Time spent tokenising
+
+    # Free part of the buffer for the next read.
+    def space(self):
+        return self._mv[self._held :]
+
+    # Process n bytes just read into space(). Returns True when the document
+    # is complete or the callback asked to stop.
+    def feed(self, n):
+        t = time.ticks_us()
+        self.nbytes += n
+        n += self._held
+        i = self._parse(n)
+        rest = n - i
+        if rest == len(self._buf):
+            raise ValueError("JSON token exceeds buffer")
+        if rest:
+            self._buf[:rest] = bytes(self._mv[i:n])
+        self._held = rest
+        self.parse_us += time.ticks_diff(time.ticks_us(), t)
+        return self.done
+
+    def _wanted(self):
+        path = self.path
+        d = len(path)
+        if d not in self._depths:
+            return False
+        for p in self._paths:
+            if len(p) == d:
+                for k in range(d):
+                    if p[k] is not None and p[k] != path[k]:
+                        break
+                else:
+                    return True
+        return False
+
+    # Tokenise buf[:n]. Returns the index of the first byte of an incomplete
+    # token that must be kept for the next chunk, or n.
+    def _parse(self, n):
+        buf = self._buf
+        path = self.path
+        obj = self._obj
+        i = 0
+        if self._skip:  # Continue skipping a string
+            j = _strend(buf, self._skip - 1, n)
+            if j < 0:
+                self._skip = 2 if j == -2 else 1
+                return n
+            self._skip = 0
+            i = j + 1
+        while i < n:
+            c = buf[i]
+            if c <= 0x20 or c == 0x3A:  # Whitespace or :
+                i += 1
+            elif c == 0x22:  # String
+                j = _strend(buf, i + 1, n)
+                if j < 0:
+                    if self._key or self._wanted():
+                        return i  # Keep it whole
+                    self._skip = 2 if j == -2 else 1
+                    return n
+                if self._key:
+                    path[-1] = str(self._mv[i + 1 : j], "utf-8")
+                    self._key = False
+                elif self._wanted():
+                    if self._cb(path, json.loads(bytes(self._mv[i : j + 1]))):
+                        self.done = True
+                        return j + 1
+                i = j + 1
+            elif c == 0x7B:  # {
+                path.append(None)
+                obj.append(True)
+                self._key = True
+                i += 1
+            elif c == 0x5B:  # [
+                path.append(0)
+                obj.append(False)
+                i += 1
+            elif c == 0x7D or c == 0x5D:  # } ]
+                path.pop()
+                obj.pop()
+                self._key = False
+                i += 1
+                if not path:
+                    self.done = True
+                    return i
+            elif c == 0x2C:  # ,
+                if obj[-1]:
+                    self._key = True
+                else:
+                    path[-1] += 1
+                i += 1
+            else:  # Number, true, false or null
+                j = _tokend(buf, i, n)
+                if j < 0:
+                    return i
+                if self._wanted():
+                    if self._cb(path, json.loads(bytes(self._mv[i:j]))):
+                        self.done = True
+                        return j
+                i = j
+        return n
+
+
+# Run a scanner over a blocking stream such as response.raw until it is done
+# or the stream ends. Returns the number of document bytes read.
+def scan(stream, scanner):
+    while not scanner.done:
+        n = stream.readinto(scanner.space())
+        if not n:
+            break
+        scanner.feed(n)
+    return scanner.nbytes
+
+
+# As scan() for a stream with an awaitable readinto(), e.g. httpc.Response.
+async def ascan(stream, scanner):
+    while not scanner.done:
+        n = await stream.readinto(scanner.space())
+        if not n:
+            break
+        scanner.feed(n)
+    return scanner.nbytes
@@ -0,0 +1,59 @@
+# layers.py Frame drawn as a stack of layers that are only redrawn on change.
+
+# Layers are listed bottom first. Each has a draw function and a key function
+# giving the inputs it is drawn from (no key: it never changes). render()
+# finds the lowest layer whose key differs from the one it was last drawn
+# with, restores the frame below it and draws it and every layer above.
+# A layer created with cache=True keeps a copy of the frame buffer once it
+# is drawn (28.8 KB on 240x240), so a change further up restores the frame
+# with one memory copy instead of drawing that layer and those beneath it
+# again. Keys are compared with ==, so they must be copies (tuples) rather
+# than the mutable lists they are made from.
+
+
+class Layer:
+    def __init__(self, draw, key=None, cache=False):
+        self.draw = draw  # draw(tft, state)
+        self.key = key  # key(state) -> inputs
+        self.cache = cache
+        self.drawn = False
+        self._key = None  # Inputs it was last drawn from
+        self._buf = None
+
+
+class Stack:
+    def __init__(self, tft, layers):
+        self._tft = tft
+        self._layers = layers
+
+    # Bring the frame buffer up to date with state. Returns the number of
+    # layers drawn, 0 if the frame is unchanged.
+    def render(self, state):
+        layers = self._layers
+        keys = [None if ly.key is None else ly.key(state) for ly in layers]
+        start = 0
+        while start < len(layers) and layers[start].drawn and keys[start] == layers[start]._key:
+            start += 1
+        if start == len(layers):
+            return 0
+        while start and not layers[start - 1].cache:
+            start -= 1
+        mvb = self._tft.mvb
+        if start:
+            mvb[:] = layers[start - 1]._buf
+        for i in range(start, len(layers)):
+            ly = layers[i]
+            ly.draw(self._tft, state)
+            ly._key = keys[i]
+            ly.drawn = True
+            if ly.cache:
+                if ly._buf is None:
+                    ly._buf = bytearray(len(mvb))
+                ly._buf[:] = mvb
+        return len(layers) - start
+
+    # Draw everything again on the next render(), e.g. after something else
+    # drew into the frame buffer.
+    def invalidate(self):
+        for ly in self._layers:
+            ly.drawn = False
@@ -0,0 +1,95 @@
+# power.py Sleep between clock face updates with the backlight dimmed.
+
+# The face only changes when new data is due, so between updates the chip can
+# sleep. lightsleep keeps RAM, the panel contents and the asyncio state; the
+# backlight stays on at a dimmed PWM level. deepsleep draws far less but resets
+# the chip: the app then starts again from the flash caches, and the backlight
+# is off meanwhile because the pin is not driven.
+# Awake and asleep time totals are kept in RTC memory, which survives deep
+# sleep, so the duty cycle (and hence the average current) can be followed
+# across wakes.
+# On the ESP32 the LEDC PWM stops in lightsleep unless it was created with
+# lightsleep=True, which keeps it on the RTC clock. Firmware without that
+# option, or an idle level of 0, has the pin driven as a plain GPIO instead,
+# with hold set so it keeps its level while the chip sleeps: off for 0, else
+# fully on, as a dimmed level cannot be kept without the PWM.
+
+import machine
+import struct
+import time
+
+_MAGIC = b"PWR1"
+_FMT = "<4sQQ"  # Magic, awake ms, asleep ms
+
+
+class Backlight:
+    def __init__(self, pin, freq=1000, duty_u16=65535):
+        self._pin = pin
+        self._freq = freq
+        self._sleeps = True  # PWM runs in lightsleep
+        self._held = False  # Pin held as a GPIO
+        self._start(duty_u16)
+
+    def _start(self, duty_u16):
+        if self._sleeps:
+            try:
+                self._pwm = machine.PWM(self._pin, freq=self._freq, duty_u16=duty_u16, lightsleep=True)
+                return
+            except TypeError:  # Older firmware
+                self._sleeps = False
+        self._pwm = machine.PWM(self._pin, freq=self._freq, duty_u16=duty_u16)
+
+    def level(self, duty_u16):
+        if self._held:  # Awake again after sleep_level() held the pin
+            self._pin.init(hold=False)
+            self._held = False
+            self._start(duty_u16)
+        else:
+            self._pwm.duty_u16(duty_u16)
+
+    # Set the level to keep through a lightsleep. The next level() restores
+    # the PWM if the pin had to be held.
+    def sleep_level(self, duty_u16):
+        if self._sleeps and duty_u16:
+            self._pwm.duty_u16(duty_u16)
+            return
+        self._pwm.deinit()
+        self._pin.init(machine.Pin.OUT, value=1 if duty_u16 else 0, hold=True)
+        self._held = True
+
+
+class Sleeper:
+    def __init__(self, backlight, active_duty=65535, idle_duty=16384):
+        self._bl = backlight
+        self._active = active_duty
+        self._idle = idle_duty
+        self._rtc = machine.RTC()
+        self.awake_ms = 0
+        self.asleep_ms = 0
+        mem = self._rtc.memory()
+        if len(mem) == struct.calcsize(_FMT):
+            magic, awake, asleep = struct.unpack(_FMT, mem)
+            if magic == _MAGIC:  # Else empty or someone else's RTC memory
+                self.awake_ms = awake
+                self.asleep_ms = asleep
+        self._t0 = time.ticks_ms()
+
+    # Percentage of the time spent awake since the RTC memory was cleared.
+    def duty(self):
+        total = self.awake_ms + self.asleep_ms
+        return 100 * self.awake_ms / total if total else 100
+
+    # Sleep for seconds. With deep=True this does not return: the chip resets
+    # and main.py runs again.
+    def sleep(self, seconds, deep=False):
+        ms = int(seconds * 1000)
+        self.awake_ms += time.ticks_diff(time.ticks_ms(), self._t0)
+        self.asleep_ms += ms
+        self._rtc.memory(struct.pack(_FMT, _MAGIC, self.awake_ms, self.asleep_ms))
+        print(f"Sleeping {seconds}s ({'deep' if deep else 'light'}), awake {self.duty():.1f}% of the time.")
+        if deep:
+            machine.deepsleep(ms)
+        self._bl.sleep_level(self._idle)
+        machine.lightsleep(ms)
+        self._bl.level(self._active)
+        self._t0 = time.ticks_ms()
@@ -0,0 +1,80 @@
+# prof.py Stage timing and heap snapshots in a fixed-size event ring.
+
+# Records are 16 bytes in one preallocated bytearray, so logging does not
+# allocate and the oldest records are overwritten once it is full. Nothing is
+# printed until dump() is called, e.g. from the REPL after Ctrl-C:
+#   >>> import prof; prof.dump()
+# Tags are short strings; each distinct tag is stored once.
+# Callers keep logging out of hot code with a module level const, which the
+# compiler removes entirely when it is 0:
+#   _DEBUG = const(0)
+#   if _DEBUG: prof.event("yr.value", idx)
+
+from micropython import const
+import gc
+import struct
+import time
+
+_N = const(128)  # Records kept
+_REC = const(16)
+_FMT = "<IiiH"  # ticks_us at the end, value a, value b, tag id
+
+_SPAN = const(0)  # a: duration in us
+_MEM = const(1)  # a: gc.mem_free(), b: gc.mem_alloc()
+_EVENT = const(2)  # a, b: caller values
+
+_buf = bytearray(_N * _REC)
+_next = 0  # Records written in total
+_tags = []
+_ids = {}
+
+
+def _log(tag, kind, a, b, t):
+    global _next
+    i = _ids.get(tag)
+    if i is None:
+        i = len(_tags)
+        _tags.append(tag)
+        _ids[tag] = i
+    struct.pack_into(_FMT, _buf, (_next % _N) * _REC, t, a, b, (i << 2) | kind)
+    _next += 1
+
+
+# Record the time since t0, a time.ticks_us() taken at the start of the stage.
+# Returns the duration in us.
+def span(tag, t0):
+    t = time.ticks_us()
+    d = time.ticks_diff(t, t0)
+    _log(tag, _SPAN, d, 0, t)
+    return d
+
+
+# Record a span whose duration was measured elsewhere.
+def add(tag, us):
+    _log(tag, _SPAN, us, 0, time.ticks_us())
+
+
+def mem(tag):
+    _log(tag, _MEM, gc.mem_free(), gc.mem_alloc(), time.ticks_us())
+
+
+def event(tag, a=0, b=0):
+    _log(tag, _EVENT, a, b, time.ticks_us())
+
+
+# Print the kept records, oldest first. clear=True empties the ring.
+def dump(clear=False):
+    global _next
+    n = min(_next, _N)
+    for k in range(_next - n, _next):
+        t, a, b, tk = struct.unpack_from(_FMT, _buf, (k % _N) * _REC)
+        tag = _tags[tk >> 2]
+        kind = tk & 3
+        if kind == _SPAN:
+            print(f"{t:>10} {tag:<16} {a} us")
+        elif kind == _MEM:
+            print(f"{t:>10} {tag:<16} free {a} used {b}")
+        else:
+            print(f"{t:>10} {tag:<16} {a} {b}")
+    if clear:
+        _next = 0
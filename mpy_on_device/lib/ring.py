@@ -0,0 +1,163 @@
+# ring.py Precomputed annulus map for the UV ring of the clock face.
+
+# The ring is split into 12 hour slots of 30 degrees. Slot 0 starts at
+# 12 o'clock and slots run clockwise, so slot n is the hour n on the dial.
+# Every pixel of the annulus belongs to exactly one slot and is stored as part
+# of a horizontal span, 3 bytes per span: row, first column, width.
+# The trigonometry runs once; the table is then cached on flash so later boots
+# only read it back. The same build places the hour label anchors.
+# For anti-aliasing the build also samples each pixel along the two circles
+# 4x4 times. Pixels the annulus covers by a quarter to under three quarters
+# are the slot's edge, stored as 2 bytes each: row, column. fill() paints
+# them in a second colour, the slot's colour blended halfway into the
+# background, straight into the frame buffer: about 600 pixels for the whole
+# ring, with no trigonometry and no extra drawing calls.
+
+import math
+import struct
+
+RING_FILE = "ring.bin"
+_MAGIC = b"RNG2"
+_SS = 4  # Coverage samples per pixel and axis
+
+
+# Set n pixels listed as (row, column) byte pairs in pts to colour c in a
+# GS4_HMSB buffer of wd bytes per row: even columns in the high nibble.
+@micropython.viper
+def _plot(buf: ptr8, pts: ptr8, n: int, wd: int, c: int):
+    i: int = 0
+    while i < n:
+        x: int = pts[2 * i + 1]
+        a: int = pts[2 * i] * wd + (x >> 1)
+        if x & 1:
+            buf[a] = (buf[a] & 0xF0) | c
+        else:
+            buf[a] = (buf[a] & 0x0F) | (c << 4)
+        i += 1
+
+
+class RingMap:
+    def __init__(self, cx, cy, r_outer, r_inner, label_radius, path=RING_FILE):
+        self.geometry = bytes((cx, cy, r_outer, r_inner, label_radius))
+        self._spans = None
+        self._edges = None
+        self._labels = None
+        if not self._load(path):
+            print("Building UV ring table...")
+            self._build()
+            self._save(path)
+
+    # Pixels whose centre lies in r_inner - 0.5 <= d < r_outer + 0.5 are in
+    # the ring, matching the radii the old per-degree plotter rounded to.
+    # Distances are compared doubled and squared to stay in integers.
+    def _build(self):
+        cx, cy, r_outer, r_inner, label_radius = self.geometry
+        ro2 = (2 * r_outer + 1) ** 2
+        ri2 = (2 * r_inner - 1) ** 2
+        spans = [bytearray() for _ in range(12)]
+        edges = [bytearray() for _ in range(12)]
+        lo = (r_inner - 1.5) ** 2  # Pixels within a pixel of either circle
+        mid_lo = (r_inner + 0.5) ** 2
+        mid_hi = (r_outer - 0.5) ** 2
+        hi = (r_outer + 1.5) ** 2
+        ss = _SS * _SS
+        for y in range(max(0, cy - r_outer), min(256, cy + r_outer + 1)):
+            dy2 = (2 * (y - cy)) ** 2
+            slot = -1
+            x0 = 0
+            for x in range(max(0, cx - r_outer), min(256, cx + r_outer + 1)):
+                dx = x - cx
+                d2 = 4 * dx * dx + dy2
+                if ri2 <= d2 < ro2:
+                    s = self._slot(dx, y - cy)
+                else:
+                    s = -1
+                if lo <= d2 / 4 < mid_lo or mid_hi <= d2 / 4 < hi:
+                    n = self._coverage(dx, y - cy)
+                    if ss // 4 <= n < 3 * ss // 4:
+                        edges[self._slot(dx, y - cy)].extend(bytes((y, x)))
+                if s != slot:
+                    if slot >= 0:
+                        spans[slot].extend(bytes((y, x0, x - x0)))
+                    slot = s
+                    x0 = x
+            if slot >= 0:
+                spans[slot].extend(bytes((y, x0, x + 1 - x0)))
+        labels = bytearray(24)
+        for h in range(12):
+            a = math.radians(-90 + h * 30)
+            labels[2 * h] = round(cx + label_radius * math.cos(a))
+            labels[2 * h + 1] = round(cy + label_radius * math.sin(a))
+        self._spans = spans
+        self._edges = edges
+        self._labels = labels
+
+    @staticmethod
+    def _slot(dx, dy):
+        a = math.degrees(math.atan2(dy, dx)) + 90
+        return int(a // 30) % 12
+
+    # Samples of the pixel at (dx, dy) from the centre inside the annulus,
+    # out of _SS * _SS.
+    def _coverage(self, dx, dy):
+        r_outer, r_inner = self.geometry[2], self.geometry[3]
+        ro2 = (r_outer + 0.5) ** 2
+        ri2 = (r_inner - 0.5) ** 2
+        n = 0
+        for i in range(_SS):
+            sy = dy + (i + 0.5) / _SS - 0.5
+            for j in range(_SS):
+                sx = dx + (j + 0.5) / _SS - 0.5
+                if ri2 <= sx * sx + sy * sy < ro2:
+                    n += 1
+        return n
+
+    def _load(self, path):
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return False
+        if data[:4] != _MAGIC or data[4:9] != self.geometry:
+            return False
+        counts = struct.unpack_from("<24H", data, 9)
+        self._labels = data[57:81]
+        parts = []
+        mv = memoryview(data)
+        start = 81
+        for n in counts:
+            parts.append(mv[start : start + n])
+            start += n
+        self._spans = parts[:12]
+        self._edges = parts[12:]
+        return True
+
+    def _save(self, path):
+        try:
+            with open(path, "wb") as f:
+                f.write(_MAGIC)
+                f.write(self.geometry)
+                parts = self._spans + self._edges
+                f.write(struct.pack("<24H", *(len(s) for s in parts)))
+                f.write(self._labels)
+                for s in parts:
+                    f.write(s)
+        except OSError as e:
+            print(f"Could not cache ring table: {e}")
+
+    # Paint the slot of hour (0-23) in a framebuf colour. With edge >= 0 the
+    # slot's edge pixels then get that colour, which must be a GS4 palette
+    # index blending color into the background (fb.mvb is written directly).
+    def fill(self, fb, hour, color, edge=-1):
+        s = self._spans[hour % 12]
+        hline = fb.hline
+        for i in range(0, len(s), 3):
+            hline(s[i + 1], s[i], s[i + 2], color)
+        if edge >= 0:
+            e = self._edges[hour % 12]
+            _plot(fb.mvb, e, len(e) // 2, fb.width // 2, edge)
+
+    # Centre of the label for hour (0-23) on the dial.
+    def label_pos(self, hour):
+        h = 2 * (hour % 12)
+        return self._labels[h], self._labels[h + 1]
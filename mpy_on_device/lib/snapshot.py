@@ -0,0 +1,127 @@
+# snapshot.py Last rendered frame on flash, shown straight after panel init.
+
+# After each new frame the 4-bit framebuffer (28.8 KB on 240x240) is stored
+# with the colour LUT it was shown with, so a reset or wake from deep sleep
+# can put the previous face on the panel before the ring table, the caches
+# or the network are touched. The live face replaces it once drawn.
+# The frame is PackBits run-length coded: a header byte h < 128 is followed
+# by h + 1 literal bytes, h > 128 by one byte repeated 257 - h times. The
+# face is mostly long runs of background, so a frame takes a few KB, and
+# the coding can grow a frame by at most 1 byte in 128.
+
+import struct
+
+SNAP_FILE = "frame.bin"
+_MAGIC = b"SNP1"
+_HDR = "<4sHH32s"  # Magic, width, height, LUT
+_ROWS = 10  # Lines coded per chunk when saving
+
+
+# Code n bytes of src from start into dest. Returns the bytes written.
+@micropython.viper
+def _pack(dest: ptr8, src: ptr8, start: int, n: int) -> int:
+    o: int = 0
+    i: int = start
+    e: int = start + n
+    j: int = 0
+    c: int = 0
+    while i < e:
+        c = src[i]
+        j = i + 1
+        while j < e and j - i < 128 and src[j] == c:
+            j += 1
+        if j - i >= 3:  # Run
+            dest[o] = 257 - (j - i)
+            dest[o + 1] = c
+            o += 2
+            i = j
+        else:  # Literals up to the next run of 3
+            j = i
+            while j < e and j - i < 128:
+                if j + 2 < e and src[j] == src[j + 1] and src[j] == src[j + 2]:
+                    break
+                j += 1
+            dest[o] = j - i - 1
+            o += 1
+            while i < j:
+                dest[o] = src[i]
+                o += 1
+                i += 1
+    return o
+
+
+# Decode n bytes of src into dest of size bytes. Returns the bytes decoded,
+# or -1 if the data would overrun either buffer.
+@micropython.viper
+def _unpack(dest: ptr8, src: ptr8, n: int, size: int) -> int:
+    i: int = 0
+    o: int = 0
+    h: int = 0
+    e: int = 0
+    c: int = 0
+    while i < n:
+        h = src[i]
+        i += 1
+        if h < 128:
+            e = o + h + 1
+            if e > size or i + h + 1 > n:
+                return -1
+            while o < e:
+                dest[o] = src[i]
+                o += 1
+                i += 1
+        elif h > 128:
+            e = o + 257 - h
+            if e > size or i >= n:
+                return -1
+            c = src[i]
+            i += 1
+            while o < e:
+                dest[o] = c
+                o += 1
+    return o
+
+
+def save(tft, path=SNAP_FILE):
+    chunk = tft.width // 2 * _ROWS
+    buf = bytearray(chunk + chunk // 128 + 1)
+    mvb = tft.mvb
+    size = len(mvb)
+    try:
+        with open(path, "wb") as f:
+            f.write(struct.pack(_HDR, _MAGIC, tft.width, tft.height, bytes(tft.lut)))
+            for start in range(0, size, chunk):
+                n = _pack(buf, mvb, start, min(chunk, size - start))
+                f.write(memoryview(buf)[:n])
+    except OSError as e:
+        print(f"Could not write {path}: {e}")
+
+
+# Put the stored frame on the panel. Returns True if the frame buffer now
+# holds it and the panel shows it with the current LUT, so that the next
+# frame can be sent with show_dirty(). A frame stored with another LUT is
+# still shown, with its own colours, but then False is returned and the next
+# frame must be sent whole.
+def show(tft, path=SNAP_FILE):
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return False
+    hlen = struct.calcsize(_HDR)
+    if len(data) < hlen:
+        return False
+    magic, w, h, lut = struct.unpack_from(_HDR, data)
+    if magic != _MAGIC or w != tft.width or h != tft.height:
+        return False
+    mvb = tft.mvb
+    if _unpack(mvb, memoryview(data)[hlen:], len(data) - hlen, len(mvb)) != len(mvb):
+        return False
+    cur = bytes(tft.lut)
+    if lut == cur:
+        tft.show_dirty()  # Whole frame, and the reference for the next one
+        return True
+    tft.lut[:] = lut
+    tft.show()
+    tft.lut[:] = cur
+    return False
@@ -0,0 +1,185 @@
+# telemetry.py Per-cycle metrics, sent to a collector while Wi-Fi is up.
+
+# Metrics are set during an update cycle (wake, fetch, draw, sleep) in fixed
+# slots, and end_cycle() packs the slots that were set into one record. The
+# last _KEEP records wait in RAM for the next time the radio is up for a
+# fetch anyway: send() puts them all into one UDP datagram, fire and forget,
+# so telemetry never wakes the radio by itself. The app ends the cycle before
+# sending, so the datagram includes the cycle it is sent in. Before a deep
+# sleep save() writes the waiting records and the cycle number to flash, and
+# load() takes them back after the wake. A datagram is
+#   header  <4s6sB  magic b"WCT1", machine.unique_id(), number of records
+# and per record
+#   <HH             cycle number, mask of the metrics present
+#   <i              per metric present, in slot order
+# about 50 bytes a cycle. The collector (host/collector.py) decodes it with
+# decode().
+
+from micropython import const
+import gc
+import struct
+
+MAGIC = b"WCT1"
+_HDR = "<4s6sB"
+_REC = "<HH"
+_KEEP = const(8)
+_FILE = "telemetry.bin"
+_SAVED = "<4sHB"  # Magic, cycle number, records; then per record its length and bytes
+
+# Slots. The order is part of the datagram format: append only.
+NAMES = (
+    "wifi_us",  # Joining the network
+    "yr_us",  # Whole fetch: DNS, connect, download, parse
+    "uv_us",
+    "edge_us",  # Record or frame from the edge service
+    "parse_us",  # JSON parsing, both sources
+    "render_us",  # Drawing into the frame buffer
+    "flush_us",  # Sending the frame to the panel
+    "rx_bytes",  # Response bodies downloaded
+    "heap_min",  # Lowest gc.mem_free() seen
+    "rssi",  # dBm
+    "cache_hits",  # Data used from flash, fresh or after a 304
+    "cache_misses",  # Data downloaded
+)
+WIFI_US = const(0)
+YR_US = const(1)
+UV_US = const(2)
+EDGE_US = const(3)
+PARSE_US = const(4)
+RENDER_US = const(5)
+FLUSH_US = const(6)
+RX_BYTES = const(7)
+HEAP_MIN = const(8)
+RSSI = const(9)
+CACHE_HITS = const(10)
+CACHE_MISSES = const(11)
+
+_vals = [0] * len(NAMES)
+_mask = 0
+_cycle = 0
+_pending = []
+
+
+def set(i, v):
+    global _mask
+    _vals[i] = v
+    _mask |= 1 << i
+
+
+def add(i, v):
+    if _mask & 1 << i:
+        v += _vals[i]
+    set(i, v)
+
+
+# Record the free heap if it is the lowest this cycle.
+def heap():
+    free = gc.mem_free()
+    if not _mask & 1 << HEAP_MIN or free < _vals[HEAP_MIN]:
+        set(HEAP_MIN, free)
+
+
+def end_cycle():
+    global _mask, _cycle
+    if _mask:
+        rec = struct.pack(_REC, _cycle & 0xFFFF, _mask)
+        rec += struct.pack("<%di" % bin(_mask).count("1"), *[_vals[i] for i in range(len(NAMES)) if _mask & 1 << i])
+        _pending.append(rec)
+        if len(_pending) > _KEEP:
+            _pending.pop(0)
+    _cycle += 1
+    _mask = 0
+
+
+# Send the waiting records to addr, a (host, port) tuple. Only call this
+# while Wi-Fi is up. Returns the number of records sent.
+def send(addr):
+    if not _pending:
+        return 0
+    import machine
+    import socket
+
+    n = len(_pending)
+    data = struct.pack(_HDR, MAGIC, machine.unique_id()[:6], n) + b"".join(_pending)
+    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        s.sendto(data, socket.getaddrinfo(addr[0], addr[1])[0][-1])
+    except OSError as e:
+        print(f"Telemetry not sent: {e}")
+        return 0
+    finally:
+        s.close()
+    del _pending[:n]
+    return n
+
+
+# Keep the waiting records across a deep sleep. Only written when there are
+# some, to spare the flash.
+def save(path=_FILE):
+    if not _pending:
+        return
+    try:
+        with open(path, "wb") as f:
+            f.write(struct.pack(_SAVED, MAGIC, _cycle & 0xFFFF, len(_pending)))
+            for rec in _pending:
+                f.write(bytes((len(rec),)))
+                f.write(rec)
+    except OSError as e:
+        print(f"Telemetry not saved: {e}")
+
+
+# Take back what save() stored, then delete it. Returns the records loaded.
+def load(path=_FILE):
+    global _cycle
+    import os
+
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+        os.remove(path)
+    except OSError:
+        return 0
+    o = struct.calcsize(_SAVED)
+    if len(data) < o:
+        return 0
+    magic, cycle, n = struct.unpack_from(_SAVED, data)
+    if magic != MAGIC:
+        return 0
+    recs = []
+    for _ in range(n):
+        if o >= len(data) or o + 1 + data[o] > len(data):
+            return 0
+        recs.append(data[o + 1 : o + 1 + data[o]])
+        o += 1 + data[o]
+    _pending[:0] = recs
+    del _pending[:-_KEEP]
+    _cycle = cycle
+    return n
+
+
+# (device id as hex, [(cycle, {name: value}), ...]) from a datagram. Raises
+# ValueError for anything else.
+def decode(data):
+    hlen = struct.calcsize(_HDR)
+    if len(data) < hlen:
+        raise ValueError("datagram size")
+    magic, dev, n = struct.unpack_from(_HDR, data)
+    if magic != MAGIC:
+        raise ValueError("datagram magic")
+    o = hlen
+    out = []
+    for _ in range(n):
+        if o + 4 > len(data):
+            raise ValueError("datagram size")
+        cycle, mask = struct.unpack_from(_REC, data, o)
+        o += 4
+        rec = {}
+        for i in range(16):
+            if mask & 1 << i:
+                if o + 4 > len(data):
+                    raise ValueError("datagram size")
+                v = struct.unpack_from("<i", data, o)[0]
+                rec[NAMES[i] if i < len(NAMES) else "m%d" % i] = v
+                o += 4
+        out.append((cycle, rec))
+    return "".join("%02x" % b for b in dev), out
@@ -0,0 +1,146 @@
+# wifi.py Station connect with a fast path to the access point last used.
+
+# A full connect scans every channel for the SSID, associates and waits for
+# DHCP. After one succeeds, the access point's BSSID and channel and the
+# address configuration DHCP handed out are stored in wifi.json. The next
+# connect, typically on the next wake from deep sleep, asks for that BSSID
+# (if the port reported it) on that channel with the stored addresses set
+# statically, skipping the scan and DHCP. If that does not connect within
+# FAST_TIMEOUT_MS, the record is dropped and the full connect follows. Stored
+# addresses are only reused for LEASE_SECONDS, well inside common DHCP lease
+# times, so the clock does not hold on to an address the router may since
+# have given to another device.
+# There are no link events to wait on, so the state is polled every POLL_MS
+# (not every second), and a wrong password or a missing access point ends
+# the wait early.
+
+import asyncio
+import binascii
+import json
+import network
+import time
+
+CACHE_FILE = "wifi.json"
+FAST_TIMEOUT_MS = 3000
+LEASE_SECONDS = 6 * 3600
+POLL_MS = 50
+
+fast = False  # The last connect took the fast path
+
+
+def _load(ssid):
+    try:
+        with open(CACHE_FILE) as f:
+            rec = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if rec.get("ssid") != ssid or not 0 <= time.time() - rec.get("at", 0) < LEASE_SECONDS:
+        return None
+    return rec
+
+
+def _forget():
+    try:
+        with open(CACHE_FILE, "w") as f:
+            f.write("{}")
+    except OSError:
+        pass
+
+
+# BSSID of the access point joined, read back after associating. Not every
+# port reports it; then None is stored and the fast path joins by SSID on
+# the stored channel, which still skips the full scan. A scan here to find
+# the BSSID would block for seconds after every full connect.
+def _bssid(sta):
+    for get in (sta.config, sta.status):
+        try:
+            bssid = get("bssid")
+        except (OSError, ValueError, TypeError):
+            continue
+        if isinstance(bssid, bytes) and len(bssid) == 6:
+            return bssid
+    return None
+
+
+def _save(sta, ssid):
+    bssid = _bssid(sta)
+    rec = {
+        "ssid": ssid,
+        "bssid": binascii.hexlify(bssid).decode() if bssid else None,
+        "channel": sta.config("channel"),
+        "ifconfig": sta.ifconfig(),
+        "at": time.time(),
+    }
+    try:
+        with open(CACHE_FILE, "w") as f:
+            json.dump(rec, f)
+    except OSError as e:
+        print(f"Could not write {CACHE_FILE}: {e}")
+
+
+async def _wait(sta, timeout_ms, fail_fast):
+    t0 = time.ticks_ms()
+    while time.ticks_diff(time.ticks_ms(), t0) < timeout_ms:
+        if sta.isconnected():
+            return True
+        st = sta.status()
+        if st == network.STAT_WRONG_PASSWORD or (fail_fast and st == network.STAT_NO_AP_FOUND):
+            return False
+        await asyncio.sleep_ms(POLL_MS)
+    return sta.isconnected()
+
+
+# Returns True once connected. Other tasks keep running while it waits.
+async def connect(ssid, password, timeout_ms=15000):
+    global fast
+    sta = network.WLAN(network.STA_IF)
+    if sta.isconnected():
+        return True
+    sta.active(True)
+    rec = _load(ssid)
+    if rec:
+        try:
+            sta.config(channel=rec["channel"])
+        except (OSError, ValueError):
+            pass
+        sta.ifconfig(tuple(rec["ifconfig"]))
+        bssid = rec["bssid"] and binascii.unhexlify(rec["bssid"])
+        if bssid:
+            sta.connect(ssid, password, bssid=bssid)
+        else:
+            sta.connect(ssid, password)
+        if await _wait(sta, FAST_TIMEOUT_MS, True):
+            fast = True
+            return True
+        sta.disconnect()
+        _forget()
+    fast = False
+    try:
+        sta.ifconfig("dhcp")  # Undo the static addresses of a fast attempt
+    except (OSError, ValueError, TypeError):
+        pass
+    sta.connect(ssid, password)
+    if await _wait(sta, timeout_ms, False):
+        _save(sta, ssid)
+        return True
+    sta.active(False)  # Turn off Wi-Fi to save power if connection failed
+    return False
+
+
+def ifconfig():
+    return network.WLAN(network.STA_IF).ifconfig()
+
+
+# Signal strength of the access point in dBm, None if not reported.
+def rssi():
+    try:
+        return network.WLAN(network.STA_IF).status("rssi")
+    except (OSError, ValueError, TypeError):
+        return None
+
+
+# The radio is the largest consumer; keep it off until the next connect.
+def disconnect():
+    sta = network.WLAN(network.STA_IF)
+    sta.disconnect()
+    sta.active(False)
@@ -1,13 +1,26 @@
 # minimal_gc9a01_test.py
-from machine import Pin, SPI
-import gc9a01
 import time
+_T_MAIN = time.ticks_us() # Time since reset when main.py started
+from machine import Pin, SPI, RTC
+import machine
+from micropython import const
+import gc9a01
+import ring
+import icons
+from icons import SUN_32, CLOUD_32, RAIN_32, RAIN_DROPS_32
 import struct
-import math # Added for trigonometric functions
-import framebuf
-import network # For Wi-Fi
-import urequests # For HTTP requests
-import ujson # For JSON parsing
+import sys
+import asyncio
+import fcache # Forecast cache on flash
+import power # Sleep between updates
+import prof # Stage timings and heap snapshots, prof.dump() from the REPL
+import snapshot # Last frame on flash, shown at boot
+import layers # Face layers, redrawn only when their data changed
+import forecast # Extraction of the face data, shared with host/edge.py
+import telemetry # Per-cycle metrics for a collector on the network
+import hands # Clock hands over the face, moved once a minute
+# wifi (station connect), httpc (async HTTP GET) and jstream (streaming JSON
+# extraction) are imported where used, after the first frame is on screen.
 
 print("Starting GC9A01 Weather Clock Test...")
 
@@ -22,18 +35,48 @@ YR_USER_AGENT = ""
 OSLO_UTC_OFFSET = 2 # Oslo is UTC+2 during CEST (Central European Summer Time)
 
 FETCH_INTERVAL_SECONDS = 1800 # Fetch new data every 30 minutes
-last_fetch_time = 0 # Shared for YR data
-last_uv_fetch_time = 0 # Separate for UV data
-weather_data_cache = None
-uv_data_cache = None
+RETRY_SECONDS = 300 # Wait before retrying after a failed fetch
+# Sleep between updates. Light sleep keeps the face on with the backlight at
+# BL_IDLE_DUTY; deep sleep draws far less but the panel is dark until the next
+# wake. Gaps of at least DEEP_SLEEP_MIN_SECONDS use deep sleep (0: never).
+BL_ACTIVE_DUTY = 65535
+BL_IDLE_DUTY = 16384
+DEEP_SLEEP_MIN_SECONDS = 0
+WIFI_TIMEOUT_SECONDS = 15 # Give up joining the network after this
+HTTP_TIMEOUT_SECONDS = 30 # Give up on a fetch (connect + download) after this
+# The panel stays powered through a soft reset and deep sleep (RST is held
+# high meanwhile), so those boots skip its reset and register set-up.
+PANEL_WARM_START = True
+# Edge service (host/edge.py) serving both sources as one small record, e.g.
+# "http://192.168.1.10:8080". None: fetch met.no and currentuvindex.com.
+EDGE_URL = None
+# With EDGE_URL: let the service draw the face and send only the changed
+# parts of the frame. The clock then neither parses nor draws.
+EDGE_FRAMES = False
+# Collector (host/collector.py) for the per-cycle metrics, e.g.
+# ("192.168.1.10", 9099). They are only sent while Wi-Fi is up for a fetch.
+TELEMETRY_ADDR = None
+# Hour and minute hands over the face, in local time (OSLO_UTC_OFFSET) once
+# the clock has been set from a server. Light sleep then ends every minute to
+# move them, sending only the tiles they cross.
+SHOW_HANDS = True
+# Smooth the edges of the UV ring with half-tone pixels (palette slots 10-14)
+SMOOTH_RING = True
+# Instrumentation, fixed when the file is compiled: with 0 the logging code
+# is left out entirely. _PROFILE records stage timings (Wi-Fi, connect,
+# download, parse, render, flush) and heap snapshots; _DEBUG also records
+# events inside the parsing callbacks and prints the fetched data.
+_PROFILE = const(1)
+_DEBUG = const(0)
+# Last good data per source, kept on flash across resets and deep sleep
+weather_data_cache = fcache.Entry("yr_cache.json", f"{LATITUDE},{LONGITUDE}", hourly=True)
+uv_data_cache = fcache.Entry("uv_cache.json", f"{LATITUDE},{LONGITUDE}")
+frame_cache = fcache.Entry("frame_cache.json", f"{LATITUDE},{LONGITUDE}", hourly=True) # EDGE_FRAMES
 
 # Default/Fallback Data
 DEFAULT_HOURLY_UV = [1, 7, 1, 7, 1, 7, 1, 7, 1, 7] # 7AM-4PM
 DEFAULT_MIN_TEMP = 1
 DEFAULT_MAX_TEMP = 45
-DEFAULT_ICON_MORNING = ('SUN_32', 'LUT_INDEX_YELLOW')
-DEFAULT_ICON_AFTERNOON = ('CLOUD_32', 'LUT_INDEX_WHITE')
-DEFAULT_ICON_EVENING = ('RAIN_32', 'LUT_INDEX_WHITE', 'LUT_INDEX_BLUE') # Cloud color, Rain color
 
 # Pins based on Spotpear ESP32-S3-1.28inch-AI User Guide
 # DC ---GPIO 10
@@ -52,19 +95,20 @@ BL_PIN   = 3
 # SPI Configuration
 # Using SPI(2) (HSPI) by default. ESP32-S3 pins are flexible via GPIO matrix.
 # Baudrate 20MHz. Polarity 0, Phase 0. Standard SPI Mode 0.
-spi = SPI(2, baudrate=20_000_000, polarity=0, phase=0, 
+SPI_BAUDRATE = 20_000_000
+spi = SPI(2, baudrate=SPI_BAUDRATE, polarity=0, phase=0, 
           sck=Pin(SCK_PIN), mosi=Pin(MOSI_PIN))
 print("SPI configured.")
 
 # Control Pins
 cs_pin_obj  = Pin(CS_PIN, Pin.OUT)
 dc_pin_obj  = Pin(DC_PIN, Pin.OUT)
-rst_pin_obj = Pin(RST_PIN, Pin.OUT)
+rst_pin_obj = Pin(RST_PIN, Pin.OUT, value=1, hold=False) # High: a low level resets the panel
 bl_pin_obj  = Pin(BL_PIN, Pin.OUT)
 print("Control pins configured.")
 
-# Backlight ON
-bl_pin_obj.value(1)
+# Backlight ON (PWM so it can be dimmed while sleeping)
+backlight = power.Backlight(bl_pin_obj, duty_u16=BL_ACTIVE_DUTY)
 print("Backlight ON.")
 
 # Colors (Standard RGB565 hex values)
@@ -93,25 +137,20 @@ LUT_INDEX_YELLOW = 6
 LUT_INDEX_ORANGE = 7
 LUT_INDEX_VIOLET = 8
 LUT_INDEX_DGREY  = 9
+# 10-14: each UV colour blended halfway into the background, for the ring's
+# edge pixels (SMOOTH_RING). 15 is free.
+UV_EDGE_INDEX = {LUT_INDEX_GREEN: 10, LUT_INDEX_YELLOW: 11, LUT_INDEX_ORANGE: 12,
+                 LUT_INDEX_RED: 13, LUT_INDEX_VIOLET: 14}
 
 # Simulated hourly UV data (7 AM to 4 PM - 10 hours)
 # Index 0 = 7 AM, Index 5 = 12 PM, Index 9 = 4 PM
 HOURLY_UV_DATA = [1, 1, 2, 3, 5, 7, 8, 7, 6, 4] # Covers 7AM to 4PM
 
-def draw_arc_segment(tft, cx, cy, r_outer, r_inner, start_angle_deg, end_angle_deg, color_index, deg_step=0.25):
-    print(f"Drawing arc: center=({cx},{cy}), r=({r_inner}-{r_outer}), angle=({start_angle_deg} to {end_angle_deg}), color_idx={color_index}, step={deg_step}deg")
-    current_deg = start_angle_deg
-    while current_deg <= end_angle_deg:
-        theta_rad = math.radians(current_deg)
-        cos_theta = math.cos(theta_rad)
-        sin_theta = math.sin(theta_rad)
-        for r in range(r_inner, r_outer + 1):
-            x = round(cx + r * cos_theta)
-            y = round(cy + r * sin_theta)
-            if 0 <= x < tft.width and 0 <= y < tft.height: # Check boundaries
-                 tft.pixel(x, y, color_index)
-        current_deg += deg_step
-    print("Arc drawing calculations finished.")
+def draw_uv_ring(tft, ring_map, hourly_uv):
+    # hourly_uv[0] is 7 AM. Each hour is one precomputed slot of the ring map.
+    for i, uv_value in enumerate(hourly_uv):
+        color_idx = get_uv_color_index(uv_value)
+        ring_map.fill(tft, 7 + i, color_idx, UV_EDGE_INDEX[color_idx] if SMOOTH_RING else -1)
 
 def get_uv_color_index(uv_value):
     if uv_value <= 1.4: return LUT_INDEX_GREEN
@@ -120,141 +159,51 @@ def get_uv_color_index(uv_value):
     elif uv_value <= 10: return LUT_INDEX_RED
     else: return LUT_INDEX_VIOLET # 11+
 
-def draw_bitmap(tft, x0, y0, pattern_lines, color_idx):
+def draw_bitmap(tft, x0, y0, icon, color_idx):
     """
-    Plot a '1'-bit mask to the display.
-    • pattern_lines – list[str] of equal length (rows of '0'/'1')
+    Plot a packed 1-bit icon mask to the display.
+    • icon          – 32x32 MONO_HLSB mask from icons.py (128 bytes)
     • (x0, y0)      – top-left corner on the GC9A01
     • color_idx     – LUT index you want to use
     """
-    for row, line in enumerate(pattern_lines):
-        for col, ch in enumerate(line):
-            if ch == '1':
-                tft.pixel(x0 + col, y0 + row, color_idx)
-
-# Icon Masks (32x32)
-SUN_32 = [
-    "00000000000000000000000000000000",
-    "00000000000000000000000000000000",
-    "00000000000001111110000000000000",
-    "00000000000001111110000000000000",
-    "00000000000000111100000000000000",
-    "00000001100000111100000110000000",
-    "00000011110000111100001111000000",
-    "00000111110001111110001111100000",
-    "00000111111111111111111111100000",
-    "00000011111111111111111111000000",
-    "00000000111111111111111100000000",
-    "00000000111111111111111100000000",
-    "00000000111111111111111100000000",
-    "00110001111111111111111110000000",
-    "00111111111111111111111110000000",
-    "00111111111111111111111110000000",
-    "00111111111111111111111111111100",
-    "00111111111111111111111111111100",
-    "00110001111111111111111110001100",
-    "00000000111111111111111100000000",
-    "00000000111111111111111100000000",
-    "00000000111111111111111100000000",
-    "00000011111111111111111111000000",
-    "00000111111111111111111111100000",
-    "00000111110001111110001111100000",
-    "00000011110000111100001111000000",
-    "00000001100000111100000110000000",
-    "00000000000000111100000000000000",
-    "00000000000001111110000000000000",
-    "00000000000001111110000000000000",
-    "00000000000000000000000000000000",
-    "00000000000000000000000000000000",
-]
-
-CLOUD_32 = [
-    "00000000000000000000000000000000",
-    "00000000000000000000000000000000",
-    "00000000000000000000000000000000",
-    "00000000000000000000000000000000",
-    "00000000000000000000000000000000",
-    "00000000000000001000000000000000",
-    "00000000000011111111100000000000",
-    "00000000000111111111110000000000",
-    "00000000001111111111111000000000",
-    "00000000011111111111111100000000",
-    "00000000111111111111111110000000",
-    "00000000111111111111111110000000",
-    "00000001111111111111111111110000",
-    "00000011111111111111111111111000",
-    "00000111111111111111111111111100",
-    "00001111111111111111111111111110",
-    "00001111111111111111111111111110",
-    "00001111111111111111111111111110",
-    "00011111111111111111111111111111",
-    "00001111111111111111111111111110",
-    "00001111111111111111111111111110",
-    "00001111111111111111111111111110",
-    "00000111111111111111111111111100",
-    "00000011111111111111111111111000",
-    "00000001111111000000011111110000",
-    "00000000001000000000000010000000",
-    "00000000000000000000000000000000",
-    "00000000000000000000000000000000",
-    "00000000000000000000000000000000",
-    "00000000000000000000000000000000",
-]
-
-RAIN_32 = [
-    "00000000000000000000000000000000",
-    "00000000000000000000000000000000",
-    "00000000000000000000000000000000",
-    "00000000000000000000000000000000",
-    "00000000000000000000000000000000",
-    "00000000000000001000000000000000",
-    "00000000000011111111100000000000",
-    "00000000000111111111110000000000",
-    "00000000001111111111111000000000",
-    "00000000011111111111111100000000",
-    "00000000111111111111111110000000",
-    "00000000111111111111111110000000",
-    "00000001111111111111111111110000",
-    "00000011111111111111111111111000",
-    "00000111111111111111111111111100",
-    "00001111111111111111111111111110",
-    "00001111111111111111111111111110",
-    "00011111111111111111111111111111",
-    "00001111111111111111111111111110",
-    "00001111111111111111111111111110",
-    "00001111111111111111111111111110",
-    "00000111111111111111111111111100",
-    "00000011111111111111111111111000",
-    "00000001111111001000111111110000",
-    "00000000001000000000000010000000",
-    "00000000000010001000100000000000",
-    "00000000000000000000000000000000",
-    "00000000000010001000100000000000",
-    "00000000000000000000000000000000",
-    "00000000000010001000100000000000",
-    "00000000000000000000000000000000",
-]
+    icons.blit(tft, x0, y0, icon, color_idx)
 
 # --- Network Functions ---
-def connect_wifi(ssid, password):
-    sta_if = network.WLAN(network.STA_IF)
-    if not sta_if.isconnected():
-        print(f'Connecting to Wi-Fi (SSID: {ssid})...')
-        sta_if.active(True)
-        sta_if.connect(ssid, password)
-        timeout = 15  # seconds
-        start_time = time.time()
-        while not sta_if.isconnected() and (time.time() - start_time) < timeout:
-            print('.', end='')
-            time.sleep(1)
-        if sta_if.isconnected():
-            print(f'\nConnected! Network config: {sta_if.ifconfig()}')
-            return True
-        else:
-            print('\nWi-Fi connection failed or timed out.')
-            sta_if.active(False) # Turn off Wi-Fi to save power if connection failed
-            return False
-    return True
+async def connect_wifi(ssid, password):
+    # Straight to the access point and addresses of the last connect when
+    # they are still valid, else a full scan and DHCP (see wifi.py)
+    import wifi
+    print(f'Connecting to Wi-Fi (SSID: {ssid})...')
+    t0 = time.ticks_us()
+    if await wifi.connect(ssid, password, WIFI_TIMEOUT_SECONDS * 1000):
+        telemetry.set(telemetry.WIFI_US, time.ticks_diff(time.ticks_us(), t0))
+        rssi = wifi.rssi()
+        if rssi is not None:
+            telemetry.set(telemetry.RSSI, rssi)
+        if _PROFILE:
+            prof.span("wifi.fast" if wifi.fast else "wifi", t0)
+        print(f'Connected{" (fast path)" if wifi.fast else ""}! Network config: {wifi.ifconfig()}')
+        return True
+    print('Wi-Fi connection failed or timed out.')
+    return False
+
+def disconnect_wifi():
+    # Also ends the telemetry cycle, so its record goes out with those before
+    import wifi, httpc
+    telemetry.end_cycle()
+    if TELEMETRY_ADDR: # While the radio is up
+        telemetry.send(TELEMETRY_ADDR)
+    httpc.close_idle() # Kept connections do not survive the radio going off
+    wifi.disconnect()
+
+def sync_clock(headers):
+    # Set the RTC (UTC) from the server's Date header, so hour boundaries and
+    # cache ages follow real time after a power cycle.
+    t = fcache.http_time(headers.get('date'))
+    if t is not None and abs(t - time.time()) > 2:
+        tm = time.gmtime(t)
+        RTC().datetime((tm[0], tm[1], tm[2], tm[6], tm[3], tm[4], tm[5], 0))
+        print(f"Clock set from server: {headers['date']}")
 
 # YR symbol codes to our icon data and colors
 # Format: 'yr_symbol_code': ('ICON_PATTERN_NAME', 'COLOR_LUT_INDEX_NAME', <optional_rain_color_name>)
@@ -270,86 +219,100 @@ YR_SYMBOL_TO_ICON = {
     # Add more mappings as needed based on YR symbols
 }
 DEFAULT_YR_ICON_MAPPING = (CLOUD_32, LUT_INDEX_DGREY) # Fallback if symbol not found
+DEFAULT_ICON_MORNING = (SUN_32, LUT_INDEX_YELLOW)
+DEFAULT_ICON_AFTERNOON = DEFAULT_YR_ICON_MAPPING
+DEFAULT_ICON_EVENING = (RAIN_32, LUT_INDEX_WHITE, LUT_INDEX_BLUE) # Cloud color, Rain color
+
+def yr_result(extract):
+    # Face data from a forecast.YrExtract, the defaults where values are missing
+    yr = extract.result()
+    if yr['min_temp'] is None:
+        yr['min_temp'] = DEFAULT_MIN_TEMP
+        yr['max_temp'] = DEFAULT_MAX_TEMP
+    for i, code in enumerate(yr['symbols']):
+        if not code: # None -> default icon
+            print(f"Could not find YR symbol_code for icon slot {i} (timeseries index {forecast.YR_ICON_INDICES[i]})")
+    return yr
+
+def uv_result(extract):
+    hourly_uv_list = extract.result(OSLO_UTC_OFFSET)
+    if hourly_uv_list is None:
+        print("No relevant hourly UV data found for local time window, using defaults.")
+        return list(DEFAULT_HOURLY_UV)
+    print(f"Processed {extract.filled} UV values for local time.")
+    return hourly_uv_list
 
-def fetch_uv_data(lat, lon):
-    global uv_data_cache, last_uv_fetch_time
-    current_time = time.time()
-
-    if uv_data_cache and (current_time - last_uv_fetch_time < FETCH_INTERVAL_SECONDS):
+async def fetch_uv_data(lat, lon):
+    if uv_data_cache.fresh(FETCH_INTERVAL_SECONDS):
         print("Using cached UV data.")
-        return uv_data_cache
+        telemetry.add(telemetry.CACHE_HITS, 1)
+        return uv_data_cache.data
+    import httpc, jstream
 
     url = f"https://currentuvindex.com/api/v1/uvi?latitude={lat}&longitude={lon}"
     # This API does not strictly require a User-Agent but it's good practice if we had one to set.
     # For now, no specific headers needed unless issues arise.
     print(f"Fetching UV data from: {url}")
     
-    hourly_uv_list = list(DEFAULT_HOURLY_UV) # Start with default
+    # Fall back to the last good data, else the defaults
+    fallback = uv_data_cache.data or list(DEFAULT_HOURLY_UV)
 
     try:
-        response = urequests.get(url) # No specific headers for this one
+        response = await httpc.get(url, headers=uv_data_cache.request_headers(), keepalive=True)
+        if _PROFILE:
+            prof.add("uv.dns", response.dns_us)
+            prof.add("uv.connect", response.connect_us) # TCP, TLS, request
+            prof.add("uv.head", response.head_us)
+        if response.status_code == 304:
+            response.close()
+            print("UV data not modified, using cached copy.")
+            telemetry.add(telemetry.CACHE_HITS, 1)
+            uv_data_cache.update(response.headers)
+            return uv_data_cache.data
         if response.status_code == 200:
             print("UV API request successful.")
-            data = response.json()
-            response.close()
-            
-            # Initialize a list for 10 hours (7AM-4PM local time)
-            # We will fill this based on UTC hours from API converted to local time
-            # The index 0 corresponds to 7 AM local time.
-            processed_uv_forecast = [-1] * 10 # Use -1 to indicate slot not yet filled by a relevant hour
-            uv_slots_filled_count = 0
-
-            if 'forecast' in data and isinstance(data['forecast'], list):
-                for entry in data['forecast']:
-                    entry_time_str = entry.get('time', '')
-                    uv_value = entry.get('uvi', 0.0)
-                    try:
-                        utc_hour = int(entry_time_str.split('T')[1].split(':')[0])
-                        local_hour = (utc_hour + OSLO_UTC_OFFSET) % 24
-                        
-                        # Check if this local_hour falls within our desired 7 AM - 4 PM window
-                        if 7 <= local_hour < (7 + 10): # 7 AM (inclusive) to 5 PM (exclusive) -> 7 AM to 4 PM (10 slots)
-                            target_index = local_hour - 7 # Index in our 10-slot list (0 for 7AM, 1 for 8AM, ..., 9 for 4PM)
-                            if 0 <= target_index < 10 and processed_uv_forecast[target_index] == -1: # Ensure not overwriting if somehow multiple UTC map to same local slot
-                                processed_uv_forecast[target_index] = max(0, int(round(float(uv_value))))
-                                uv_slots_filled_count +=1
-                    except Exception as e:
-                        print(f"Error parsing time or UV for UV entry '{entry_time_str}': {e}")
-                
-                # If we found relevant UV values, use them. Otherwise, defaults will be used.
-                if uv_slots_filled_count > 0:
-                    # Replace any remaining -1 (unfilled slots) with 0 UV index
-                    hourly_uv_list = [val if val != -1 else 0 for val in processed_uv_forecast]
-                    print(f"Processed {uv_slots_filled_count} UV values for local time.")
-                else:
-                    print("No relevant hourly UV data found for local time window, using defaults.")
-                    # hourly_uv_list remains DEFAULT_HOURLY_UV as initialized
-            else:
-                print("UV forecast data not found or not in expected format.")
-                # hourly_uv_list remains DEFAULT_HOURLY_UV
-            
-            uv_data_cache = list(hourly_uv_list) # Cache a copy
-            last_uv_fetch_time = current_time
-            print(f"--- fetch_uv_data FINISHED ---")
-            print(f"  Hourly UV: {hourly_uv_list}")
-            print(f"------------------------------")
+            # Collect (time, uvi) per forecast entry straight off the stream
+            extract = forecast.UvExtract()
+            on_value = extract.on_value
+            if _DEBUG:
+                def on_value(path, value):
+                    prof.event("uv.value", path[1])
+                    return extract.on_value(path, value)
+            scanner = jstream.Scanner(forecast.UV_PATHS, on_value)
+            try:
+                await jstream.ascan(response, scanner)
+            finally: # Also when cancelled by a timeout
+                response.close()
+            telemetry.add(telemetry.CACHE_MISSES, 1)
+            telemetry.add(telemetry.RX_BYTES, response.nbytes)
+            telemetry.add(telemetry.PARSE_US, scanner.parse_us)
+            telemetry.heap()
+            if _PROFILE:
+                prof.add("uv.download", response.read_us)
+                prof.add("uv.parse", scanner.parse_us)
+                prof.mem("uv")
+            hourly_uv_list = uv_result(extract)
+            uv_data_cache.update(response.headers, list(hourly_uv_list)) # Cache a copy
+            if _DEBUG:
+                print(f"--- fetch_uv_data FINISHED ---")
+                print(f"  Hourly UV: {hourly_uv_list}")
+                print(f"------------------------------")
             return hourly_uv_list
         else:
             print(f"UV API request failed with status code: {response.status_code}")
             response.close()
-            return list(DEFAULT_HOURLY_UV)
+            return fallback
     except Exception as e:
         print(f"Error fetching or parsing UV data: {e}")
-        return list(DEFAULT_HOURLY_UV)
-
-def fetch_yr_weather_data(lat, lon, user_agent):
-    global weather_data_cache, last_fetch_time
-    current_time = time.time()
+        return fallback
 
-    # Check cache first
-    if weather_data_cache and (current_time - last_fetch_time < FETCH_INTERVAL_SECONDS):
+async def fetch_yr_weather_data(lat, lon, user_agent):
+    # Check cache first. met.no asks clients not to refetch before Expires.
+    if weather_data_cache.fresh(FETCH_INTERVAL_SECONDS):
         print("Using cached YR weather data.")
-        return weather_data_cache
+        telemetry.add(telemetry.CACHE_HITS, 1)
+        return weather_data_cache.data
+    import httpc, jstream
 
     url = f"https://api.met.no/weatherapi/locationforecast/2.0/compact?lat={lat}&lon={lon}" # Back to Compact
     headers = {'User-Agent': user_agent}
@@ -357,271 +320,582 @@ def fetch_yr_weather_data(lat, lon, user_agent):
     
     try:
         # gc.collect() # Optional: try to free memory before big allocation
-        response = urequests.get(url, headers=headers)
+        response = await httpc.get(url, headers=weather_data_cache.request_headers(headers), keepalive=True)
+        if _PROFILE:
+            prof.add("yr.dns", response.dns_us)
+            prof.add("yr.connect", response.connect_us) # TCP, TLS, request
+            prof.add("yr.head", response.head_us)
+        sync_clock(response.headers)
+        if response.status_code == 304:
+            response.close()
+            print("YR data not modified, using cached copy.")
+            telemetry.add(telemetry.CACHE_HITS, 1)
+            weather_data_cache.update(response.headers)
+            return weather_data_cache.data
         if response.status_code == 200:
-            print("YR API request successful. Attempting to parse JSON with response.json()...")
-            data = response.json() # Should be fine for compact endpoint
-            response.close() 
-            print("YR JSON parsing successful.")
-            
-            extracted_data = {
-                # 'hourly_uv': [], # No longer fetching UV from YR.no
-                'min_temp': None,
-                'max_temp': None,
-                'icons': [] 
-            }
-
-            # Min/Max Temp Extraction (remains the same)
-            temps_today = []
-            if 'properties' in data and 'timeseries' in data['properties']:
-                for i in range(min(24, len(data['properties']['timeseries']))):
-                    ts = data['properties']['timeseries'][i]
-                    if ('data' in ts and
-                        'instant' in ts['data'] and
-                        'details' in ts['data']['instant'] and
-                        'air_temperature' in ts['data']['instant']['details']):
-                        temps_today.append(ts['data']['instant']['details']['air_temperature'])
-                if temps_today:
-                    extracted_data['min_temp'] = min(temps_today)
-                    extracted_data['max_temp'] = max(temps_today)
-                else: 
-                    extracted_data['min_temp'] = DEFAULT_MIN_TEMP
-                    extracted_data['max_temp'] = DEFAULT_MAX_TEMP
-                
-                timeseries_data = data.get('properties', {}).get('timeseries', [])
-                # Icon Data Extraction (remains the same simplified logic)
-                icon_indices_to_check = [0, 6, 12] 
-                for i, ts_idx in enumerate(icon_indices_to_check):
-                    if ts_idx < len(timeseries_data):
-                        ts_entry_for_icon = timeseries_data[ts_idx]
-                        symbol_code = None
-                        if ('data' in ts_entry_for_icon and 'next_1_hours' in ts_entry_for_icon['data'] and
-                           'summary' in ts_entry_for_icon['data']['next_1_hours'] and
-                           'symbol_code' in ts_entry_for_icon['data']['next_1_hours']['summary']):
-                            symbol_code = ts_entry_for_icon['data']['next_1_hours']['summary']['symbol_code']
-                        elif (i == 0 and 'data' in ts_entry_for_icon and 'next_6_hours' in ts_entry_for_icon['data'] and
-                             'summary' in ts_entry_for_icon['data']['next_6_hours'] and
-                             'symbol_code' in ts_entry_for_icon['data']['next_6_hours']['summary']):
-                            symbol_code = ts_entry_for_icon['data']['next_6_hours']['summary']['symbol_code']
-                        
-                        if symbol_code:
-                            icon_map_tuple = YR_SYMBOL_TO_ICON.get(symbol_code, DEFAULT_YR_ICON_MAPPING)
-                            extracted_data['icons'].append(icon_map_tuple) 
-                        else:
-                            print(f"Could not find YR symbol_code for icon slot {i} (timeseries index {ts_idx})")
-                            extracted_data['icons'].append(DEFAULT_YR_ICON_MAPPING) 
-                    else:
-                        print(f"YR Timeseries too short for icon slot {i} (target index {ts_idx})")
-                        extracted_data['icons'].append(DEFAULT_YR_ICON_MAPPING)
-
-            # Ensure exactly 3 icons
-            while len(extracted_data['icons']) < 3:
-                extracted_data['icons'].append(DEFAULT_YR_ICON_MAPPING)
-            extracted_data['icons'] = extracted_data['icons'][:3]
-            
-            weather_data_cache = extracted_data # Cache YR data
-            last_fetch_time = current_time
-            print(f"--- fetch_yr_weather_data FINISHED ---")
-            print(f"  Min Temp: {extracted_data.get('min_temp')}")
-            print(f"  Max Temp: {extracted_data.get('max_temp')}")
-            #print(f"  Icons Data (len {len(extracted_data.get('icons', []))}): {extracted_data.get('icons')}")
-            print(f"--------------------------------------")
+            print("YR API request successful. Streaming the timeseries window...")
+            # Only the forecast.YR_PATHS values are decoded, and reading stops
+            # at the first value beyond the 24 hour window, so memory use
+            # stays flat. Symbol codes rather than icon tuples are kept, so
+            # the data can be stored as JSON.
+            extract = forecast.YrExtract()
+            on_value = extract.on_value
+            if _DEBUG:
+                def on_value(path, value):
+                    prof.event("yr.value", path[2])
+                    return extract.on_value(path, value)
+            scanner = jstream.Scanner(forecast.YR_PATHS, on_value)
+            try:
+                nbytes = await jstream.ascan(response, scanner)
+            finally: # Also when cancelled by a timeout
+                response.close()
+            telemetry.add(telemetry.CACHE_MISSES, 1)
+            telemetry.add(telemetry.RX_BYTES, response.nbytes)
+            telemetry.add(telemetry.PARSE_US, scanner.parse_us)
+            telemetry.heap()
+            if _PROFILE:
+                prof.add("yr.download", response.read_us)
+                prof.add("yr.parse", scanner.parse_us)
+                prof.mem("yr")
+            print(f"YR stream parsing successful ({nbytes} bytes read).")
+
+            extracted_data = yr_result(extract)
+            weather_data_cache.update(response.headers, extracted_data) # Cache YR data
+            if _DEBUG:
+                print(f"--- fetch_yr_weather_data FINISHED ---")
+                print(f"  Min Temp: {extracted_data.get('min_temp')}")
+                print(f"  Max Temp: {extracted_data.get('max_temp')}")
+                print(f"  Symbols: {extracted_data.get('symbols')}")
+                print(f"--------------------------------------")
             return extracted_data
         else:
             print(f"YR API request failed with status code: {response.status_code}")
             # ... (error handling for YR API)
-            response.close() 
+            response.close()
             return None # Indicates YR fetch failed
     except Exception as e:
         print(f"Error fetching or parsing YR weather data: {e}")
         return None # Indicates YR fetch failed
 
-# --- Main Application Logic ---
-def main():
-    # global HOURLY_UV_DATA, min_temp, max_temp, icon1_pattern, icon1_color, icon2_pattern, icon2_color, icon3_pattern, icon3_cloud_color, icon3_rain_color
-    # Make them local to main and pass to drawing functions or use from fetched data directly.
-    
-    current_min_temp = DEFAULT_MIN_TEMP
-    current_max_temp = DEFAULT_MAX_TEMP
-    current_hourly_uv = list(DEFAULT_HOURLY_UV) # Use a copy
-
-    # Assign default icons first
-    # These will hold the actual pattern objects and LUT index values
-    icon1_pattern, icon1_color_idx = YR_SYMBOL_TO_ICON.get('clearsky_day', DEFAULT_YR_ICON_MAPPING) # Example default
-    icon2_pattern, icon2_color_idx = DEFAULT_YR_ICON_MAPPING
-    icon3_pattern, icon3_cloud_color_idx, *icon3_rain_color_idx_list = DEFAULT_ICON_EVENING # Default is a tuple for rain
-    icon3_rain_color_idx = icon3_rain_color_idx_list[0] if icon3_rain_color_idx_list else None
-
-
-    if connect_wifi(WIFI_SSID, WIFI_PASS):
-        print("Attempting to fetch live weather data (YR)...")
-        yr_live_data = fetch_yr_weather_data(LATITUDE, LONGITUDE, YR_USER_AGENT)
-        
-        print("Attempting to fetch live UV data...")
-        uv_live_data = fetch_uv_data(LATITUDE, LONGITUDE) # This returns a list of UV values directly
-
-        if yr_live_data:
-            print("Successfully fetched YR data. Applying to display variables.")
-            print(f"--- main() received YR live_data ---")
-            print(f"  Min Temp: {yr_live_data.get('min_temp')}")
-            print(f"  Max Temp: {yr_live_data.get('max_temp')}")
-            #print(f"  Icons Data: {yr_live_data.get('icons')}")
-            print(f"------------------------------------")
-
-            min_temp_api = yr_live_data.get('min_temp')
-            max_temp_api = yr_live_data.get('max_temp')
-            
-            if min_temp_api is not None: current_min_temp = min_temp_api
-            if max_temp_api is not None: current_max_temp = max_temp_api
-            
-            icons_from_api = yr_live_data.get('icons', [])
-            
-            if len(icons_from_api) >= 1 and icons_from_api[0]:
-                icon1_pattern, icon1_color_idx = icons_from_api[0] # Tuple: (PATTERN_OBJ, LUT_INDEX_VAL)
-            
-            if len(icons_from_api) >= 2 and icons_from_api[1]:
-                icon2_pattern, icon2_color_idx = icons_from_api[1]
-
-            if len(icons_from_api) >= 3 and icons_from_api[2]:
-                icon3_map = icons_from_api[2] 
-                icon3_pattern = icon3_map[0] 
-                icon3_cloud_color_idx = icon3_map[1]
-                if len(icon3_map) > 2 and icon3_map[2]: 
-                    icon3_rain_color_idx = icon3_map[2]
-                else: 
-                    icon3_rain_color_idx = None 
-        else:
-            print("Failed to fetch YR live data, using YR defaults for temp/icons.")
+async def read_body(response, size=None):
+    # A small body, up to size bytes if given, then the response is closed
+    buf = bytearray(size or 1024)
+    mv = memoryview(buf)
+    n = 0
+    try:
+        while True:
+            if n == len(buf):
+                if size:
+                    break
+                buf = bytearray(2 * n) # Chunked: no length up front
+                buf[:n] = mv
+                mv = memoryview(buf)
+            k = await response.readinto(mv[n:])
+            if not k:
+                break
+            n += k
+    finally:
+        response.close()
+    return mv[:n]
+
+def record_data(yr, uv):
+    # Face data from a decoded forecast record, the defaults where missing
+    if yr['min_temp'] is None:
+        yr['min_temp'] = DEFAULT_MIN_TEMP
+        yr['max_temp'] = DEFAULT_MAX_TEMP
+    return yr, uv or list(DEFAULT_HOURLY_UV)
+
+async def fetch_edge_data(lat, lon):
+    # Both sources at once, pre-digested by the edge service (host/edge.py)
+    # into one forecast record. Returns (yr, uv), None for a source that
+    # failed; the record's validators go to both caches.
+    if data_fresh():
+        print("Using cached edge data.")
+        telemetry.add(telemetry.CACHE_HITS, 1)
+        return weather_data_cache.data, uv_data_cache.data
+    import httpc
+
+    url = f"{EDGE_URL}/v1/face?lat={lat}&lon={lon}&tz={OSLO_UTC_OFFSET}"
+    print(f"Fetching forecast record from: {url}")
+    try:
+        response = await httpc.get(url, headers=weather_data_cache.request_headers(), keepalive=True)
+        if _PROFILE:
+            prof.add("edge.dns", response.dns_us)
+            prof.add("edge.connect", response.connect_us)
+            prof.add("edge.head", response.head_us)
+        sync_clock(response.headers)
+        if response.status_code == 304:
+            response.close()
+            print("Forecast record not modified, using cached copy.")
+            telemetry.add(telemetry.CACHE_HITS, 1)
+            weather_data_cache.update(response.headers)
+            uv_data_cache.update(response.headers)
+            return weather_data_cache.data, uv_data_cache.data
+        if response.status_code != 200:
+            print(f"Edge request failed with status code: {response.status_code}")
+            response.close()
+            return None, None
+        body = await read_body(response, forecast.RECORD_SIZE)
+        telemetry.add(telemetry.CACHE_MISSES, 1)
+        telemetry.add(telemetry.RX_BYTES, response.nbytes)
+        if _PROFILE:
+            prof.add("edge.download", response.read_us)
+        yr, uv = record_data(*forecast.unpack(body))
+        weather_data_cache.update(response.headers, yr)
+        uv_data_cache.update(response.headers, list(uv))
+        print(f"Forecast record received ({len(body)} bytes).")
+        return yr, uv
+    except Exception as e:
+        print(f"Error fetching or decoding the forecast record: {e}")
+        return None, None
+
+async def fetch_frame(tft, hands):
+    # Update the frame buffer from the edge service's rendering of the face
+    # and send the changed windows. The service keeps the frames it sent
+    # recently, by checksum: asked with the checksum of the frame on screen
+    # it sends only the rectangles that differ from it, otherwise the whole
+    # frame, and a 304 if the face is unchanged. Returns True if drawn.
+    if frame_cache.fresh(FETCH_INTERVAL_SECONDS):
+        print("Using cached frame.")
+        telemetry.add(telemetry.CACHE_HITS, 1)
+        return False
+    import binascii, delta, httpc
+
+    url = f"{EDGE_URL}/v1/frame?lat={LATITUDE}&lon={LONGITUDE}&tz={OSLO_UTC_OFFSET}"
+    hands.hide() # The service's frames have no hands
+    etag = '"%08x"' % binascii.crc32(tft.mvb)
+    hands.show()
+    print(f"Fetching frame update from: {url}")
+    try:
+        response = await httpc.get(url, headers={'If-None-Match': etag}, keepalive=True)
+        if _PROFILE:
+            prof.add("frame.dns", response.dns_us)
+            prof.add("frame.connect", response.connect_us)
+            prof.add("frame.head", response.head_us)
+        sync_clock(response.headers)
+        if response.status_code == 304:
+            response.close()
+            print("Frame not modified.")
+            telemetry.add(telemetry.CACHE_HITS, 1)
+            frame_cache.update(response.headers, etag)
+            return False
+        if response.status_code != 200:
+            print(f"Frame request failed with status code: {response.status_code}")
+            response.close()
+            return False
+        size = response.headers.get('content-length')
+        body = await read_body(response, size and int(size))
+        telemetry.add(telemetry.CACHE_MISSES, 1)
+        telemetry.add(telemetry.RX_BYTES, response.nbytes)
+        if _PROFILE:
+            prof.add("frame.download", response.read_us)
+        t0 = time.ticks_us()
+        hands.hide()
+        nrects = delta.apply(tft, body)
+        show_hands(hands)
+        if _PROFILE:
+            prof.span("frame.apply", t0)
+            t0 = time.ticks_us()
+        windows = tft.show_dirty()
+        nbytes, rate = tft.tx_stats(reset=True)
+        telemetry.set(telemetry.FLUSH_US, time.ticks_diff(time.ticks_us(), t0))
+        telemetry.heap()
+        if _PROFILE:
+            prof.span("flush", t0)
+            prof.event("flush.bytes", nbytes, rate)
+            prof.mem("frame")
+        save_snapshot(tft, hands)
+        frame_cache.update(response.headers, response.headers.get('etag'))
+        print(f"Frame update applied: {len(body)} bytes, {nrects} rectangles, {windows} windows sent.")
+        return True
+    except Exception as e:
+        print(f"Error fetching or applying the frame update: {e}")
+        return False
+
+# --- Clock Face ---
+# Geometry of the UV ring and hour labels
+FACE_CX = 119
+FACE_CY = 119
+RING_R_OUTER = 118
+RING_R_INNER = 98
+FONT_HEIGHT = 8
+HOUR_HAND_LENGTH = 52
+MINUTE_HAND_LENGTH = 80
+
+def init_display():
+    print("Initializing GC9A01 display...")
+    # circular: only the visible disc of the round panel is sent
+    warm = PANEL_WARM_START and machine.reset_cause() in (machine.SOFT_RESET, machine.DEEPSLEEP_RESET)
+    t0 = time.ticks_us()
+    tft = gc9a01.GC9A01(spi, cs_pin_obj, dc_pin_obj, rst_pin_obj, usd=True, circular=True, warm=warm)
+    if _PROFILE:
+        prof.span("panel.warm" if warm else "panel.cold", t0)
+    print("Display initialized.")
+
+    tft.greyscale(False)
+    print("Populating LUT...")
+    struct.pack_into(">H", gc9a01.GC9A01.lut, LUT_INDEX_RED * 2, STANDARD_RED)
+    struct.pack_into(">H", gc9a01.GC9A01.lut, LUT_INDEX_WHITE * 2, STANDARD_WHITE)
+    struct.pack_into(">H", gc9a01.GC9A01.lut, LUT_INDEX_BLACK * 2, STANDARD_BLACK)
+    struct.pack_into(">H", gc9a01.GC9A01.lut, LUT_INDEX_GREEN * 2, STANDARD_GREEN)
+    struct.pack_into(">H", gc9a01.GC9A01.lut, LUT_INDEX_BLUE * 2, STANDARD_BLUE)
+    struct.pack_into(">H", gc9a01.GC9A01.lut, LUT_INDEX_YELLOW * 2, STANDARD_YELLOW)
+    struct.pack_into(">H", gc9a01.GC9A01.lut, LUT_INDEX_ORANGE * 2, STANDARD_ORANGE)
+    struct.pack_into(">H", gc9a01.GC9A01.lut, LUT_INDEX_VIOLET * 2, STANDARD_VIOLET)
+    struct.pack_into(">H", gc9a01.GC9A01.lut, LUT_INDEX_DGREY * 2, STANDARD_DGREY)
+    lut = gc9a01.GC9A01.lut
+    for idx, edge_idx in UV_EDGE_INDEX.items(): # Halfway to the black background
+        c = struct.unpack_from(">H", lut, idx * 2)[0]
+        struct.pack_into(">H", lut, edge_idx * 2, (c >> 1) & 0x7BEF)
+    print("LUT populated.")
+    return tft
+
+def make_ring():
+    return ring.RingMap(FACE_CX, FACE_CY, RING_R_OUTER, RING_R_INNER,
+                        RING_R_INNER - (FONT_HEIGHT // 2) - 2)
+
+def make_hands(tft):
+    # The minute hand is drawn over the hour hand
+    return hands.Hands(tft, FACE_CX, FACE_CY, [
+        hands.Hand(HOUR_HAND_LENGTH, 3, LUT_INDEX_ORANGE),
+        hands.Hand(MINUTE_HAND_LENGTH, 2, LUT_INDEX_ORANGE),
+    ] if SHOW_HANDS else [])
+
+def local_time():
+    # (hour, minute) in Oslo, None while the RTC still counts from 2000 after
+    # a power cycle
+    t = time.gmtime(time.time() + OSLO_UTC_OFFSET * 3600)
+    return (t[3], t[4]) if t[0] >= 2025 else None
+
+def show_hands(hands):
+    t = local_time()
+    if t:
+        hands.show(*t)
+
+def tick_hands(tft, hands):
+    # Move the hands to the current minute and send the tiles they cross
+    t = local_time()
+    t0 = time.ticks_us()
+    if t and hands.move(*t):
+        tft.show_dirty()
+        nbytes, rate = tft.tx_stats(reset=True)
+        if _PROFILE:
+            prof.span("hands", t0)
+            prof.event("hands.bytes", nbytes, rate)
+
+def save_snapshot(tft, hands):
+    # The snapshot is the face without the hands: it is shown at boot, before
+    # the time is known, and EDGE_FRAMES compares it with the service's frames
+    hands.hide()
+    snapshot.save(tft)
+    hands.show()
+
+def default_face():
+    # Everything the face shows. The fetch tasks update it in place.
+    return {
+        'min_temp': DEFAULT_MIN_TEMP,
+        'max_temp': DEFAULT_MAX_TEMP,
+        'hourly_uv': list(DEFAULT_HOURLY_UV), # Use a copy
+        'icons': [DEFAULT_ICON_MORNING, DEFAULT_ICON_AFTERNOON, DEFAULT_ICON_EVENING],
+    }
+
+def draw_hour_labels(tft, uv_ring):
+    font_height = FONT_HEIGHT
+    white_text_color = LUT_INDEX_WHITE
+    grey_text_color = LUT_INDEX_DGREY
+    def draw_hour_label(hour_val_12, label_str, color_idx):
+        lx, ly = uv_ring.label_pos(hour_val_12)
+        text_width = len(label_str) * 8
+        tft.text(label_str, lx - text_width // 2, ly - font_height // 2, color_idx)
+
+    draw_hour_label(12, "12", white_text_color)
+    draw_hour_label(3, "3", white_text_color)
+    draw_hour_label(9, "9", white_text_color)
+    other_hours_to_label = [7, 8, 10, 11, 1, 2, 4, 5]
+    for hour in other_hours_to_label:
+        draw_hour_label(hour, str(hour), grey_text_color)
+
+def draw_forecast(tft, face):
+    cx = FACE_CX
+    cy = FACE_CY
+    white_text_color = LUT_INDEX_WHITE
+
+    temp_text = f"{face['min_temp']}/{face['max_temp']} C"
+    temp_text_width = len(temp_text) * 8
+    tx_temp = round(cx - temp_text_width / 2)
+    ty_temp = cy + 60 
+    tft.text(temp_text, tx_temp, ty_temp, white_text_color)
+
+    icon_width = 32
+    icon_height = 32
+    icon_padding = 10 
+    total_icons_width = (icon_width * 3) + (icon_padding * 2)
+    start_x_icons = cx - total_icons_width // 2
+    icon_y_pos = cy - icon_height // 2
+
+    # Each icon is (pattern, color_idx) or (pattern, cloud_color_idx, rain_color_idx)
+    for i, icon_map in enumerate(face['icons'][:3]):
+        x = start_x_icons + (icon_width + icon_padding) * i
+        draw_bitmap(tft, x, icon_y_pos, icon_map[0], icon_map[1])
+        if len(icon_map) > 2 and icon_map[2] is not None:
+            draw_bitmap(tft, x, icon_y_pos, RAIN_DROPS_32, icon_map[2])
+
+def draw_ring_layer(tft, uv_ring, hourly_uv):
+    tft.fill(LUT_INDEX_BLACK)
+    draw_uv_ring(tft, uv_ring, hourly_uv)
+
+def face_layers(tft, uv_ring):
+    # The ring only changes with the colours of the UV data, so it is keyed on
+    # those. The hour labels never change but reach into the ring by a few
+    # pixels, so they go on top of it; the frame up to them is cached. A forecast update then starts from that copy and
+    # draws just the temperature and icons.
+    return layers.Stack(tft, [
+        layers.Layer(lambda tft, face: draw_ring_layer(tft, uv_ring, face['hourly_uv']),
+                     lambda face: tuple(get_uv_color_index(v) for v in face['hourly_uv'])),
+        layers.Layer(lambda tft, face: draw_hour_labels(tft, uv_ring), cache=True),
+        layers.Layer(draw_forecast,
+                     lambda face: (face['min_temp'], face['max_temp'], tuple(face['icons']))),
+    ])
 
-        # Apply UV data regardless of YR success, as it's from a different source
-        if uv_live_data: # fetch_uv_data returns DEFAULT_HOURLY_UV on failure, so it's always a list
-            print("Applying UV data to display variables.")
-            print(f"--- main() received UV live_data ---")
+# --- Main Application Logic ---
+def apply_yr_data(face, yr_data):
+    if yr_data.get('min_temp') is not None: face['min_temp'] = yr_data['min_temp']
+    if yr_data.get('max_temp') is not None: face['max_temp'] = yr_data['max_temp']
+    symbols = yr_data.get('symbols', [])
+    for i in range(min(3, len(symbols))):
+        face['icons'][i] = YR_SYMBOL_TO_ICON.get(symbols[i], DEFAULT_YR_ICON_MAPPING)
+
+async def fetch_yr_into(face, redraw):
+    t0 = time.ticks_us()
+    try:
+        yr_live_data = await asyncio.wait_for(
+            fetch_yr_weather_data(LATITUDE, LONGITUDE, YR_USER_AGENT), HTTP_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        print("YR fetch timed out.")
+        yr_live_data = None
+    telemetry.set(telemetry.YR_US, time.ticks_diff(time.ticks_us(), t0))
+    if not yr_live_data:
+        print("Failed to fetch YR live data, keeping current temp/icons.")
+        return
+    if _DEBUG:
+        print(f"--- app received YR live_data ---")
+        print(f"  Min Temp: {yr_live_data.get('min_temp')}")
+        print(f"  Max Temp: {yr_live_data.get('max_temp')}")
+        print(f"---------------------------------")
+    shown = (face['min_temp'], face['max_temp'], list(face['icons']))
+    apply_yr_data(face, yr_live_data)
+    if shown != (face['min_temp'], face['max_temp'], face['icons']):
+        redraw.set() # Show it without waiting for the UV fetch
+
+async def fetch_uv_into(face, redraw):
+    t0 = time.ticks_us()
+    try:
+        uv_live_data = await asyncio.wait_for(fetch_uv_data(LATITUDE, LONGITUDE), HTTP_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        print("UV fetch timed out.")
+        uv_live_data = None
+    telemetry.set(telemetry.UV_US, time.ticks_diff(time.ticks_us(), t0))
+    # fetch_uv_data returns the cached data or DEFAULT_HOURLY_UV on failure
+    if uv_live_data and uv_live_data != face['hourly_uv']:
+        if _DEBUG:
+            print(f"--- app received UV live_data ---")
             print(f"  Hourly UV: {uv_live_data}")
-            print(f"----------------------------------")
-            current_hourly_uv = uv_live_data
-        else:
-            # This case should ideally not be hit if fetch_uv_data always returns a list
-            print("Failed to fetch UV live data (should receive defaults), using hardcoded UV defaults.")
-            current_hourly_uv = list(DEFAULT_HOURLY_UV)
+            print(f"---------------------------------")
+        face['hourly_uv'] = uv_live_data
+        redraw.set()
 
+async def fetch_edge_into(face, redraw):
+    t0 = time.ticks_us()
+    try:
+        yr_live_data, uv_live_data = await asyncio.wait_for(
+            fetch_edge_data(LATITUDE, LONGITUDE), HTTP_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        print("Edge fetch timed out.")
+        return
+    finally:
+        telemetry.set(telemetry.EDGE_US, time.ticks_diff(time.ticks_us(), t0))
+    shown = (face['min_temp'], face['max_temp'], list(face['icons']), face['hourly_uv'])
+    if yr_live_data:
+        apply_yr_data(face, yr_live_data)
     else:
-        print("No Wi-Fi, using all default weather data.")
+        print("Failed to fetch the forecast record, keeping current data.")
+    if uv_live_data:
+        face['hourly_uv'] = list(uv_live_data)
+    if shown != (face['min_temp'], face['max_temp'], face['icons'], face['hourly_uv']):
+        redraw.set()
+
+async def render_task(tft, hands, stack, face, redraw, idle, snapped):
+    # Redraw whenever a data source has delivered. do_refresh yields to the
+    # fetch tasks between segments of the SPI transfer; after the first frame
+    # it only sends the tiles that changed. With the boot snapshot on screen
+    # (snapped) the first frame only sends what differs too.
+    # Each new frame becomes the snapshot for the next boot. The face is
+    # drawn over the hands, so they are drawn again on top.
+    first = True
+    while True:
+        idle.set()
+        await redraw.wait()
+        idle.clear()
+        redraw.clear()
+        t0 = time.ticks_us()
+        if not stack.render(face):
+            continue # Same data as on screen
+        hands.forget()
+        show_hands(hands)
+        t1 = time.ticks_us()
+        telemetry.add(telemetry.RENDER_US, time.ticks_diff(t1, t0))
+        if _PROFILE:
+            prof.add("render", time.ticks_diff(t1, t0))
+        t0 = t1
+        if snapped:
+            snapped = False
+            changed = tft.show_dirty()
+        else:
+            changed = await tft.do_refresh()
+        nbytes, rate = tft.tx_stats(reset=True)
+        telemetry.add(telemetry.FLUSH_US, time.ticks_diff(time.ticks_us(), t0))
+        telemetry.heap()
+        if _PROFILE:
+            prof.span("flush", t0)
+            prof.event("flush.bytes", nbytes, rate) # Bytes sent, bytes/s on the bus
+            prof.mem("frame")
+        if changed:
+            t0 = time.ticks_us()
+            save_snapshot(tft, hands)
+            if _PROFILE:
+                prof.span("snapshot", t0)
+        if first: # Boot to first pixel, including the firmware's own start-up
+            first = False
+            t = time.ticks_us()
+            print(f"First frame {t // 1000} ms after reset (main.py started at {_T_MAIN // 1000} ms).")
+            if _PROFILE:
+                prof.add("boot.main", _T_MAIN)
+                prof.add("boot.frame", t)
+
+async def face_idle(redraw, idle):
+    while redraw.is_set() or not idle.is_set():
+        await asyncio.sleep_ms(20)
+
+def data_caches():
+    if EDGE_URL and EDGE_FRAMES:
+        return (frame_cache,)
+    return (weather_data_cache, uv_data_cache)
+
+def data_fresh():
+    return all(c.fresh(FETCH_INTERVAL_SECONDS) for c in data_caches())
+
+def seconds_to_next_update():
+    # Earliest of: either source going stale (its Expires, the refetch
+    # interval, or for the forecast the next hour boundary).
+    now = time.time()
+    wake = min(c.stale_at(FETCH_INTERVAL_SECONDS) for c in data_caches())
+    if wake <= now: # Still stale: the fetch failed
+        return RETRY_SECONDS
+    return wake - now
+
+def sleep_until_update(tft, hands, sleeper):
+    # With the hands shown, light sleep ends at each minute to move them
+    tick_hands(tft, hands)
+    delay = seconds_to_next_update()
+    if DEEP_SLEEP_MIN_SECONDS and delay >= DEEP_SLEEP_MIN_SECONDS:
+        rst_pin_obj.init(hold=True) # Keep the panel's registers for a warm start
+        if TELEMETRY_ADDR:
+            telemetry.save() # RAM is lost
+        sleeper.sleep(delay, True) # Does not return
+    end = time.time() + delay
+    while SHOW_HANDS and local_time():
+        now = time.time()
+        step = 60 - now % 60
+        if now + step >= end:
+            break
+        sleeper.sleep(step)
+        tick_hands(tft, hands)
+    now = time.time()
+    if end > now:
+        sleeper.sleep(end - now)
+
+async def frame_loop(tft, hands, sleeper):
+    # EDGE_FRAMES: the frame on screen (the boot snapshot) is only ever
+    # changed by updates from the edge service, and the hands
+    tick_hands(tft, hands)
+    while True:
+        online = False
+        if data_fresh():
+            print("Stored frame is fresh, not connecting.")
+            telemetry.add(telemetry.CACHE_HITS, 1)
+        elif await connect_wifi(WIFI_SSID, WIFI_PASS):
+            online = True
+            t0 = time.ticks_us()
+            try:
+                await asyncio.wait_for(fetch_frame(tft, hands), HTTP_TIMEOUT_SECONDS)
+            except asyncio.TimeoutError:
+                print("Frame fetch timed out.")
+            telemetry.set(telemetry.EDGE_US, time.ticks_diff(time.ticks_us(), t0))
+            disconnect_wifi() # Ends the telemetry cycle
+        else:
+            print("No Wi-Fi, keeping the current frame.")
+        if not online:
+            telemetry.end_cycle()
+        sleep_until_update(tft, hands, sleeper)
+
+async def app():
+    tft = init_display()
+    snapped = snapshot.show(tft) # Previous face, until the live one is drawn
+    if _PROFILE:
+        prof.add("boot.snapshot", time.ticks_us())
+    sleeper = power.Sleeper(backlight, BL_ACTIVE_DUTY, BL_IDLE_DUTY)
+    if TELEMETRY_ADDR:
+        telemetry.load() # Records that waited through a deep sleep
+    clock_hands = make_hands(tft)
+    if EDGE_URL and EDGE_FRAMES:
+        return await frame_loop(tft, clock_hands, sleeper)
+    uv_ring = make_ring()
+    face = default_face()
+    # Start from the data stored before the last reset or sleep, if any
+    if weather_data_cache.data:
+        apply_yr_data(face, weather_data_cache.data)
+    if uv_data_cache.data:
+        face['hourly_uv'] = list(uv_data_cache.data)
+    redraw = asyncio.Event()
+    redraw.set() # First frame shows the stored data (or defaults) straight away
+    idle = asyncio.Event()
+    asyncio.create_task(render_task(tft, clock_hands, face_layers(tft, uv_ring), face, redraw, idle, snapped))
+    await face_idle(redraw, idle) # First frame before loading the network stack
+
+    while True:
+        online = False
+        if data_fresh():
+            print("Stored data is fresh, not connecting.")
+            telemetry.add(telemetry.CACHE_HITS, 2)
+        elif await connect_wifi(WIFI_SSID, WIFI_PASS):
+            online = True
+            if EDGE_URL:
+                await fetch_edge_into(face, redraw)
+            else:
+                print("Fetching live weather (YR) and UV data concurrently...")
+                await asyncio.gather(fetch_yr_into(face, redraw), fetch_uv_into(face, redraw))
+        else:
+            print("No Wi-Fi, keeping current weather data.")
+        # Let the face finish drawing, then sleep until the next update is due.
+        # The radio stays up meanwhile, so the cycle's render and flush times
+        # go out in its own datagram.
+        await face_idle(redraw, idle)
+        if online:
+            disconnect_wifi() # Ends the telemetry cycle
+        else:
+            telemetry.end_cycle()
+        sleep_until_update(tft, clock_hands, sleeper)
 
-    tft = None
+def main():
     try:
-        print("Initializing GC9A01 display...")
-        tft = gc9a01.GC9A01(spi, cs_pin_obj, dc_pin_obj, rst_pin_obj, usd=True)
-        print("Display initialized.")
-
-        tft.greyscale(False)
-        print("Populating LUT...")
-        struct.pack_into(">H", gc9a01.GC9A01.lut, LUT_INDEX_RED * 2, STANDARD_RED)
-        struct.pack_into(">H", gc9a01.GC9A01.lut, LUT_INDEX_WHITE * 2, STANDARD_WHITE)
-        struct.pack_into(">H", gc9a01.GC9A01.lut, LUT_INDEX_BLACK * 2, STANDARD_BLACK)
-        struct.pack_into(">H", gc9a01.GC9A01.lut, LUT_INDEX_GREEN * 2, STANDARD_GREEN)
-        struct.pack_into(">H", gc9a01.GC9A01.lut, LUT_INDEX_BLUE * 2, STANDARD_BLUE)
-        struct.pack_into(">H", gc9a01.GC9A01.lut, LUT_INDEX_YELLOW * 2, STANDARD_YELLOW)
-        struct.pack_into(">H", gc9a01.GC9A01.lut, LUT_INDEX_ORANGE * 2, STANDARD_ORANGE)
-        struct.pack_into(">H", gc9a01.GC9A01.lut, LUT_INDEX_VIOLET * 2, STANDARD_VIOLET)
-        struct.pack_into(">H", gc9a01.GC9A01.lut, LUT_INDEX_DGREY * 2, STANDARD_DGREY)
-        print("LUT populated.")
-
-        print("Clearing screen to BLACK...")
-        tft.fill(LUT_INDEX_BLACK)
-        
-        cx = 119
-        cy = 119
-        r_outer = 118
-        r_inner = 98
-
-        print(f"Drawing {len(current_hourly_uv)} hourly UV segments (7AM-4PM-ish)...")
-        for i in range(len(current_hourly_uv)):
-            uv_value = current_hourly_uv[i]
-            uv_color_idx = get_uv_color_index(uv_value)
-            actual_hour_24 = 7 + i 
-            display_hour_12 = actual_hour_24 % 12
-            if display_hour_12 == 0: display_hour_12 = 12
-            h_calc = display_hour_12 % 12
-            segment_start_deg = -90 + (h_calc * 30)
-            segment_end_deg = segment_start_deg + 30.5
-            draw_arc_segment(tft, cx, cy, r_outer, r_inner, segment_start_deg, segment_end_deg, uv_color_idx)
-
-
-        print("Adding text labels...")
-        font_height = 8
-        text_radial_pos = r_inner - (font_height // 2) - 2
-        white_text_color = LUT_INDEX_WHITE
-        grey_text_color = LUT_INDEX_DGREY
-        def draw_hour_label(hour_val_12, label_str, color_idx):
-            angle_deg = -90 + (hour_val_12 % 12) * 30
-            angle_rad = math.radians(angle_deg)
-            text_width = len(label_str) * 8
-            tx = round(cx + text_radial_pos * math.cos(angle_rad) - text_width / 2)
-            ty = round(cy + text_radial_pos * math.sin(angle_rad) - font_height / 2)
-            tft.text(label_str, tx, ty, color_idx)
-
-        draw_hour_label(12, "12", white_text_color)
-        draw_hour_label(3, "3", white_text_color)
-        draw_hour_label(9, "9", white_text_color)
-        other_hours_to_label = [7, 8, 10, 11, 1, 2, 4, 5]
-        for hour in other_hours_to_label:
-            draw_hour_label(hour, str(hour), grey_text_color)
-
-
-        print("Adding Min/Max Temperature...")
-        temp_text = f"{current_min_temp}/{current_max_temp} C"
-        temp_text_width = len(temp_text) * 8
-        tx_temp = round(cx - temp_text_width / 2)
-        ty_temp = cy + 60 
-        tft.text(temp_text, tx_temp, ty_temp, white_text_color)
-
-
-        print("Adding weather icons...")
-        icon_width = 32
-        icon_height = 32
-        icon_padding = 10 
-        total_icons_width = (icon_width * 3) + (icon_padding * 2)
-        start_x_icons = cx - total_icons_width // 2
-        icon_y_pos = cy - icon_height // 2
-
-        if icon1_pattern and icon1_color_idx is not None: 
-            print(f"Drawing icon 1: pattern={bool(icon1_pattern)}, color_idx={icon1_color_idx}")
-            draw_bitmap(tft, start_x_icons, icon_y_pos, icon1_pattern, icon1_color_idx)
-        
-        if icon2_pattern and icon2_color_idx is not None: 
-            print(f"Drawing icon 2: pattern={bool(icon2_pattern)}, color_idx={icon2_color_idx}")
-            draw_bitmap(tft, start_x_icons + icon_width + icon_padding, icon_y_pos, icon2_pattern, icon2_color_idx)
-        
-        if icon3_pattern and icon3_cloud_color_idx is not None:
-            print(f"Drawing icon 3: pattern={bool(icon3_pattern)}, cloud_color_idx={icon3_cloud_color_idx}, rain_color_idx={icon3_rain_color_idx}")
-            draw_bitmap(tft, start_x_icons + (icon_width + icon_padding) * 2, icon_y_pos, icon3_pattern, icon3_cloud_color_idx)
-            if icon3_rain_color_idx is not None: 
-                rain_drops_coords = [
-                    (5, 24), (8, 26), (5, 28), 
-                    (15, 25),(18, 27),(15, 29),
-                    (25, 24),(28, 26),(25, 28)
-                ]
-                base_x_icon3 = start_x_icons + (icon_width + icon_padding) * 2
-                base_y_icon3 = icon_y_pos
-                for dx, dy in rain_drops_coords:
-                    if RAIN_32[dy][dx] == '0':
-                        tft.pixel(base_x_icon3 + dx, base_y_icon3 + dy, icon3_rain_color_idx)
-        
-        print("Final display update...")
-        tft.show()
-        print("Weather display updated. Will sleep and repeat or end.")
-        time.sleep(10) # Keep display on for 10s for this test
-
+        asyncio.run(app())
     except Exception as e:
         print("Error in main loop:")
-        import sys
         sys.print_exception(e)
+        prof.dump() # What led up to it
     finally:
-        if tft:
-            # Optional: tft.fill(LUT_INDEX_BLACK); tft.show(); bl_pin_obj.value(0)
-            pass
+        asyncio.new_event_loop() # Clear retained asyncio state
         print("End of script run.")
 
 if __name__ == '__main__':
-    main() 
\ No newline at end of file
+    main()
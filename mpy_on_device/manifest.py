@@ -0,0 +1,32 @@
+# manifest.py Freeze the clock into the MicroPython firmware image.
+
+# Frozen modules run as bytecode straight from flash: nothing is compiled at
+# boot, and their bytes literals (the icon masks) and strings stay in flash
+# instead of being copied to the heap. Build from micropython/ports/esp32:
+#   make BOARD=ESP32_GENERIC_S3 FROZEN_MANIFEST=$(realpath ../../../mpy_on_device/manifest.py)
+# A frozen main.py runs in preference to one on the filesystem, so after
+# changing its settings (Wi-Fi, location) the firmware must be rebuilt.
+# Comment it out below to keep main.py on the filesystem while developing.
+# drivers/boolpalette.py from nano-gui stays in /lib on the device.
+
+include("$(PORT_DIR)/boards/manifest.py")
+
+# Needed for the first frame
+module("main.py")
+module("gc9a01.py", base_path="lib")
+module("icons.py", base_path="lib")
+module("ring.py", base_path="lib")
+module("fcache.py", base_path="lib")
+module("power.py", base_path="lib")
+module("prof.py", base_path="lib")
+module("snapshot.py", base_path="lib")
+module("layers.py", base_path="lib")
+module("forecast.py", base_path="lib")
+module("telemetry.py", base_path="lib")
+module("hands.py", base_path="lib")
+
+# Imported once the first frame is shown
+module("httpc.py", base_path="lib")
+module("jstream.py", base_path="lib")
+module("wifi.py", base_path="lib")
+module("delta.py", base_path="lib")